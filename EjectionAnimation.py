@@ -0,0 +1,127 @@
+import math
+import numpy as np
+from EjectionCalc import *
+from EjectionKepler import body_elements, next_windows, state, true_longitude
+
+# Precomputed frames for the animated orbit view. Every body of a system, and a spacecraft flying the
+# Hohmann transfer between two of them at each launch window, is solved for a whole block of frames at
+# once with the vectorized Kepler solver and converted to whole canvas pixels. Drawing a frame is then a
+# row lookup, and only the items whose pixel position changed since the last frame need a coords call.
+
+FRAME_BLOCK = 240
+HIDDEN = -100
+
+
+class OrbitAnimation:
+    def __init__(self, bodies, centre, radius, seconds_per_frame, origin=None, destination=None):
+        # bodies all orbit the same host; the largest apoapsis is drawn radius pixels from centre
+        self.__bodies = bodies
+        self.__elements = [np.array(c, dtype=float) for c in zip(*(body_elements(c) for c in bodies))]
+        self.__centre = centre
+        self.__scale = radius / max(c.get_apoapsis() for c in bodies)
+        self.__seconds_per_frame = seconds_per_frame
+        self.__host_mu = bodies[0].get_host().get_mu()
+        self.__transfer = None
+
+        if origin is not None and destination is not None and origin is not destination:
+            phase_angle, _, _, _, transfer_time = (float(c[0, 1]) for c in transfer_matrix(*body_arrays([origin, destination])))
+
+            # Bodies with the same period never change phase, so they have no windows
+            if not math.isnan(phase_angle) and origin.get_period() != destination.get_period():
+                self.__transfer = (origin, destination, phase_angle, transfer_time)
+
+    def get_bodies(self):
+        return self.__bodies
+
+    def get_seconds_per_frame(self):
+        return self.__seconds_per_frame
+
+    def has_transfer(self):
+        return self.__transfer is not None
+
+    def to_canvas(self, x, y):
+        # Whole pixels, so a body that has not moved a full pixel is not redrawn
+        return (np.rint(self.__centre[0] + x * self.__scale).astype(np.int32),
+                np.rint(self.__centre[1] - y * self.__scale).astype(np.int32))
+
+    def frames(self, first, count=FRAME_BLOCK):
+        # (times, x, y, departures) for frames first .. first + count - 1. x and y are (frames, bodies + 1)
+        # pixel arrays whose last column is the spacecraft, parked at HIDDEN between flights; departures
+        # is the departure time of the flight under way at each frame, NaN when there is none.
+        times = (first + np.arange(count)) * self.__seconds_per_frame
+        x, y = state(*self.__elements[:3], times[:, None], self.__elements[3], self.__elements[4])[:2]
+        x, y = self.to_canvas(x, y)
+
+        craft_x, craft_y, departures = self.__flights(times)
+        return times, np.column_stack((x, craft_x)), np.column_stack((y, craft_y)), departures
+
+    def __flights(self, times):
+        craft_x = np.full(len(times), HIDDEN, dtype=np.int32)
+        craft_y = np.full(len(times), HIDDEN, dtype=np.int32)
+        departures = np.full(len(times), np.nan)
+
+        if self.__transfer is None or not len(times):
+            return craft_x, craft_y, departures
+
+        origin, destination, phase_angle, transfer_time = self.__transfer
+        synodic = 1 / abs(1 / origin.get_period() - 1 / destination.get_period())
+
+        # Every flight that is under way at some point in the block; a later departure takes over the
+        # spacecraft if flights overlap
+        count = int((times[-1] - times[0] + transfer_time) / synodic) + 2
+        windows = next_windows(origin, destination, phase_angle, count, times[0] - transfer_time)
+
+        for departure in windows[~np.isnan(windows)]:
+            flying = (times >= departure) & (times <= departure + transfer_time)
+
+            if flying.any():
+                apoapsis, periapsis, host_mu, mean_anomaly, longitude = self.transfer_elements(departure)
+                x, y = state(apoapsis, periapsis, host_mu, times[flying], mean_anomaly, longitude)[:2]
+                craft_x[flying], craft_y[flying] = self.to_canvas(x, y)
+                departures[flying] = departure
+
+        return craft_x, craft_y, departures
+
+    def transfer_elements(self, departure):
+        # (apoapsis, periapsis, host_mu, mean anomaly at t = 0, longitude of periapsis) of the transfer
+        # ellipse leaving at departure. Like Transfer, the ellipse joins the two SMAs; it starts at
+        # periapsis for an outward transfer and at apoapsis for an inward one.
+        origin, destination = self.__transfer[:2]
+        r1, r2 = origin.get_SMA(), destination.get_SMA()
+        a = (r1 + r2) / 2
+        n = math.sqrt(self.__host_mu / a ** 3)
+        longitude = float(true_longitude(*body_elements(origin)[:3], departure))
+
+        if r2 > r1:
+            return max(r1, r2), min(r1, r2), self.__host_mu, -n * departure, longitude
+
+        return max(r1, r2), min(r1, r2), self.__host_mu, math.pi - n * departure, longitude + math.pi
+
+    def transfer_outline(self, departure, points=64):
+        # Flattened pixel coordinates of the half ellipse flown from departure, for create_line
+        apoapsis, periapsis, host_mu, mean_anomaly, longitude = self.transfer_elements(departure)
+        times = departure + np.linspace(0, self.__transfer[3], points)
+        x, y = self.to_canvas(*state(apoapsis, periapsis, host_mu, times, mean_anomaly, longitude)[:2])
+        return np.column_stack((x, y)).ravel().tolist()
+
+    def outlines(self, points=64):
+        # Flattened pixel coordinates of every orbit, one list per body, for create_line
+        apoapsis, periapsis, _, _, longitude = self.__elements
+        E = np.linspace(0, 2 * math.pi, points)[None, :]
+        a = (apoapsis + periapsis)[:, None] / 2
+        e = ((apoapsis - periapsis) / (apoapsis + periapsis))[:, None]
+        x, y = a * (np.cos(E) - e), a * np.sqrt(1 - e ** 2) * np.sin(E)
+        cos_w, sin_w = np.cos(longitude)[:, None], np.sin(longitude)[:, None]
+        x, y = self.to_canvas(x * cos_w - y * sin_w, x * sin_w + y * cos_w)
+        return np.stack((x, y), axis=-1).reshape(len(x), -1).tolist()
+
+
+def system_names():
+    # Every body that something orbits, stars first
+    names = get_names()
+    hosts = [c.get_host().get_name() for c in (read_body(c) for c in names) if c]
+    return list(dict.fromkeys(c for c in hosts if c not in names)) + [c for c in names if c in set(hosts)]
+
+
+def system_bodies(host):
+    return [c for c in (read_body(c) for c in get_names()) if c and c.get_host().get_name() == host]
@@ -0,0 +1,183 @@
+import argparse, collections, csv, itertools, json, math, os, sys
+from concurrent.futures import ProcessPoolExecutor
+import EjectionCalc
+from EjectionCalc import *
+
+# Headless batch mode. Queries of (origin, destination, parking altitude, target altitude) are read as a
+# stream from CSV or JSONL, solved in chunks across a process pool and written back in input order.
+# Only a fixed window of chunks is ever in flight, so memory use does not grow with the input.
+# Altitudes are in metres above the surface; a blank altitude uses the body's default.
+
+QUERY_FIELDS = ("origin", "destination", "parking_altitude", "target_altitude")
+RESULT_FIELDS = QUERY_FIELDS + ("phase_angle", "ejection_angle", "ejection_dv", "capture_dv", "transfer_time", "error")
+
+
+def read_queries(stream, form):
+    if form == "jsonl":
+        for i, line in enumerate(stream):
+            if not line.strip():
+                continue
+
+            try:
+                record = json.loads(line)
+
+            except ValueError as e:
+                raise ValueError("line " + str(i + 1) + ": " + str(e)) from None
+
+            if not isinstance(record, dict):
+                raise ValueError("line " + str(i + 1) + ": expected an object, got " + type(record).__name__)
+
+            yield tuple(record.get(c) for c in QUERY_FIELDS)
+
+        return
+
+    reader = csv.reader(stream)
+
+    for row in reader:
+        if not row or row[0] == "origin":
+            continue
+
+        row = row + [None] * (4 - len(row))
+        yield row[0], row[1], row[2] or None, row[3] or None
+
+
+def init_worker(url):
+    # Every worker opens its own connection and catalog, once
+    EjectionCalc.set_storage(open_storage(url))
+
+
+def solve(query):
+    origin_name, destination_name, parking_altitude, target_altitude = query
+    origin, destination = read_body(origin_name), read_body(destination_name)
+
+    if origin is None or destination is None:
+        return query + (None,) * 5 + ("unknown body " + repr(destination_name if origin else origin_name),)
+
+    if origin_name == destination_name:
+        return query + (None,) * 5 + ("origin and destination are the same body",)
+
+    if origin.get_host().get_name() != destination.get_host().get_name():
+        return query + (None,) * 5 + ("bodies orbit different hosts",)
+
+    try:
+        parking_altitude = origin.get_altitude() if parking_altitude is None else float(parking_altitude)
+        target_altitude = destination.get_altitude() if target_altitude is None else float(target_altitude)
+        parking_radius = origin.get_radius() + parking_altitude
+        target_radius = destination.get_radius() + target_altitude
+
+        transfer = transfer_cache.get_transfer(origin, destination, Orbit(parking_radius, parking_radius, origin),
+                                               Orbit(target_radius, target_radius, destination))
+
+    except (AssertionError, ArithmeticError, ValueError) as e:
+        # One bad query (a negative altitude, a typo in a number) should not stop the whole batch
+        return query + (None,) * 5 + (type(e).__name__ + " " + str(e),)
+
+    return (origin_name, destination_name, parking_altitude, target_altitude, math.degrees(transfer.get_phase_angle()),
+            math.degrees(transfer.get_ejection_angle()), transfer.get_ejection_deltav(), transfer.get_capture_deltav(),
+            transfer.get_transfer_time(), None)
+
+
+def solve_chunk(queries):
+    return [solve(c) for c in queries]
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+
+        if not chunk:
+            return
+
+        yield chunk
+
+
+def run(queries, url=None, workers=None, chunk_size=1000, window=None):
+    # Yields results in input order. workers=0 solves everything in this process.
+    chunks = chunked(queries, chunk_size)
+
+    if workers == 0:
+        init_worker(url)
+
+        for chunk in chunks:
+            yield from solve_chunk(chunk)
+
+        return
+
+    workers = workers or os.cpu_count() or 1
+    window = window or 2 * workers
+
+    with ProcessPoolExecutor(workers, initializer=init_worker, initargs=(url,)) as executor:
+        pending = collections.deque(executor.submit(solve_chunk, c) for c in itertools.islice(chunks, window))
+
+        while pending:
+            results = pending.popleft().result()
+
+            for chunk in itertools.islice(chunks, 1):
+                pending.append(executor.submit(solve_chunk, chunk))
+
+            yield from results
+
+
+def write_results(results, stream, form):
+    count = 0
+
+    if form == "jsonl":
+        for result in results:
+            stream.write(json.dumps(dict(zip(RESULT_FIELDS, result))) + "\n")
+            count += 1
+
+        return count
+
+    writer = csv.writer(stream, lineterminator="\n")
+    writer.writerow(RESULT_FIELDS)
+
+    for result in results:
+        writer.writerow(["" if c is None else c for c in result])
+        count += 1
+
+    return count
+
+
+def format_of(path, default):
+    if path and path.lower().endswith((".jsonl", ".json")):
+        return "jsonl"
+
+    return "csv" if path and path.lower().endswith(".csv") else default
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Solve a stream of transfer queries without the UI")
+    parser.add_argument("input", nargs="?", default="-", help="CSV or JSONL file of queries, - for stdin")
+    parser.add_argument("-o", "--output", default="-", help="where to write the results, - for stdout")
+    parser.add_argument("--format", choices=("csv", "jsonl"), help="input and output format, by default from the file names")
+    parser.add_argument("--storage", help="storage URL, by default $EJECTION_STORAGE")
+    parser.add_argument("--workers", type=int, help="worker processes, 0 to run in this process")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="queries sent to a worker at a time")
+    parser.add_argument("--window", type=int, help="chunks in flight at once, by default twice the workers")
+    args = parser.parse_args(argv)
+
+    input_format = args.format or format_of(args.input, "csv")
+    output_format = args.format or format_of(args.output, input_format)
+
+    source = sys.stdin if args.input == "-" else open(args.input, newline="")
+    target = sys.stdout if args.output == "-" else open(args.output, "w", newline="")
+
+    try:
+        results = run(read_queries(source, input_format), args.storage, args.workers, args.chunk_size, args.window)
+        count = write_results(results, target, output_format)
+
+    finally:
+        if source is not sys.stdin:
+            source.close()
+
+        if target is not sys.stdout:
+            target.close()
+
+    print(str(count) + " queries solved", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,230 @@
+import argparse, json, os, random, statistics, sys, tempfile, time
+import numpy as np
+import EjectionCalc
+from EjectionCalc import *
+from EjectionAnimation import OrbitAnimation, system_bodies
+from EjectionKepler import eccentric_anomaly, window_timeline
+from EjectionMatrix import TransferStore, get_transfer_store, snapshot_path
+from EjectionQuery import DestinationIndex
+from EjectionStorage import ColumnStorage, create_sqlite, export_columns
+from EjectionStrategy import strategy_matrix
+from EjectionUncertainty import monte_carlo
+
+# Headless benchmarks against synthetic catalogs in a throwaway SQLite file. Results are saved as JSON;
+# given a baseline, any benchmark whose median time grew by more than the tolerance fails the run.
+
+
+def synthetic_rows(count, seed=0):
+    rng = random.Random(seed)
+    rows = [("Sun", 1.989e30, 696340000.0, 0.0, 0.0, "", "yellow", 0)]
+
+    for i in range(count):
+        SMA = 10 ** rng.uniform(10.5, 12.7)
+        eccentricity = rng.uniform(0, 0.2)
+        rows.append(("Body " + str(i), 10 ** rng.uniform(20, 27), 10 ** rng.uniform(5.5, 7.5), SMA * (1 + eccentricity),
+                     SMA * (1 - eccentricity), "Sun", "#%06x" % rng.randrange(0x1000000), rng.choice((100000, 200000, 300000))))
+
+    return rows
+
+
+def time_runs(function, repeat):
+    times = []
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+
+    return {"median": statistics.median(times), "min": min(times), "runs": repeat}
+
+
+def bench_catalog(results, path, size, repeat):
+    EjectionCalc.set_storage(open_storage("sqlite:///" + path))
+    names = get_names()
+    storage = get_storage()
+
+    results["catalog_load/" + str(size)] = time_runs(lambda: BodyCatalog(storage), repeat)
+    results["storage_fetch_one/" + str(size)] = time_runs(lambda: storage.fetch_bodies([names[0]]), repeat)
+    results["get_names/" + str(size)] = time_runs(get_names, repeat)
+    results["get_hosts/" + str(size)] = time_runs(get_hosts, repeat)
+    results["read_body_all/" + str(size)] = time_runs(lambda: [read_body(c) for c in names], repeat)
+
+
+def bench_columns(results, path, size, repeat):
+    # The same catalog exported to memory-mapped columns: opening it should not depend on its size
+    results["columns_export/" + str(size)] = time_runs(lambda: export_columns(get_storage(), path), 1)
+    names = get_names()
+
+    results["columns_open/" + str(size)] = time_runs(lambda: ColumnCatalog(ColumnStorage(path)), repeat)
+    catalog = ColumnCatalog(ColumnStorage(path))
+    results["columns_get_row_all/" + str(size)] = time_runs(lambda: [catalog.get_row(c) for c in names], repeat)
+
+
+def bench_transfer(results, repeat):
+    origin, destination = read_body(get_names()[0]), read_body(get_names()[1])
+    parking_orbit = Orbit(origin.get_radius() + origin.get_altitude(), origin.get_radius() + origin.get_altitude(), origin)
+    target_orbit = Orbit(destination.get_radius() + destination.get_altitude(), destination.get_radius() + destination.get_altitude(), destination)
+
+    results["transfer_x1000"] = time_runs(lambda: [Transfer(origin, destination, parking_orbit, target_orbit) for _ in range(1000)], repeat)
+    results["monte_carlo_1e6"] = time_runs(lambda: monte_carlo(origin, destination, 1000000, seed=0), repeat)
+
+
+def bench_kepler(results, repeat):
+    rng = np.random.default_rng(0)
+    mean_anomaly, eccentricity = rng.uniform(0, 2 * math.pi, 1000000), rng.uniform(0, 0.95, 1000000)
+
+    results["kepler_1e6"] = time_runs(lambda: eccentric_anomaly(mean_anomaly, eccentricity), repeat)
+
+    bodies = [read_body(c) for c in get_names()[1:]]
+    results["window_timeline/" + str(len(bodies))] = time_runs(lambda: window_timeline(bodies), repeat)
+
+
+def bench_sort_view(results, size, repeat):
+    # The work SortingUI does before anything reaches Tk: body lookups, the matrix and the row strings
+    def build():
+        bodies = [read_body(c) for c in get_names()[1:]]
+        ejection_dv, capture_dv, transfer_time = transfer_matrix(*body_arrays(bodies))[2:]
+        pairs = np.nonzero(~np.isnan(ejection_dv))
+        return [(bodies[i].get_name(), bodies[j].get_name(), str(round(float(ejection_dv[i, j]), 2)),
+                 str(round(float(capture_dv[i, j]), 2)), str(round(float(transfer_time[i, j]) / 31536000, 3))) for i, j in zip(*pairs)]
+
+    arrays = body_arrays([read_body(c) for c in get_names()[1:]])
+
+    results["transfer_matrix/" + str(size)] = time_runs(lambda: transfer_matrix(*arrays), repeat)
+    results["strategy_matrix/" + str(size)] = time_runs(lambda: strategy_matrix(*arrays), repeat)
+    results["sort_view_matrix/" + str(size)] = time_runs(build, repeat)
+
+    # Opening the Sort view with an up-to-date materialized matrix is a single read
+    get_transfer_store().update()
+    results["transfer_store_read/" + str(size)] = time_runs(lambda: TransferStore(get_storage(), get_catalog()).get_pairs(), repeat)
+    results["transfer_snapshot_read/" + str(size)] = time_runs(lambda: TransferStore(get_storage(), get_catalog(), snapshot_path(get_storage())).get_pairs(), repeat)
+
+    # Top 10 destinations from one body through the SMA index, against the full matrix above
+    index = DestinationIndex(get_catalog().get_arrays())
+    results["cheapest_destinations/" + str(size)] = time_runs(lambda: index.cheapest(get_names()[0], 10), repeat)
+
+    # One block of frames for the orbit view, including a transfer between the first two bodies
+    bodies = system_bodies("Sun")
+    animation = OrbitAnimation(bodies, (500, 480), 300, 86400, bodies[0], bodies[1])
+    results["orbit_frames/" + str(size)] = time_runs(lambda: animation.frames(0), repeat)
+
+
+def bench_table_sort(results, sizes, repeat):
+    from EjectionUI import SortOrder, ArraySortOrder
+
+    rng = np.random.default_rng(0)
+
+    for size in sizes:
+        names = np.array(["Body " + str(c) for c in rng.integers(0, 1000, size)], dtype=object)
+        numbers = rng.random(size) * 10000
+        values = [(a, str(round(b, 2))) for a, b in zip(names, numbers)]
+
+        def sort_rows():
+            order = SortOrder(values)
+            order.click(1)
+            order.click(0, add=True)
+
+        def sort_arrays():
+            order = ArraySortOrder([names, numbers])
+            order.click(1)
+            order.click(0, add=True)
+
+        results["table_sort/" + str(size)] = time_runs(sort_rows, repeat)
+        results["virtual_table_sort/" + str(size)] = time_runs(sort_arrays, repeat)
+
+
+def bench_canvas(results, repeat):
+    import tkinter as tk
+    import EjectionUI
+
+    try:
+        root = tk.Tk()
+
+    except tk.TclError:
+        print("No display available, skipping the canvas benchmark")
+        return
+
+    root.withdraw()
+    EjectionUI.root = root
+    names = get_names()
+    ui = EjectionUI.TransferCalcUI(default_origin=names[0], default_destination=names[1])
+
+    def update():
+        ui._TransferCalcUI__update_bodies()
+        root.update_idletasks()
+
+    results["calculate_canvas_update"] = time_runs(update, repeat)
+    ui.end()
+    root.destroy()
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+
+    for name, result in sorted(results.items()):
+        if name in baseline:
+            ratio = result["median"] / baseline[name]["median"]
+            flag = "REGRESSION" if ratio > tolerance else ""
+            print("%-32s %10.6f s  x%.2f %s" % (name, result["median"], ratio, flag))
+
+            if ratio > tolerance:
+                regressions.append(name)
+
+        else:
+            print("%-32s %10.6f s  (new)" % (name, result["median"]))
+
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the transfer calculator, catalog I/O and UI hot paths")
+    parser.add_argument("--sizes", default="10,100,1000", help="catalog sizes (bodies) to benchmark")
+    parser.add_argument("--table-sizes", default="100,1000,10000,100000", help="synthetic table sizes (rows) to sort")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", default="bench.json", help="where to save the results")
+    parser.add_argument("--baseline", help="previous results to compare against")
+    parser.add_argument("--tolerance", type=float, default=1.5, help="allowed slowdown before a benchmark fails")
+    parser.add_argument("--no-ui", action="store_true", help="skip the benchmarks that need a display")
+    args = parser.parse_args(argv)
+
+    results = {}
+
+    with tempfile.TemporaryDirectory() as directory:
+        for size in [int(c) for c in args.sizes.split(",")]:
+            path = os.path.join(directory, "bodies_" + str(size) + ".db")
+            create_sqlite(path, synthetic_rows(size)).close()
+            bench_catalog(results, path, size, args.repeat)
+            bench_sort_view(results, size, args.repeat)
+            bench_columns(results, os.path.join(directory, "bodies_" + str(size) + ".cols"), size, args.repeat)
+
+            if size == int(args.sizes.split(",")[0]):
+                bench_transfer(results, args.repeat)
+                bench_kepler(results, args.repeat)
+
+                if not args.no_ui:
+                    bench_canvas(results, args.repeat)
+
+            get_storage().close()
+
+    bench_table_sort(results, [int(c) for c in args.table_sizes.split(",")], args.repeat)
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+
+    baseline = {}
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    regressions = compare(results, baseline, args.tolerance)
+
+    if regressions:
+        print("\n" + str(len(regressions)) + " benchmark(s) regressed by more than x" + str(args.tolerance) + ": " + ", ".join(regressions))
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
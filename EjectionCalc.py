@@ -1,20 +1,32 @@
-import math, mysql.connector
+import hashlib, math, os, threading, time
+from collections import OrderedDict
+import numpy as np
+from EjectionStorage import ColumnStorage, import_file, open_storage, validate_hosts, validate_rows
+from EjectionProfile import timed
 
 G = 6.67408 * (10 ** (-11))
 
 
 class Orbit:
+    # Derived quantities are computed on first use and cached. Setters clear the cache, and the
+    # values that depend on the host are recomputed if the host's mass has changed since.
+    __slots__ = ("__apoapsis", "__periapsis", "__host", "__SMA", "__eccentricity", "__period", "__period_mu")
+
     def __init__(self, apoapsis, periapsis, host):
         self.__apoapsis = apoapsis
         self.__periapsis = periapsis
-        self.__SMA = (apoapsis + periapsis) / 2
         self.__host = host
-        self.__period = self.__calculate_period()
-        self.__eccentricity = self.__calculate_eccentricity()
+        self.__clear()
+
+    def __clear(self):
+        self.__SMA = None
+        self.__eccentricity = None
+        self.__period = None
+        self.__period_mu = None
 
     def __calculate_period(self):
         try:
-            return 2 * math.pi * math.sqrt((self.__SMA ** 3) / self.__host.get_mu())
+            return 2 * math.pi * math.sqrt((self.get_SMA() ** 3) / self.__host.get_mu())
 
         except AttributeError:
             return 0
@@ -32,9 +44,7 @@ class Orbit:
     def set_apoapsis(self, apoapsis):
         assert apoapsis >= self.__periapsis
         self.__apoapsis = apoapsis
-        self.__SMA = (self.__apoapsis + self.__periapsis) / 2
-        self.__period = self.__calculate_period()
-        self.__eccentricity = self.__calculate_eccentricity()
+        self.__clear()
 
     def get_periapsis(self):
         return self.__periapsis
@@ -42,17 +52,27 @@ class Orbit:
     def set_periapsis(self, periapsis):
         assert periapsis <= self.__apoapsis
         self.__periapsis = periapsis
-        self.__SMA = (self.__apoapsis + self.__periapsis) / 2
-        self.__period = self.__calculate_period()
-        self.__eccentricity = self.__calculate_eccentricity()
+        self.__clear()
 
     def get_SMA(self):
+        if self.__SMA is None:
+            self.__SMA = (self.__apoapsis + self.__periapsis) / 2
+
         return self.__SMA
 
     def get_eccentricity(self):
+        if self.__eccentricity is None:
+            self.__eccentricity = self.__calculate_eccentricity()
+
         return self.__eccentricity
 
     def get_period(self):
+        host_mu = self.__host.get_mu() if self.__host is not None else None
+
+        if self.__period is None or self.__period_mu != host_mu:
+            self.__period = self.__calculate_period()
+            self.__period_mu = host_mu
+
         return self.__period
 
     def get_host(self):
@@ -60,16 +80,19 @@ class Orbit:
 
     def velocity(self, radius):
         assert self.__periapsis <= radius <= self.__apoapsis
-        return math.sqrt(self.__host.get_mu() * (2 / radius - 1 / self.__SMA))
+        return math.sqrt(self.__host.get_mu() * (2 / radius - 1 / self.get_SMA()))
 
 
 class Body(Orbit):
+    __slots__ = ("__mass", "__radius", "__name", "__colour", "__alt", "__mu", "__r_SOI", "__SOI_inputs")
+
     def __init__(self, mass, radius, apoapsis, periapsis, host, name="", colour="", alt=0):
         super().__init__(apoapsis, periapsis, host)
         self.__mass = mass
-        self.__mu = G * mass
+        self.__mu = None
         self.__radius = radius
-        self.__r_SOI = self.__calculate_SOI()
+        self.__r_SOI = None
+        self.__SOI_inputs = None
         self.__name = name
         self.__colour = colour
         self.__alt = alt
@@ -86,9 +109,14 @@ class Body(Orbit):
 
     def set_mass(self, mass):
         self.__mass = mass
-        self.__mu = G * mass
+        self.__mu = None
+        self.__r_SOI = None
+        transfer_cache.invalidate(self.__name)
 
     def get_mu(self):
+        if self.__mu is None:
+            self.__mu = G * self.__mass
+
         return self.__mu
 
     def get_radius(self):
@@ -96,8 +124,17 @@ class Body(Orbit):
 
     def set_radius(self, radius):
         self.__radius = radius
+        transfer_cache.invalidate(self.__name)
 
     def get_r_SOI(self):
+        # The SOI also depends on the orbit and the host's mass, which can change without this body knowing
+        host = self.get_host()
+        inputs = (self.get_SMA(), host.get_mass() if host is not None else None)
+
+        if self.__r_SOI is None or self.__SOI_inputs != inputs:
+            self.__r_SOI = self.__calculate_SOI()
+            self.__SOI_inputs = inputs
+
         return self.__r_SOI
 
     def get_name(self):
@@ -119,6 +156,86 @@ class Body(Orbit):
         self.__alt = altitude
 
 
+class BodyArray:
+    # Struct-of-arrays counterpart of Body for bulk work: one NumPy array per attribute, with the
+    # derived quantities computed for the whole array on first use
+    def __init__(self, mass, radius, apoapsis, periapsis, host_mu, altitude=None, names=None, hosts=None, colours=None):
+        self.__mass = np.asarray(mass, dtype=float)
+        self.__radius = np.asarray(radius, dtype=float)
+        self.__apoapsis = np.asarray(apoapsis, dtype=float)
+        self.__periapsis = np.asarray(periapsis, dtype=float)
+        self.__host_mu = np.asarray(host_mu, dtype=float)
+        self.__altitude = np.zeros(len(self.__mass)) if altitude is None else np.asarray(altitude, dtype=float)
+        self.__names = names
+        self.__hosts = hosts
+        self.__colours = colours
+        self.__cache = {}
+
+    @classmethod
+    def from_bodies(cls, bodies):
+        return cls([c.get_mass() for c in bodies], [c.get_radius() for c in bodies],
+                   [c.get_apoapsis() for c in bodies], [c.get_periapsis() for c in bodies],
+                   [c.get_host().get_mu() for c in bodies], [c.get_altitude() for c in bodies],
+                   names=np.array([c.get_name() for c in bodies], dtype=object),
+                   hosts=np.array([c.get_host().get_name() for c in bodies], dtype=object),
+                   colours=np.array([c.get_colour() for c in bodies], dtype=object))
+
+    def __len__(self):
+        return len(self.__mass)
+
+    def __cached(self, name, calculate):
+        if name not in self.__cache:
+            self.__cache[name] = calculate()
+
+        return self.__cache[name]
+
+    def get_mass(self):
+        return self.__mass
+
+    def get_radius(self):
+        return self.__radius
+
+    def get_apoapsis(self):
+        return self.__apoapsis
+
+    def get_periapsis(self):
+        return self.__periapsis
+
+    def get_host_mu(self):
+        return self.__host_mu
+
+    def get_altitude(self):
+        return self.__altitude
+
+    def get_names(self):
+        return self.__names
+
+    def get_hosts(self):
+        return self.__hosts
+
+    def get_colours(self):
+        return self.__colours
+
+    def get_SMA(self):
+        return self.__cached("SMA", lambda: (self.__apoapsis + self.__periapsis) / 2)
+
+    def get_eccentricity(self):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return self.__cached("eccentricity", lambda: np.nan_to_num((self.__apoapsis - self.__periapsis) / (self.__apoapsis + self.__periapsis)))
+
+    def get_period(self):
+        return self.__cached("period", lambda: 2 * math.pi * np.sqrt(self.get_SMA() ** 3 / self.__host_mu))
+
+    def get_mu(self):
+        return self.__cached("mu", lambda: G * self.__mass)
+
+    def get_r_SOI(self):
+        return self.__cached("r_SOI", lambda: self.get_SMA() * (self.get_mu() / self.__host_mu) ** (2 / 5))
+
+    def transfer_matrix(self, origins=None, destinations=None):
+        return transfer_matrix(self.__mass, self.__radius, self.get_SMA(), self.__altitude, self.__host_mu, origins, destinations)
+
+
 class Transfer:
     def __init__(self, origin, destination, parking_orbit, target_orbit):
         assert parking_orbit.get_host() == origin
@@ -137,8 +254,11 @@ class Transfer:
         self.__ejection_dv = res[2]
         self.__capture_dv = res[3]
         self.__transfer_time = res[4]
+        self.__v_soi_origin = res[5]
+        self.__v_soi_destination = res[6]
 
-    def __calculate(self):
+    def __heliocentric(self):
+        # The part of the transfer that does not depend on the parking or target orbit
         origin_SMA = self.__origin.get_SMA()
         destination_SMA = self.__destination.get_SMA()
 
@@ -150,15 +270,6 @@ class Transfer:
         v_soi_origin = abs(self.__origin.velocity(origin_SMA) - v_transfer_origin)
         v_soi_destination = abs(self.__destination.velocity(destination_SMA) - v_transfer_destination)
 
-        v_orbit_origin = self.__parking_orbit.velocity(self.__parking_orbit.get_SMA())
-        v_orbit_target = self.__target_orbit.velocity(self.__target_orbit.get_SMA())
-
-        v_pe_origin = math.sqrt(v_soi_origin ** 2 + 2 * self.__origin.get_mu() * (1 / self.__parking_orbit.get_SMA() - 1 / self.__origin.get_r_SOI()))
-        v_pe_destination = math.sqrt(v_soi_destination ** 2 + 2 * self.__destination.get_mu() * (1 / self.__target_orbit.get_SMA() - 1 / self.__destination.get_r_SOI()))
-
-        deltav_transfer = abs(v_pe_origin - v_orbit_origin)
-        deltav_capture = abs(v_pe_destination - v_orbit_target)
-
         transfer_time = transfer_orbit.get_period() / 2
 
         phase_angle = math.pi * (1 - 1/math.sqrt(8) * math.sqrt((self.__origin.get_SMA() / self.__destination.get_SMA() + 1) ** 3))
@@ -169,6 +280,21 @@ class Transfer:
         if phase_angle < -math.pi:
             phase_angle = 2 * math.pi + phase_angle
 
+        return [v_soi_origin, v_soi_destination, transfer_time, phase_angle]
+
+    @timed("Transfer.calculate")
+    def __calculate(self):
+        v_soi_origin, v_soi_destination, transfer_time, phase_angle = self.__heliocentric()
+
+        v_orbit_origin = self.__parking_orbit.velocity(self.__parking_orbit.get_SMA())
+        v_orbit_target = self.__target_orbit.velocity(self.__target_orbit.get_SMA())
+
+        v_pe_origin = math.sqrt(v_soi_origin ** 2 + 2 * self.__origin.get_mu() * (1 / self.__parking_orbit.get_SMA() - 1 / self.__origin.get_r_SOI()))
+        v_pe_destination = math.sqrt(v_soi_destination ** 2 + 2 * self.__destination.get_mu() * (1 / self.__target_orbit.get_SMA() - 1 / self.__destination.get_r_SOI()))
+
+        deltav_transfer = abs(v_pe_origin - v_orbit_origin)
+        deltav_capture = abs(v_pe_destination - v_orbit_target)
+
         a_esc = -self.__origin.get_mu() / (v_soi_origin ** 2)
 
         b_esc = math.sqrt(self.__parking_orbit.get_SMA() ** 2 - 2 * a_esc * self.__parking_orbit.get_SMA())
@@ -177,7 +303,7 @@ class Transfer:
 
         ejection_angle = math.pi - math.acos(1 / e_esc)
 
-        return [phase_angle, ejection_angle, deltav_transfer, deltav_capture, transfer_time]
+        return [phase_angle, ejection_angle, deltav_transfer, deltav_capture, transfer_time, v_soi_origin, v_soi_destination]
 
     def get_origin(self):
         return self.__origin
@@ -206,6 +332,12 @@ class Transfer:
     def get_transfer_time(self):
         return self.__transfer_time
 
+    def get_v_soi_origin(self):
+        return self.__v_soi_origin
+
+    def get_v_soi_destination(self):
+        return self.__v_soi_destination
+
     def __str__(self):
         msg = "Phase Angle: " + str(round(math.degrees(self.__phase_angle), 2)) + "°\n"
         msg += "Ejection Angle: " + str(round(math.degrees(self.__ejection_angle), 2)) + "°\n"
@@ -216,28 +348,507 @@ class Transfer:
         return msg
 
 
-def get_names():
-    sql = "SELECT name FROM BODIES WHERE host != ''"
-    cursor.execute(sql)
-    names = cursor.fetchall()
-    names = [c[0] for c in names]
+class TransferCache:
+    # Bounded LRU cache of Transfer results. Keys are the physical inputs of the transfer, so a body
+    # that is edited or reloaded can never be served a stale result; invalidate() also frees every
+    # entry that mentions a body (as origin, destination or host) as soon as it changes.
+    def __init__(self, size=1024):
+        self.__size = size
+        self.__entries = OrderedDict()
+        self.__by_name = {}
+        self.__hits = 0
+        self.__misses = 0
+        self.__evictions = 0
+        self.__lock = threading.Lock()
+
+    def get_transfer(self, origin, destination, parking_orbit, target_orbit):
+        key = transfer_key(origin, destination, parking_orbit, target_orbit)
+
+        with self.__lock:
+            if key in self.__entries:
+                self.__hits += 1
+                self.__entries.move_to_end(key)
+                return self.__entries[key]
+
+            self.__misses += 1
+
+        transfer = Transfer(origin, destination, parking_orbit, target_orbit)
+
+        with self.__lock:
+            if self.__size > 0 and key not in self.__entries:
+                self.__entries[key] = transfer
+
+                for name in key[0][0], key[1][0], key[4]:
+                    self.__by_name.setdefault(name, set()).add(key)
+
+                self.__evict()
+
+        return transfer
+
+    def __evict(self):
+        while len(self.__entries) > self.__size:
+            key, _ = self.__entries.popitem(last=False)
+            self.__unindex(key)
+            self.__evictions += 1
+
+    def __unindex(self, key):
+        for name in key[0][0], key[1][0], key[4]:
+            keys = self.__by_name.get(name)
+
+            if keys is not None:
+                keys.discard(key)
+
+                if not keys:
+                    del self.__by_name[name]
+
+    def invalidate(self, name):
+        with self.__lock:
+            for key in list(self.__by_name.get(name, ())):
+                if self.__entries.pop(key, None) is not None:
+                    self.__unindex(key)
+
+    def clear(self):
+        with self.__lock:
+            self.__entries.clear()
+            self.__by_name.clear()
+
+    def resize(self, size):
+        with self.__lock:
+            self.__size = size
+            self.__evict()
+
+    def get_stats(self):
+        with self.__lock:
+            return {"hits": self.__hits, "misses": self.__misses, "evictions": self.__evictions,
+                    "entries": len(self.__entries), "size": self.__size}
+
+
+def transfer_key(origin, destination, parking_orbit, target_orbit):
+    def body_key(body):
+        return body.get_name(), body.get_mass(), body.get_radius(), body.get_apoapsis(), body.get_periapsis()
+
+    host = origin.get_host()
+
+    return (body_key(origin), body_key(destination),
+            (parking_orbit.get_apoapsis(), parking_orbit.get_periapsis()),
+            (target_orbit.get_apoapsis(), target_orbit.get_periapsis()),
+            host.get_name(), host.get_mass(), destination.get_host().get_mass())
+
+
+def body_arrays(bodies):
+    mass = np.array([c.get_mass() for c in bodies], dtype=float)
+    radius = np.array([c.get_radius() for c in bodies], dtype=float)
+    SMA = np.array([c.get_SMA() for c in bodies], dtype=float)
+    altitude = np.array([c.get_altitude() for c in bodies], dtype=float)
+    host_mu = np.array([c.get_host().get_mu() for c in bodies], dtype=float)
+
+    return mass, radius, SMA, altitude, host_mu
+
+
+@timed("transfer_matrix")
+def transfer_matrix(mass, radius, SMA, altitude, host_mu, origins=None, destinations=None):
+    # Same equations as Transfer.__calculate, broadcast over every (origin, destination) pair.
+    # Rows are origins, columns are destinations; pairs that Transfer would reject
+    # (same body, or bodies with different hosts) are NaN.
+    # origins and destinations select a subset of rows and columns (index arrays), so the matrix can be
+    # computed in chunks, or just for the bodies that changed.
+    o = slice(None) if origins is None else np.asarray(origins)
+    d = slice(None) if destinations is None else np.asarray(destinations)
+    mass, radius, SMA, altitude, host_mu = (np.asarray(c, dtype=float) for c in (mass, radius, SMA, altitude, host_mu))
+
+    mu = G * mass
+    r_SOI = SMA * (mu / host_mu) ** (2 / 5)
+    r_orbit = radius + altitude
+
+    origin_host_mu = host_mu[o, None]
+    destination_host_mu = host_mu[None, d]
+
+    phase_angle, ejection_angle, deltav_transfer, deltav_capture, transfer_time = hohmann_arrays(
+        SMA[o, None], SMA[None, d], origin_host_mu, mu[o, None], r_SOI[o, None], r_orbit[o, None], mu[None, d], r_SOI[None, d], r_orbit[None, d])
+
+    with np.errstate(invalid="ignore"):
+        index = np.arange(len(SMA))
+        invalid = (origin_host_mu != destination_host_mu) | (index[o, None] == index[None, d])
+        phase_angle = np.where(invalid, np.nan, phase_angle)
+
+        # Transfer's loop in one step: reduce toward zero while |angle| > 2π, so exact multiples end on ±2π, not 0
+        turns = np.fmod(np.abs(phase_angle), 2 * math.pi)
+        turns = np.where(turns == 0, 2 * math.pi, turns)
+        phase_angle = np.where(np.abs(phase_angle) > 2 * math.pi, np.sign(phase_angle) * turns, phase_angle)
+
+        phase_angle = np.where(phase_angle < -math.pi, 2 * math.pi + phase_angle, phase_angle)
+
+    res = [np.broadcast_to(c, invalid.shape).copy() for c in (phase_angle, ejection_angle, deltav_transfer, deltav_capture, transfer_time)]
+
+    for c in res:
+        c[invalid] = np.nan
+
+    return res
+
+
+def hohmann_arrays(origin_SMA, destination_SMA, host_mu, origin_mu, origin_r_SOI, origin_r_orbit, destination_mu, destination_r_SOI, destination_r_orbit):
+    # The equations of Transfer.__calculate element by element, broadcast over any shapes: (phase angle
+    # before wrapping, ejection angle, ejection Δv, capture Δv, transfer time)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        transfer_SMA = (origin_SMA + destination_SMA) / 2
+
+        v_transfer_origin = np.sqrt(host_mu * (2 / origin_SMA - 1 / transfer_SMA))
+        v_transfer_destination = np.sqrt(host_mu * (2 / destination_SMA - 1 / transfer_SMA))
+
+        v_soi_origin = np.abs(np.sqrt(host_mu * (2 / origin_SMA - 1 / origin_SMA)) - v_transfer_origin)
+        v_soi_destination = np.abs(np.sqrt(host_mu * (2 / destination_SMA - 1 / destination_SMA)) - v_transfer_destination)
+
+        deltav_transfer = hyperbolic_deltav(v_soi_origin, origin_mu, origin_r_SOI, origin_r_orbit, origin_r_orbit)
+        deltav_capture = hyperbolic_deltav(v_soi_destination, destination_mu, destination_r_SOI, destination_r_orbit, destination_r_orbit)
+
+        transfer_time = 2 * math.pi * np.sqrt((transfer_SMA ** 3) / host_mu) / 2
+
+        phase_angle = math.pi * (1 - 1/math.sqrt(8) * np.sqrt((origin_SMA / destination_SMA + 1) ** 3))
+
+        ejection_angle = hyperbolic_ejection_angle(v_soi_origin, origin_mu, origin_r_orbit)
+
+    return phase_angle, ejection_angle, deltav_transfer, deltav_capture, transfer_time
+
 
-    return names
+class BodyCatalog:
+    # In-memory copy of the bodies table. Every name maps to a single shared Body, so
+    # satellites of the same host all reference the same host object.
+    def __init__(self, storage):
+        self.__storage = storage
+        self.__rows = {}
+        self.__bodies = {}
+        self.__fingerprints = {}
+        self.__version = 0
+        self.load()
+
+    @timed("BodyCatalog.load")
+    def load(self):
+        self.__rows = {c[0]: c for c in self.__storage.fetch_bodies()}
+        self.__bodies = {}
+        self.__fingerprints = {}
+        self.__version += 1
+
+        for name in self.__rows:
+            self.__intern(name)
+
+    @timed("BodyCatalog.refresh")
+    def refresh(self, body_names):
+        # Re-read only the given rows, then rebuild those bodies and anything orbiting them.
+        body_names = list(dict.fromkeys(body_names))
+
+        if not body_names:
+            return
+
+        rows = {c[0]: c for c in self.__storage.fetch_bodies(body_names)}
+
+        for name in body_names:
+            if name in rows:
+                self.__rows[name] = rows[name]
+
+            else:
+                self.__rows.pop(name, None)
+
+        stale = set(body_names)
+        changed = True
+
+        while changed:
+            changed = False
+
+            for name, row in self.__rows.items():
+                if row[5] in stale and name not in stale:
+                    stale.add(name)
+                    changed = True
+
+        for name in stale:
+            self.__bodies.pop(name, None)
+            self.__fingerprints.pop(name, None)
+            transfer_cache.invalidate(name)
+
+        self.__version += 1
+
+        for name in self.__rows:
+            self.__intern(name)
+
+    def __intern(self, name, visiting=()):
+        if name in self.__bodies:
+            return self.__bodies[name]
+
+        row = self.__rows.get(name)
+
+        if row is None or name in visiting:
+            return None
+
+        host = self.__intern(row[5], visiting + (name,)) if row[5] else None
+        body = self.__bodies[name] = body_from_row(row, host)
+        return body
+
+    def get(self, name):
+        return self.__bodies.get(name)
+
+    def get_fingerprint(self, name):
+        # Short hash of everything in a body's row that affects its transfers, including its host's
+        # fingerprint, so a change to a host changes the fingerprint of everything orbiting it
+        fingerprint = self.__fingerprints.get(name)
+
+        if fingerprint is None:
+            row = self.__rows[name]
+            fingerprint = self.__fingerprints[name] = row_fingerprint(row, self.get_fingerprint(row[5]) if row[5] in self.__bodies else "")
+
+        return fingerprint
+
+    def get_row(self, name):
+        return self.__rows.get(name)
+
+    def get_version(self):
+        # Goes up on every load and refresh, so derived data can tell it is out of date without hashing every row
+        return self.__version
+
+    def get_arrays(self):
+        # Every satellite as a BodyArray
+        return BodyArray.from_bodies([c for c in (self.get(c) for c in self.get_names()) if c is not None])
+
+    def get_names(self):
+        return [name for name, row in self.__rows.items() if row[5]]
+
+    def get_hosts(self):
+        return [self.__bodies[name] for name, row in self.__rows.items() if not row[5]]
+
+    def __contains__(self, name):
+        return name in self.__rows
+
+
+class ColumnCatalog:
+    # BodyCatalog over a memory-mapped ColumnStorage, for catalogs too large to hold as Body objects.
+    # Nothing is read when it is opened: a row is decoded, and its Body built, the first time it is asked
+    # for, and get_arrays hands the mapped columns to BodyArray without copying them.
+    def __init__(self, storage):
+        self.__storage = storage
+        self.__bodies = {}
+        self.__fingerprints = {}
+        self.__host_mu = None
+        self.__version = 1
+
+    def load(self):
+        self.__storage.open()
+        self.__bodies = {}
+        self.__fingerprints = {}
+        self.__host_mu = None
+        self.__version += 1
+        transfer_cache.clear()
+
+    def refresh(self, body_names):
+        # Column catalogs are only ever replaced whole
+        self.load()
+
+    def get(self, name):
+        body = self.__bodies.get(name)
+
+        if body is None:
+            row = self.get_row(name)
+
+            if row is None:
+                return None
+
+            body = self.__bodies[name] = body_from_row(row, self.get(row[5]) if row[5] else None)
+
+        return body
+
+    def get_fingerprint(self, name):
+        fingerprint = self.__fingerprints.get(name)
+
+        if fingerprint is None:
+            row = self.get_row(name)
+            fingerprint = self.__fingerprints[name] = row_fingerprint(row, self.get_fingerprint(row[5]) if row[5] else "")
+
+        return fingerprint
+
+    def get_row(self, name):
+        i = self.__storage.find(name)
+        return None if i is None else self.__storage.get_row(i)
+
+    def get_version(self):
+        return self.__version
+
+    def get_names(self):
+        return self.__storage.get_names()[self.__storage.get_column("host") >= 0].tolist()
+
+    def get_hosts(self):
+        return [self.get(c) for c in self.__storage.get_names()[self.__storage.get_column("host") < 0]]
+
+    def get_arrays(self):
+        # Every row, hosts included, as a BodyArray over the mapped columns. Only the host μ is computed
+        # (NaN for hosts, so transfer_matrix treats them as invalid), and hosts are given as row indices.
+        host = self.__storage.get_column("host")
+
+        if self.__host_mu is None:
+            mass = self.__storage.get_column("mass")
+            self.__host_mu = np.where(host >= 0, G * mass[host], np.nan)
+
+        columns = [self.__storage.get_column(c) for c in ("mass", "radius", "apoapsis", "periapsis")]
+        return BodyArray(*columns, self.__host_mu, self.__storage.get_column("alt"), names=self.__storage.get_names(), hosts=host)
+
+    def __contains__(self, name):
+        return self.__storage.find(name) is not None
+
+
+def body_from_row(row, host):
+    if row[5]:
+        return Body(float(row[1]), float(row[2]), float(row[3]), float(row[4]), host=host, name=row[0], colour=row[6], alt=int(float(row[7])))
+
+    return Body(float(row[1]), float(row[2]), 0, 0, host=None, name=row[0], colour=row[6], alt=int(float(row[7])))
+
+
+def row_fingerprint(row, host_fingerprint):
+    key = repr(tuple(row[:6]) + (row[7], host_fingerprint))
+    return hashlib.blake2b(key.encode(), digest_size=8).hexdigest()
+
+
+def hyperbolic_deltav(v_soi, mu, r_SOI, periapsis, apoapsis):
+    # Δv between an orbit and the hyperbola through its periapsis that reaches the SOI at v_soi.
+    # For a circular orbit this is the ejection (or capture) burn of Transfer; works on arrays.
+    with np.errstate(divide="ignore", invalid="ignore"):
+        v_pe = np.sqrt(v_soi ** 2 + 2 * mu * (1 / periapsis - 1 / r_SOI))
+        v_orbit = np.sqrt(mu * (2 / periapsis - 1 / ((periapsis + apoapsis) / 2)))
+
+    return np.abs(v_pe - v_orbit)
+
+
+def hyperbolic_ejection_angle(v_soi, mu, periapsis):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        a_esc = -mu / (v_soi ** 2)
+        b_esc = np.sqrt(periapsis ** 2 - 2 * a_esc * periapsis)
+        e_esc = np.sqrt(1 + b_esc ** 2 / a_esc ** 2)
+
+        return math.pi - np.arccos(1 / e_esc)
+
+
+class AltitudeSweep:
+    # Ejection and capture Δv for every combination of parking and target orbit. The heliocentric part
+    # comes from a single (cached) Transfer; only the burns at each end are evaluated per orbit.
+    # Orbits are given as altitudes of periapsis and, for elliptic orbits, apoapsis; the burn is made
+    # at periapsis.
+    def __init__(self, origin, destination, parking_periapsis, target_periapsis, parking_apoapsis=None, target_apoapsis=None):
+        self.__origin = origin
+        self.__destination = destination
+        self.__parking_periapsis = np.asarray(parking_periapsis, dtype=float)
+        self.__target_periapsis = np.asarray(target_periapsis, dtype=float)
+        self.__parking_apoapsis = self.__parking_periapsis if parking_apoapsis is None else np.asarray(parking_apoapsis, dtype=float)
+        self.__target_apoapsis = self.__target_periapsis if target_apoapsis is None else np.asarray(target_apoapsis, dtype=float)
+
+        assert np.all(self.__parking_apoapsis >= self.__parking_periapsis)
+        assert np.all(self.__target_apoapsis >= self.__target_periapsis)
+
+        parking_radius = origin.get_radius() + origin.get_altitude()
+        target_radius = destination.get_radius() + destination.get_altitude()
+        transfer = transfer_cache.get_transfer(origin, destination, Orbit(parking_radius, parking_radius, origin),
+                                               Orbit(target_radius, target_radius, destination))
+
+        self.__ejection_dv = hyperbolic_deltav(transfer.get_v_soi_origin(), origin.get_mu(), origin.get_r_SOI(),
+                                               origin.get_radius() + self.__parking_periapsis, origin.get_radius() + self.__parking_apoapsis)
+        self.__capture_dv = hyperbolic_deltav(transfer.get_v_soi_destination(), destination.get_mu(), destination.get_r_SOI(),
+                                              destination.get_radius() + self.__target_periapsis, destination.get_radius() + self.__target_apoapsis)
+        self.__ejection_angle = hyperbolic_ejection_angle(transfer.get_v_soi_origin(), origin.get_mu(), origin.get_radius() + self.__parking_periapsis)
+        self.__total_dv = (self.__ejection_dv.reshape(self.__ejection_dv.shape + (1,) * self.__capture_dv.ndim) +
+                           self.__capture_dv.reshape((1,) * self.__ejection_dv.ndim + self.__capture_dv.shape))
+        self.__transfer = transfer
+
+    def get_origin(self):
+        return self.__origin
+
+    def get_destination(self):
+        return self.__destination
+
+    def get_transfer(self):
+        return self.__transfer
+
+    def get_ejection_deltav(self):
+        return self.__ejection_dv
+
+    def get_capture_deltav(self):
+        return self.__capture_dv
+
+    def get_ejection_angle(self):
+        return self.__ejection_angle
+
+    def get_total_deltav(self):
+        return self.__total_dv
+
+    def get_best(self):
+        # (parking orbit index, target orbit index, total Δv) of the cheapest combination, or None if there is
+        # none (no orbits, or every total is NaN)
+        if not np.any(~np.isnan(self.__total_dv)):
+            return None
+
+        index = np.unravel_index(np.nanargmin(self.__total_dv), self.__total_dv.shape)
+        split = self.__ejection_dv.ndim
+        return tuple(int(c) for c in index[:split]), tuple(int(c) for c in index[split:]), float(self.__total_dv[index])
+
+
+def get_storage():
+    global storage
+
+    with _lock:
+        if storage is None:
+            storage = open_storage()
+
+        return storage
+
+
+def set_storage(new_storage):
+    # Switches backend, e.g. set_storage(open_storage("sqlite:///bodies.db")); the catalog reloads on next use
+    global storage, catalog
+
+    with _lock:
+        storage = new_storage
+        catalog = None
+
+
+def get_catalog():
+    global catalog
+
+    with _lock:
+        if catalog is None:
+            catalog = ColumnCatalog(get_storage()) if isinstance(get_storage(), ColumnStorage) else BodyCatalog(get_storage())
+
+        return catalog
+
+
+def get_names():
+    return get_catalog().get_names()
 
 
 def read_body(body_name, give_body=True):
-    if body_name in names:
-        sql = "SELECT * FROM bodies WHERE name = "
-        cursor.execute(sql + "'" + body_name + "'")
-        this_body = cursor.fetchall()[0]
-        cursor.execute(sql + "'" + this_body[5] + "'")
-        host = cursor.fetchall()[0]
+    catalog = get_catalog()
+    row = catalog.get_row(body_name)
 
+    if row and row[5]:
         if give_body:
-            return init_body(this_body, host)
+            return catalog.get(body_name)
 
         else:
-            return this_body
+            return catalog.get_row(body_name)
+
+
+def check_hosts(rows):
+    # Every host must already be in the catalog or be one of rows
+    validate_hosts(rows, get_catalog())
+
+
+def write_bodies(rows):
+    # Adds or replaces bodies in storage, then rebuilds them and anything orbiting them
+    rows = validate_rows(rows)
+    check_hosts(rows)
+    get_storage().write_bodies(rows)
+    get_catalog().refresh([c[0] for c in rows])
+    return len(rows)
+
+
+def import_bodies(path):
+    # Bulk import from a CSV or JSON file in one transaction (EjectionStorage.import_file), then reloads the
+    # catalog; returns (rows written, seconds taken)
+    count, seconds = import_file(get_storage(), path)
+    get_catalog().load()
+    return count, seconds
 
 
 def init_body(body_list, host_list):
@@ -248,10 +859,11 @@ def init_body(body_list, host_list):
 
 
 def get_hosts():
-    sql = "SELECT * FROM bodies WHERE host = ''"
-    cursor.execute(sql)
-    res = cursor.fetchall()
-    return [Body(c[1], c[2], 0, 0, name=c[0], host=None) for c in res]
+    return get_catalog().get_hosts()
+
+
+def get_host_names():
+    return [c.get_name() for c in get_hosts()]
 
 
 def greater(x, y):
@@ -262,24 +874,31 @@ def lesser(x, y):
     return x * (y > x) + y * (x > y)
 
 
-mydb = mysql.connector.connect(
-  host="localhost",
-  user="root",
-  password="",
-  database="bodies"
-)
-cursor = mydb.cursor()
-names = get_names()
-hosts = get_hosts()
-host_names = [c.get_name() for c in hosts]
+def __getattr__(name):
+    # names, hosts and host_names used to be queried at import time; they are now computed on first access
+    if name == "names":
+        return get_names()
+
+    if name == "hosts":
+        return get_hosts()
+
+    if name == "host_names":
+        return get_host_names()
+
+    raise AttributeError("module " + repr(__name__) + " has no attribute " + repr(name))
+
+
+_lock = threading.RLock()
+storage = None
+catalog = None
+transfer_cache = TransferCache(int(os.environ.get("EJECTION_TRANSFER_CACHE", 1024)))
 
 
 if __name__ == "__main__":
-    Earth = read_body("planets.csv", "Earth")
-    Mars = read_body("planets.csv", "Mars")
+    # A single example transfer; EjectionBatch solves files of queries
+    Earth = read_body("Earth")
+    Mars = read_body("Mars")
     parking_orbit = Orbit(Earth.get_radius() + 300000, Earth.get_radius() + 300000, host=Earth)
     final_orbit = Orbit(Mars.get_radius() + 200000, Mars.get_radius() + 200000, host=Mars)
     transfer = Transfer(Earth, Mars, parking_orbit, final_orbit)
     print(transfer)
-
-
@@ -0,0 +1,287 @@
+import math, multiprocessing, sys
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from EjectionCalc import *
+
+# Gravity-assist sequence search. A mission origin -> flyby bodies -> destination is a chain of coplanar
+# conic legs around the common host, with powered flybys (a burn at periapsis) joining them. Bodies are
+# treated as on circular orbits at their SMA, as Transfer does, and phasing is assumed to be available.
+# Each leg is discretised into a grid of ellipses (periapsis at or inside the inner body's orbit, apoapsis
+# at or outside the outer one, so the Hohmann ellipse is always included); the cheapest choice of ellipses
+# along a sequence is found by dynamic programming. Sequences are searched depth first, and a branch is
+# pruned once the Δv it has already used plus the cheapest possible capture reaches the best complete
+# sequence found so far. The first flyby of each branch is searched on its own worker process; workers
+# share the incumbent through a single shared value so that every process prunes against the best so far.
+
+GRID = 8
+
+
+class FlybyPlan:
+    def __init__(self, sequence, departure_dv, flyby_dv, capture_dv, times):
+        self.__sequence = sequence
+        self.__departure_dv = departure_dv
+        self.__flyby_dv = flyby_dv
+        self.__capture_dv = capture_dv
+        self.__times = times
+
+    def get_sequence(self):
+        return self.__sequence
+
+    def get_departure_deltav(self):
+        return self.__departure_dv
+
+    def get_flyby_deltav(self):
+        return self.__flyby_dv
+
+    def get_capture_deltav(self):
+        return self.__capture_dv
+
+    def get_total_deltav(self):
+        return self.__departure_dv + sum(self.__flyby_dv) + self.__capture_dv
+
+    def get_time(self):
+        return sum(self.__times)
+
+    def __str__(self):
+        msg = "Sequence: " + " -> ".join(self.__sequence) + "\n"
+        msg += "Departure Δv: " + str(int(round(self.__departure_dv))) + " m/s\n"
+
+        for name, dv in zip(self.__sequence[1:-1], self.__flyby_dv):
+            msg += name + " flyby Δv: " + str(int(round(dv))) + " m/s\n"
+
+        msg += "Capture Δv: " + str(int(round(self.__capture_dv))) + " m/s\n"
+        msg += "Total Δv: " + str(int(round(self.get_total_deltav()))) + " m/s\n"
+        msg += "Flight Time: " + str(round(self.get_time() / 86400, 1)) + " days"
+
+        return msg
+
+
+class FlybySystem:
+    # Everything the search needs about the host and its satellites, as plain arrays so it can be sent to
+    # worker processes without a catalog or a database connection
+    def __init__(self, bodies, grid=GRID, flyby_limit=math.inf):
+        self.names = [c.get_name() for c in bodies]
+        self.host_mu = bodies[0].get_host().get_mu()
+        self.SMA = np.array([c.get_SMA() for c in bodies])
+        self.mu = np.array([c.get_mu() for c in bodies])
+        self.r_SOI = np.array([c.get_r_SOI() for c in bodies])
+        self.r_low = np.array([c.get_radius() + c.get_altitude() for c in bodies])
+        self.grid = grid
+        self.flyby_limit = flyby_limit
+        self.__legs = {}
+
+    def leg(self, a, b):
+        # For the grid of ellipses from body a to body b: the v∞ vectors (radial, tangential) at both ends
+        # and the flight times
+        leg = self.__legs.get((a, b))
+
+        if leg is None:
+            r1, r2 = self.SMA[a], self.SMA[b]
+            inner, outer = min(r1, r2), max(r1, r2)
+            rp, ra = np.meshgrid(inner * np.linspace(1, 0.4, self.grid), outer * np.linspace(1, 2.5, self.grid))
+            rp, ra = rp.ravel(), ra.ravel()
+
+            mu = self.host_mu
+            semi_major = (rp + ra) / 2
+            e = (ra - rp) / (ra + rp)
+            h = np.sqrt(2 * mu * rp * ra / (rp + ra))
+            direction = 1 if r2 > r1 else -1
+
+            def v_inf(r):
+                v_t = h / r
+                v_r = direction * np.sqrt(np.maximum(mu * (2 / r - 1 / semi_major) - v_t ** 2, 0))
+                return np.stack((v_r, v_t - math.sqrt(mu / r)), axis=-1)
+
+            def mean_anomaly(r):
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    cos_E = np.clip(np.where(e > 0, (1 - r / semi_major) / e, 1), -1, 1)
+
+                E = np.arccos(cos_E)
+                return E - e * np.sin(E)
+
+            times = np.abs(mean_anomaly(r2) - mean_anomaly(r1)) / np.sqrt(mu / semi_major ** 3)
+            leg = self.__legs[(a, b)] = (v_inf(r1), v_inf(r2), times)
+
+        return leg
+
+    def departure(self, a, b):
+        v = np.linalg.norm(self.leg(a, b)[0], axis=-1)
+        return hyperbolic_deltav(v, self.mu[a], self.r_SOI[a], self.r_low[a], self.r_low[a])
+
+    def capture(self, a, b):
+        v = np.linalg.norm(self.leg(a, b)[1], axis=-1)
+        return hyperbolic_deltav(v, self.mu[b], self.r_SOI[b], self.r_low[b], self.r_low[b])
+
+    def flyby(self, a, f, b):
+        # Δv of a powered flyby of f between every ellipse arriving from a (rows) and leaving for b (columns).
+        # The burn is at the lowest safe periapsis, and each half of the hyperbola can turn v∞ by at most
+        # its own deflection; turns beyond that are infeasible (inf).
+        v_in = self.leg(a, f)[1][:, None, :]
+        v_out = self.leg(f, b)[0][None, :, :]
+        speed_in = np.linalg.norm(v_in, axis=-1)
+        speed_out = np.linalg.norm(v_out, axis=-1)
+        mu, rp = self.mu[f], self.r_low[f]
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            turn = np.arccos(np.clip(np.sum(v_in * v_out, axis=-1) / (speed_in * speed_out), -1, 1))
+            reach = np.arcsin(1 / (1 + rp * speed_in ** 2 / mu)) + np.arcsin(1 / (1 + rp * speed_out ** 2 / mu))
+
+        dv = np.abs(np.sqrt(speed_out ** 2 + 2 * mu / rp) - np.sqrt(speed_in ** 2 + 2 * mu / rp))
+        return np.where((turn <= reach) & (dv <= self.flyby_limit), dv, np.inf)
+
+    def capture_bound(self, destination):
+        # The cheapest capture at the destination over every leg that could end there
+        return min(float(np.min(self.capture(c, destination))) for c in range(len(self.names)) if c != destination)
+
+
+def extend(system, cost, sequence, body):
+    # Accumulated cost for each ellipse of the new leg sequence[-1] -> body
+    if len(sequence) == 1:
+        return system.departure(sequence[0], body)
+
+    return np.min(cost[:, None] + system.flyby(sequence[-2], sequence[-1], body), axis=0)
+
+
+def search_branch(system, sequence, cost, destination, max_flybys, incumbent, bound):
+    # Depth-first search below sequence. incumbent is a shared value (or a one-element list) holding the
+    # best total Δv so far; returns the best (total, sequence) found in this branch.
+    best = (math.inf, None)
+
+    # Reaching the destination ends the mission, so it is a leaf and never a flyby
+    if sequence[-1] == destination:
+        return best
+
+    total = float(np.min(extend(system, cost, sequence, destination) + system.capture(sequence[-1], destination)))
+
+    if total < get_value(incumbent):
+        set_value(incumbent, total)
+        best = (total, sequence + [destination])
+
+    if len(sequence) - 1 >= max_flybys:
+        return best
+
+    children = []
+
+    for body in range(len(system.names)):
+        if body == sequence[-1] or body == destination:
+            continue
+
+        new_cost = extend(system, cost, sequence, body)
+        lower = float(np.min(new_cost)) + bound
+
+        if lower < get_value(incumbent):
+            children.append((lower, body, new_cost))
+
+    for lower, body, new_cost in sorted(children, key=lambda c: c[0]):
+        # The incumbent may have improved while the earlier children were searched
+        if lower < get_value(incumbent):
+            found = search_branch(system, sequence + [body], new_cost, destination, max_flybys, incumbent, bound)
+            best = min(best, found, key=lambda c: c[0])
+
+    return best
+
+
+def get_value(incumbent):
+    return incumbent[0] if isinstance(incumbent, list) else incumbent.value
+
+
+def set_value(incumbent, value):
+    if isinstance(incumbent, list):
+        incumbent[0] = min(incumbent[0], value)
+        return
+
+    with incumbent.get_lock():
+        incumbent.value = min(incumbent.value, value)
+
+
+def init_worker(system, incumbent):
+    global worker_system, worker_incumbent
+    worker_system, worker_incumbent = system, incumbent
+
+
+def search_worker(origin, first, destination, max_flybys, bound):
+    cost = extend(worker_system, None, [origin], first)
+    return search_branch(worker_system, [origin, first], cost, destination, max_flybys, worker_incumbent, bound)
+
+
+def evaluate(system, sequence):
+    # Rebuilds the cheapest choice of ellipses for a sequence of body indices, as a FlybyPlan
+    costs = [system.departure(sequence[0], sequence[1])]
+    choices = []
+
+    for i in range(2, len(sequence)):
+        total = costs[-1][:, None] + system.flyby(sequence[i - 2], sequence[i - 1], sequence[i])
+        choices.append(np.argmin(total, axis=0))
+        costs.append(np.min(total, axis=0))
+
+    k = int(np.argmin(costs[-1] + system.capture(sequence[-2], sequence[-1])))
+    picks = [k]
+
+    for choice in choices[::-1]:
+        picks.append(int(choice[picks[-1]]))
+
+    picks = picks[::-1]
+    legs = list(zip(sequence[:-1], sequence[1:]))
+    flyby_dv = [float(system.flyby(sequence[i], sequence[i + 1], sequence[i + 2])[picks[i], picks[i + 1]]) for i in range(len(sequence) - 2)]
+
+    return FlybyPlan([system.names[c] for c in sequence], float(system.departure(*legs[0])[picks[0]]), flyby_dv,
+                     float(system.capture(*legs[-1])[picks[-1]]), [float(system.leg(*c)[2][p]) for c, p in zip(legs, picks)])
+
+
+def search(origin, destination, max_flybys=3, candidates=None, grid=GRID, workers=None, flyby_limit=math.inf):
+    # The cheapest sequence from origin to destination with at most max_flybys flybys of the candidates
+    # (by default every body sharing their host). workers=0 searches in this process.
+    bodies = read_body(origin), read_body(destination)
+
+    for name, body in zip((origin, destination), bodies):
+        if body is None:
+            raise ValueError("unknown body " + repr(name))
+
+    origin, destination = bodies
+
+    if origin is destination:
+        raise ValueError("origin and destination are both " + repr(origin.get_name()))
+
+    if origin.get_host() is not destination.get_host():
+        raise ValueError(origin.get_name() + " and " + destination.get_name() + " orbit different hosts")
+
+    if max_flybys < 0 or grid < 1:
+        raise ValueError("max_flybys must be at least 0 and grid at least 1")
+
+    host = origin.get_host().get_name()
+    names = [c for c in (candidates or get_names()) if c not in (origin.get_name(), destination.get_name())]
+    bodies = [origin, destination] + [c for c in (read_body(c) for c in names) if c and c.get_host().get_name() == host]
+    system = FlybySystem(bodies, grid, flyby_limit)
+    bound = system.capture_bound(1)
+
+    # The direct transfer seeds the incumbent, so the first branches can already be pruned
+    direct = float(np.min(system.departure(0, 1) + system.capture(0, 1)))
+    best = (direct, [0, 1])
+
+    # Every flyby candidate except the destination (index 1)
+    firsts = list(range(2, len(bodies)))
+
+    if max_flybys > 0 and workers == 0:
+        init_worker(system, [direct])
+
+        for first in firsts:
+            best = min(best, search_worker(0, first, 1, max_flybys, bound), key=lambda c: c[0])
+
+    elif max_flybys > 0:
+        incumbent = multiprocessing.Value("d", direct)
+
+        with ProcessPoolExecutor(workers, initializer=init_worker, initargs=(system, incumbent)) as executor:
+            futures = [executor.submit(search_worker, 0, c, 1, max_flybys, bound) for c in firsts]
+
+            for future in futures:
+                best = min(best, future.result(), key=lambda c: c[0])
+
+    return evaluate(system, best[1])
+
+
+worker_system = None
+worker_incumbent = None
+
+
+if __name__ == "__main__":
+    print(search(sys.argv[1], sys.argv[2], int(sys.argv[3]) if len(sys.argv) > 3 else 3))
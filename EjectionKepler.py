@@ -0,0 +1,154 @@
+import math
+import numpy as np
+from EjectionCalc import body_arrays, transfer_matrix
+
+# Bodies are treated as coplanar. Unless told otherwise every orbit has its periapsis along the
+# reference direction (longitude 0) and every body is at periapsis at t = 0, since the bodies table
+# stores no orientation or epoch.
+
+
+def eccentric_anomaly(M, e, tol=1e-12, max_iter=50):
+    # Halley's method on Kepler's equation, E - e sin(E) = M, for every element of M and e at once.
+    # From Danby's starting value it converges cubically, in three or four steps for most orbits; after
+    # each step only the elements that have not yet converged are iterated again.
+    M, e = np.broadcast_arrays(np.asarray(M, dtype=float), np.asarray(e, dtype=float))
+    shape = M.shape
+    M = np.remainder(M.ravel(), 2 * math.pi)
+    e = e.ravel()
+    E = np.where(e < 0.8, M + e * np.sin(M), M + 0.85 * e * np.sign(np.sin(M)))
+    active = np.arange(len(E))
+
+    for _ in range(max_iter):
+        E_active, e_active = E[active], e[active]
+        e_sin, e_cos = e_active * np.sin(E_active), e_active * np.cos(E_active)
+        f = E_active - e_sin - M[active]
+        f_prime = 1 - e_cos
+        dE = 2 * f * f_prime / (2 * f_prime ** 2 - f * e_sin)
+        E[active] = E_active - dE
+
+        active = active[np.abs(dE) >= tol]
+
+        if not len(active):
+            break
+
+    return E.reshape(shape)
+
+
+def true_anomaly(M, e, tol=1e-12):
+    E = eccentric_anomaly(M, e, tol)
+    e = np.asarray(e, dtype=float)
+    return 2 * np.arctan2(np.sqrt(1 + e) * np.sin(E / 2), np.sqrt(1 - e) * np.cos(E / 2))
+
+
+def true_longitude(apoapsis, periapsis, host_mu, t, mean_anomaly=0, longitude=0):
+    # Angle of each body from the reference direction at times t, broadcast over bodies and times
+    apoapsis, periapsis, host_mu, t = (np.asarray(c, dtype=float) for c in (apoapsis, periapsis, host_mu, t))
+
+    a = (apoapsis + periapsis) / 2
+    e = (apoapsis - periapsis) / (apoapsis + periapsis)
+    n = np.sqrt(host_mu / a ** 3)
+
+    return true_anomaly(mean_anomaly + n * t, e) + longitude
+
+
+def state(apoapsis, periapsis, host_mu, t, mean_anomaly=0, longitude=0):
+    # Position and velocity (x, y, vx, vy) at times t, broadcast over bodies and times
+    apoapsis, periapsis, host_mu, t = (np.asarray(c, dtype=float) for c in (apoapsis, periapsis, host_mu, t))
+
+    a = (apoapsis + periapsis) / 2
+    e = (apoapsis - periapsis) / (apoapsis + periapsis)
+    b = a * np.sqrt(1 - e ** 2)
+    n = np.sqrt(host_mu / a ** 3)
+
+    E = eccentric_anomaly(mean_anomaly + n * t, e)
+    cos_E, sin_E = np.cos(E), np.sin(E)
+    E_dot = n / (1 - e * cos_E)
+
+    x, y = a * (cos_E - e), b * sin_E
+    vx, vy = -a * sin_E * E_dot, b * cos_E * E_dot
+
+    cos_w, sin_w = np.cos(longitude), np.sin(longitude)
+
+    return (x * cos_w - y * sin_w, x * sin_w + y * cos_w,
+            vx * cos_w - vy * sin_w, vx * sin_w + vy * cos_w)
+
+
+def body_state(body, t, mean_anomaly=0, longitude=0):
+    return state(body.get_apoapsis(), body.get_periapsis(), body.get_host().get_mu(), t, mean_anomaly, longitude)
+
+
+def wrap(angle):
+    # Into [-π, π)
+    return np.remainder(angle + math.pi, 2 * math.pi) - math.pi
+
+
+def launch_windows(origins, destinations, phase_angle, count=5, start=0, samples=64, iterations=40):
+    # The next count departure times after start at which each destination leads its origin by
+    # phase_angle (the phase angle of Transfer). origins and destinations are tuples of arrays
+    # (apoapsis, periapsis, host_mu, mean anomaly at t = 0, longitude of periapsis), one element per pair.
+    # The relative angle is sampled samples times per synodic period, and every crossing is then bisected
+    # for all pairs at once. Returns a (pairs, count) array of times, NaN where a pair has no window
+    # (bodies with the same period never change phase).
+    origins = [np.asarray(c, dtype=float) for c in origins]
+    destinations = [np.asarray(c, dtype=float) for c in destinations]
+    phase_angle = np.asarray(phase_angle, dtype=float)
+    origins, destinations = np.broadcast_arrays(*origins), np.broadcast_arrays(*destinations)
+
+    def period(apoapsis, periapsis, host_mu, *_):
+        return 2 * math.pi * np.sqrt(((apoapsis + periapsis) / 2) ** 3 / host_mu)
+
+    with np.errstate(divide="ignore"):
+        synodic = 1 / np.abs(1 / period(*origins) - 1 / period(*destinations))
+
+    def offset(t, index=slice(None)):
+        # Destination lead over origin, minus the phase angle, wrapped; it falls through zero at each window
+        o = [c[index] for c in origins]
+        d = [c[index] for c in destinations]
+        return wrap(true_longitude(d[0], d[1], d[2], t, d[3], d[4]) - true_longitude(o[0], o[1], o[2], t, o[3], o[4]) -
+                    phase_angle[index])
+
+    steps = samples * (count + 1)
+    finite = np.isfinite(synodic)
+    times = start + np.where(finite, synodic, 0)[:, None] * np.linspace(0, count + 1, steps + 1)[None, :]
+    values = offset(times.T).T if len(times) else times
+
+    # The offset decreases through zero at a window when the origin is faster (an inner origin) and
+    # increases through it otherwise; jumps of more than π are just the wrap, not a crossing
+    step = values[:, 1:] - values[:, :-1]
+    crossing = (np.sign(values[:, :-1]) != np.sign(values[:, 1:])) & (np.abs(step) < math.pi) & finite[:, None]
+    crossing &= np.cumsum(crossing, axis=1) <= count
+    pair, index = np.nonzero(crossing)
+
+    low, high = times[pair, index], times[pair, index + 1]
+    low_sign = np.sign(values[pair, index])
+
+    for _ in range(iterations):
+        middle = (low + high) / 2
+        same = np.sign(offset(middle, pair)) == low_sign
+        low = np.where(same, middle, low)
+        high = np.where(same, high, middle)
+
+    windows = np.full((len(synodic), count), np.nan)
+    order = np.cumsum(crossing, axis=1)[pair, index] - 1
+    windows[pair, order] = (low + high) / 2
+    return windows
+
+
+def body_elements(body, mean_anomaly=0, longitude=0):
+    return body.get_apoapsis(), body.get_periapsis(), body.get_host().get_mu(), mean_anomaly, longitude
+
+
+def next_windows(origin, destination, phase_angle, count=5, start=0):
+    # Launch windows for a single pair of bodies
+    return launch_windows(tuple(np.atleast_1d(c) for c in body_elements(origin)), tuple(np.atleast_1d(c) for c in body_elements(destination)),
+                          np.atleast_1d(phase_angle), count, start)[0]
+
+
+def window_timeline(bodies, count=5, start=0):
+    # The next count windows for every ordered pair of bodies sharing a host, using the phase angles of
+    # transfer_matrix. Returns (origin indices, destination indices, (pairs, count) window times).
+    phase = transfer_matrix(*body_arrays(bodies))[0]
+    i, j = np.nonzero(~np.isnan(phase))
+    elements = [np.array(c) for c in zip(*(body_elements(c) for c in bodies))]
+
+    return i, j, launch_windows(tuple(c[i] for c in elements), tuple(c[j] for c in elements), phase[i, j], count, start)
@@ -0,0 +1,264 @@
+import argparse, hashlib, os, sys, tempfile, threading, time, zipfile
+import numpy as np
+from EjectionCalc import *
+from EjectionStorage import TRANSFER_COLUMNS
+from EjectionProfile import timed
+
+# The transfer matrix, kept in storage so it is read rather than recomputed. Each body's catalog
+# fingerprint is stored alongside the pairs; bodies whose fingerprint changed (including everything
+# orbiting a changed host), appeared or disappeared are stale, and only their rows and columns of the
+# matrix are recomputed. Storage that cannot hold the matrix (CSV and JSON files) keeps it in memory.
+# The matrix and its fingerprints can also be kept in an .npz snapshot beside the catalog, which loads
+# far faster than the transfers table and survives restarts for file storage. A snapshot tagged with the
+# current catalog's digest is taken whole; any other is checked against the catalog the same way, so a
+# snapshot from an older catalog only costs the pairs that changed.
+
+SNAPSHOT_FORMAT = 1
+
+
+class TransferStore:
+    # Origins and destinations are also kept as codes into a name table (__index), so the pairs of stale
+    # bodies are found with one boolean mask rather than a name lookup per pair.
+    def __init__(self, storage, catalog, snapshot=None):
+        self.__storage = storage
+        self.__catalog = catalog
+        self.__snapshot = snapshot
+        self.__snapshot_current = False
+        self.__snapshot_version = None
+        self.__catalog_version = None
+        self.__fingerprints = None
+        self.__pairs = None
+        self.__index = {}
+        self.__codes = None
+        self.__persistent = True
+        self.__lock = threading.Lock()
+
+    def __load(self):
+        if self.__snapshot and os.path.exists(self.__snapshot):
+            try:
+                self.__fingerprints, self.__pairs, self.__snapshot_version, (names, self.__codes) = read_snapshot(self.__snapshot)
+                self.__index = dict(zip(names, range(len(names))))
+                self.__snapshot_current = True
+                return
+
+            except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+                pass
+
+        try:
+            self.__fingerprints, rows = self.__storage.fetch_transfers()
+
+        except NotImplementedError:
+            self.__persistent = False
+            self.__fingerprints, rows = {}, []
+
+        self.__pairs = pairs_from_rows(rows)
+        self.__codes = [self.__encode(c.tolist()) for c in self.__pairs[:2]]
+
+    def __encode(self, names):
+        return np.fromiter((self.__index.setdefault(c, len(self.__index)) for c in names), dtype=np.int64, count=len(names))
+
+    @timed("TransferStore.update")
+    def update(self, chunk=None, callback=None, cancel=None):
+        # Brings the matrix up to date with the catalog and returns the number of pairs recomputed. callback,
+        # if given, is passed the pairs as they become available: those still current first, then the
+        # recomputed ones, chunk origins at a time (all at once if chunk is None). cancel, a threading.Event,
+        # is checked between chunks; once it is set the update stops, keeps the matrix as it was and returns None.
+        with self.__lock:
+            if self.__pairs is None:
+                self.__load()
+
+            # Nothing to look at if the catalog has not changed since the last update
+            version = self.__catalog.get_version()
+            stale = set()
+
+            if version != self.__catalog_version:
+                names = [c for c in self.__catalog.get_names() if self.__catalog.get(c) is not None]
+                fingerprints = {c: self.__catalog.get_fingerprint(c) for c in names}
+
+                # A snapshot tagged with this very catalog is current as a whole
+                if catalog_version(fingerprints) != self.__snapshot_version:
+                    stale = {c for c in names if self.__fingerprints.get(c) != fingerprints[c]}
+                    stale.update(c for c in self.__fingerprints if c not in fingerprints)
+
+            if not stale:
+                self.__catalog_version = version
+                self.__save_snapshot()
+
+                if callback is not None:
+                    callback(self.__pairs)
+
+                return 0
+
+            flags = np.zeros(len(self.__index), dtype=bool)
+            flags[[self.__index[c] for c in stale if c in self.__index]] = True
+            keep = ~(flags[self.__codes[0]] | flags[self.__codes[1]])
+
+            if callback is not None:
+                callback([c[keep] for c in self.__pairs])
+
+            result = self.__calculate(names, stale, chunk, callback, cancel)
+
+            if result is None:
+                return None
+
+            new_pairs, new_codes = result
+            rows = list(zip(*(c.tolist() for c in new_pairs)))
+
+            if self.__persistent:
+                try:
+                    self.__storage.write_transfers(sorted(stale), rows, {c: fingerprints[c] for c in stale if c in fingerprints})
+
+                except NotImplementedError:
+                    self.__persistent = False
+
+            self.__pairs = [np.concatenate((c[keep], n)) for c, n in zip(self.__pairs, new_pairs)]
+            self.__codes = [np.concatenate((c[keep], n)) for c, n in zip(self.__codes, new_codes)]
+            self.__fingerprints = fingerprints
+            self.__catalog_version = version
+            self.__snapshot_version = None
+            self.__snapshot_current = False
+            self.__save_snapshot()
+            return len(rows)
+
+    def __save_snapshot(self):
+        if self.__snapshot and not self.__snapshot_current:
+            write_snapshot(self.__snapshot, self.__fingerprints, self.__pairs)
+            self.__snapshot_current = True
+
+    def __calculate(self, names, stale, chunk=None, callback=None, cancel=None):
+        # Rows of the stale bodies against everything, then the columns of the stale bodies for every other origin.
+        # Returns the new pairs and their origin and destination codes, or None if cancelled.
+        bodies = [self.__catalog.get(c) for c in names]
+        arrays = body_arrays(bodies)
+        changed = np.array([i for i, c in enumerate(names) if c in stale], dtype=int)
+        unchanged = np.array([i for i, c in enumerate(names) if c not in stale], dtype=int)
+        codes = self.__encode(names)
+        names = np.array(names, dtype=object)
+        pairs = [[] for _ in range(9)]
+
+        for o, d in ((changed, None), (unchanged, changed)):
+            if not len(o) or (d is not None and not len(d)):
+                continue
+
+            for start in range(0, len(o), chunk or len(o)):
+                if cancel is not None and cancel.is_set():
+                    return None
+
+                block = o[start:start + (chunk or len(o))]
+                matrix = transfer_matrix(*arrays, origins=block, destinations=d)
+                i, j = np.nonzero(~np.isnan(matrix[2]))
+                origins, destinations = block[i], j if d is None else d[j]
+                columns = [names[origins], names[destinations]] + [c[i, j] for c in matrix]
+
+                if callback is not None:
+                    callback(columns)
+
+                for pair, column in zip(pairs, columns + [codes[origins], codes[destinations]]):
+                    pair.append(column)
+
+        pairs = [np.concatenate(c) if c else np.empty(0, dtype=object if k < 2 else np.int64 if k > 6 else float) for k, c in enumerate(pairs)]
+        return pairs[:7], pairs[7:]
+
+    def get_pairs(self):
+        # [origins, destinations, phase angle, ejection angle, ejection Δv, capture Δv, transfer time], one entry per pair
+        self.update()
+        return self.__pairs
+
+    def is_persistent(self):
+        return self.__persistent
+
+
+def pairs_from_rows(rows):
+    columns = list(zip(*rows)) if rows else [()] * 7
+    return ([np.array(c, dtype=object) for c in columns[:2]] +
+            [np.array(c, dtype=float) for c in columns[2:]])
+
+
+def catalog_version(fingerprints):
+    # One digest for a whole catalog, to tag snapshots; unlike BodyCatalog.get_version it is the same in every process
+    return hashlib.blake2b(repr(sorted(fingerprints.items())).encode(), digest_size=16).hexdigest()
+
+
+def write_snapshot(path, fingerprints, pairs, compress=False):
+    # Names are stored once, as a string table, with the pairs as indices into it; numbers stay float64.
+    # Written to a temporary file and swapped in, so a reader never sees half a snapshot.
+    names = list(fingerprints)
+    names += [c for c in dict.fromkeys(np.concatenate(pairs[:2]).tolist()) if c not in fingerprints]
+    index = dict(zip(names, range(len(names))))
+
+    arrays = {"format": np.array(SNAPSHOT_FORMAT), "version": np.array(catalog_version(fingerprints)),
+              "names": np.array(names, dtype=str), "fingerprints": np.array([fingerprints.get(c, "") for c in names], dtype=str)}
+
+    for column, values in zip(TRANSFER_COLUMNS, pairs):
+        arrays[column] = np.fromiter((index[c] for c in values.tolist()), dtype=np.int32, count=len(values)) if column in ("origin", "destination") else values
+
+    directory = os.path.dirname(os.path.abspath(path))
+
+    with tempfile.NamedTemporaryFile("wb", dir=directory, suffix=".tmp", delete=False) as f:
+        (np.savez_compressed if compress else np.savez)(f, **arrays)
+
+    os.replace(f.name, path)
+
+
+def read_snapshot(path):
+    # (fingerprints, pairs as from TransferStore.get_pairs, catalog version, (names, origins and destinations
+    # as indices into names))
+    with np.load(path) as data:
+        if int(data["format"]) != SNAPSHOT_FORMAT:
+            raise ValueError(path + ": unsupported snapshot format " + str(int(data["format"])))
+
+        names = data["names"].astype(object)
+        fingerprints = dict(zip(names.tolist(), data["fingerprints"].tolist()))
+        codes = [data["origin"].astype(np.int64), data["destination"].astype(np.int64)]
+        pairs = [names[codes[0]], names[codes[1]]] + [data[c] for c in TRANSFER_COLUMNS[2:]]
+        return {c: v for c, v in fingerprints.items() if v}, pairs, str(data["version"]), (names.tolist(), codes)
+
+
+def snapshot_path(storage):
+    # $EJECTION_SNAPSHOT, or next to the catalog file for storage that has one
+    if os.environ.get("EJECTION_SNAPSHOT"):
+        return os.environ["EJECTION_SNAPSHOT"]
+
+    path = getattr(storage, "get_path", lambda: None)()
+    return None if path in (None, ":memory:") else path.rstrip("/\\") + ".transfers.npz"
+
+
+def get_transfer_store():
+    # One store per catalog; a new storage or a reloaded catalog gets a fresh one
+    global store
+
+    with _lock:
+        catalog = get_catalog()
+
+        if store is None or store[0] is not catalog:
+            store = (catalog, TransferStore(get_storage(), catalog, snapshot_path(get_storage())))
+
+        return store[1]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bring the transfer matrix up to date and save it as a snapshot")
+    parser.add_argument("--storage", help="storage URL, by default $EJECTION_STORAGE")
+    parser.add_argument("--snapshot", help="snapshot file, by default $EJECTION_SNAPSHOT or next to the catalog file")
+    args = parser.parse_args(argv)
+
+    set_storage(open_storage(args.storage))
+    path = args.snapshot or snapshot_path(get_storage())
+
+    if path is None:
+        parser.error("this storage has no file to keep a snapshot beside; give --snapshot")
+
+    start = time.perf_counter()
+    store = TransferStore(get_storage(), get_catalog(), path)
+    count = store.update()
+    print(path + ": " + str(len(store.get_pairs()[0])) + " pairs, " + str(count) + " recomputed in " +
+          str(round(time.perf_counter() - start, 3)) + " s", file=sys.stderr)
+    return 0
+
+
+_lock = threading.Lock()
+store = None
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,149 @@
+import math
+import numpy as np
+from EjectionKepler import body_state
+
+
+def stumpff(z):
+    # Stumpff functions C(z) and S(z), with series expansions close to z = 0
+    z = np.asarray(z, dtype=float)
+    s = np.sqrt(np.abs(z))
+
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        C = np.where(z > 0, (1 - np.cos(s)) / z, (np.cosh(s) - 1) / -z)
+        S = np.where(z > 0, (s - np.sin(s)) / s ** 3, (np.sinh(s) - s) / s ** 3)
+
+    small = np.abs(z) < 1e-3
+    C = np.where(small, 1 / 2 - z / 24 + z ** 2 / 720, C)
+    S = np.where(small, 1 / 6 - z / 120 + z ** 2 / 5040, S)
+
+    return C, S
+
+
+def lambert(x1, y1, x2, y2, tof, mu, iterations=60):
+    # Prograde, zero-revolution Lambert problem in the orbital plane, solved for every element at once
+    # with the universal-variable formulation. The time-of-flight equation is monotonic in z, so it is
+    # bracketed and bisected in lockstep across the whole batch. Returns the velocity at both ends.
+    x1, y1, x2, y2, tof = np.broadcast_arrays(*(np.asarray(c, dtype=float) for c in (x1, y1, x2, y2, tof)))
+
+    r1 = np.hypot(x1, y1)
+    r2 = np.hypot(x2, y2)
+    cos_theta = np.clip((x1 * x2 + y1 * y2) / (r1 * r2), -1, 1)
+    theta = np.arccos(cos_theta)
+    theta = np.where(x1 * y2 - y1 * x2 < 0, 2 * math.pi - theta, theta)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        A = np.sin(theta) * np.sqrt(r1 * r2 / (1 - cos_theta))
+
+    def y_of(z):
+        C, S = stumpff(z)
+
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            return r1 + r2 + A * (z * S - 1) / np.sqrt(C), C, S
+
+    def tof_error(z):
+        y, C, S = y_of(z)
+
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            error = (y / C) ** 1.5 * S + A * np.sqrt(y) - math.sqrt(mu) * tof
+
+        # Where y < 0 the trial orbit does not exist; every valid z is larger
+        return np.where(y < 0, -np.inf, error)
+
+    low = np.full(tof.shape, -4 * math.pi ** 2)
+    high = np.full(tof.shape, 4 * math.pi ** 2 * (1 - 1e-12))
+
+    for _ in range(12):
+        too_high = tof_error(low) > 0
+
+        if not too_high.any():
+            break
+
+        low = np.where(too_high, low * 4, low)
+
+    for _ in range(iterations):
+        z = (low + high) / 2
+        positive = tof_error(z) > 0
+        high = np.where(positive, z, high)
+        low = np.where(positive, low, z)
+
+    z = (low + high) / 2
+    y, C, S = y_of(z)
+    # Pairs with no zero-revolution solution (the flight time needs extra revolutions) end up
+    # pinned to an edge of the bracket with a large residual
+    converged = np.abs(tof_error(z)) <= 1e-6 * math.sqrt(mu) * tof
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        f = 1 - y / r1
+        g = A * np.sqrt(y / mu)
+        g_dot = 1 - y / r2
+
+        v1 = ((x2 - f * x1) / g, (y2 - f * y1) / g)
+        v2 = ((g_dot * x2 - x1) / g, (g_dot * y2 - y1) / g)
+
+    bad = ~(tof > 0) | ~converged | ~np.isfinite(g) | (g == 0)
+    v1 = tuple(np.where(bad, np.nan, c) for c in v1)
+    v2 = tuple(np.where(bad, np.nan, c) for c in v2)
+
+    return v1, v2
+
+
+def porkchop(origin, destination, departures, arrivals, origin_phase=(0, 0), destination_phase=(0, 0)):
+    # Departure C3 (m²/s²) and arrival v∞ (m/s) for every (departure, arrival) pair of epochs in seconds.
+    # The phase tuples are (mean anomaly at t = 0, longitude of periapsis) for each body.
+    assert origin.get_host().get_name() == destination.get_host().get_name()
+
+    departures = np.asarray(departures, dtype=float)
+    arrivals = np.asarray(arrivals, dtype=float)
+    mu = origin.get_host().get_mu()
+
+    x1, y1, vx1, vy1 = body_state(origin, departures, *origin_phase)
+    x2, y2, vx2, vy2 = body_state(destination, arrivals, *destination_phase)
+
+    tof = arrivals[None, :] - departures[:, None]
+    v1, v2 = lambert(x1[:, None], y1[:, None], x2[None, :], y2[None, :], tof, mu)
+
+    c3 = (v1[0] - vx1[:, None]) ** 2 + (v1[1] - vy1[:, None]) ** 2
+    v_inf = np.hypot(v2[0] - vx2[None, :], v2[1] - vy2[None, :])
+
+    return c3, v_inf
+
+
+def contour_segments(grid, level):
+    # Marching squares over the whole grid at once. Returns an array of segments (i0, j0, i1, j1)
+    # in fractional grid indices, where i indexes rows and j indexes columns.
+    g = np.asarray(grid, dtype=float) - level
+    a, b, c, d = g[:-1, :-1], g[:-1, 1:], g[1:, 1:], g[1:, :-1]
+    i, j = np.mgrid[0:g.shape[0] - 1, 0:g.shape[1] - 1].astype(float)
+
+    def crossing(p, q):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.isfinite(p) & np.isfinite(q) & ((p < 0) != (q < 0)), p / (p - q)
+
+    top, t_top = crossing(a, b)
+    right, t_right = crossing(b, c)
+    bottom, t_bottom = crossing(d, c)
+    left, t_left = crossing(a, d)
+
+    masks = np.stack((top, right, bottom, left))
+    rows = np.stack((i, i + t_right, i + 1, i + t_left))
+    cols = np.stack((j + t_top, j + 1, j + t_bottom, j))
+
+    count = masks.sum(axis=0)
+    first = np.argmax(masks, axis=0)
+    last = 3 - np.argmax(masks[::-1], axis=0)
+
+    pairs = [(count == 2, first, last), (count == 4, np.zeros_like(first), np.ones_like(first)),
+             (count == 4, np.full_like(first, 2), np.full_like(first, 3))]
+    segments = []
+
+    for cells, start, end in pairs:
+        start, end = start[cells], end[cells]
+        cell_rows, cell_cols = rows[:, cells], cols[:, cells]
+        k = np.arange(len(start))
+        segments.append(np.column_stack((cell_rows[start, k], cell_cols[start, k], cell_rows[end, k], cell_cols[end, k])))
+
+    return np.concatenate(segments)
+
+
+def hohmann_time(origin, destination):
+    return math.pi * math.sqrt(((origin.get_SMA() + destination.get_SMA()) / 2) ** 3 / origin.get_host().get_mu())
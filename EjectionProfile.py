@@ -0,0 +1,112 @@
+import atexit, contextlib, functools, json, os, random, threading, time
+
+# Opt-in timing of queries, computations and redraws. While disabled, a timed function costs one extra
+# call and a flag check, and measure() hands back a shared do-nothing context manager.
+# Set EJECTION_PROFILE=path to enable profiling at start-up and write the statistics to path on exit.
+
+SAMPLES = 10000
+
+enabled = False
+_stats = {}
+_lock = threading.Lock()
+_NOTHING = contextlib.nullcontext()
+
+
+class Timer:
+    __slots__ = ("__name", "__start")
+
+    def __init__(self, name):
+        self.__name = name
+
+    def __enter__(self):
+        self.__start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record(self.__name, time.perf_counter() - self.__start)
+
+
+def enable(dump_path=None):
+    global enabled
+    enabled = True
+
+    if dump_path:
+        atexit.register(dump, dump_path)
+
+
+def disable():
+    global enabled
+    enabled = False
+
+
+def reset():
+    with _lock:
+        _stats.clear()
+
+
+def record(name, seconds):
+    # Counts and totals are exact; percentiles come from a reservoir sample of at most SAMPLES durations
+    with _lock:
+        stat = _stats.get(name)
+
+        if stat is None:
+            stat = _stats[name] = [0, 0.0, 0.0, []]
+
+        stat[0] += 1
+        stat[1] += seconds
+        stat[2] = max(stat[2], seconds)
+
+        if len(stat[3]) < SAMPLES:
+            stat[3].append(seconds)
+
+        else:
+            index = random.randrange(stat[0])
+
+            if index < SAMPLES:
+                stat[3][index] = seconds
+
+
+def measure(name):
+    return Timer(name) if enabled else _NOTHING
+
+
+def timed(name):
+    def decorator(function):
+        @functools.wraps(function)
+        def timed_function(*args, **kwargs):
+            if not enabled:
+                return function(*args, **kwargs)
+
+            start = time.perf_counter()
+
+            try:
+                return function(*args, **kwargs)
+
+            finally:
+                record(name, time.perf_counter() - start)
+
+        return timed_function
+
+    return decorator
+
+
+def percentile(samples, fraction):
+    return samples[min(len(samples) - 1, int(fraction * len(samples)))] if samples else 0.0
+
+
+def get_stats():
+    with _lock:
+        stats = {name: (c[0], c[1], c[2], sorted(c[3])) for name, c in _stats.items()}
+
+    return {name: {"count": count, "total": total, "mean": total / count, "p50": percentile(samples, 0.5),
+                   "p90": percentile(samples, 0.9), "p99": percentile(samples, 0.99), "max": longest}
+            for name, (count, total, longest, samples) in stats.items()}
+
+
+def dump(path):
+    with open(path, "w") as f:
+        json.dump(get_stats(), f, indent=2, sort_keys=True)
+
+
+if os.environ.get("EJECTION_PROFILE"):
+    enable(os.environ["EJECTION_PROFILE"])
@@ -0,0 +1,139 @@
+import heapq, math, sys, threading
+import numpy as np
+from EjectionCalc import *
+
+# The k cheapest destinations from a body, without the whole transfer matrix. Bodies are indexed by host
+# and sorted by SMA. The ejection Δv of a Hohmann transfer grows monotonically with the distance (in
+# SMA) between origin and destination, and the capture Δv is never negative, so the ejection Δv at the
+# nearest SMA of a block is a lower bound on the total Δv of every body further out. Blocks are scanned
+# outwards from the origin, cheaper side first, and the scan stops once neither side can beat the k-th
+# best total found so far. A longest flight time is a hard SMA limit, since the Hohmann time grows with
+# the destination's SMA.
+
+QUERY_BLOCK = 256
+
+
+class DestinationIndex:
+    def __init__(self, bodies):
+        # bodies is a BodyArray with names and hosts (host names, or any other label per host)
+        # Hosts are numbered in order of appearance; np.unique would sort a million strings
+        hosts = np.asarray(bodies.get_hosts(), dtype=object)
+        host_codes = {}
+        codes = np.fromiter((host_codes.setdefault(c, len(host_codes)) for c in hosts.tolist()), dtype=int, count=len(hosts))
+        order = np.lexsort((bodies.get_SMA(), codes))
+
+        self.__names = np.asarray(bodies.get_names(), dtype=object)[order]
+        self.__mass = bodies.get_mass()[order]
+        self.__radius = bodies.get_radius()[order]
+        self.__SMA = bodies.get_SMA()[order]
+        self.__altitude = bodies.get_altitude()[order]
+        self.__host_mu = bodies.get_host_mu()[order]
+        self.__mu = bodies.get_mu()[order]
+        self.__r_SOI = bodies.get_r_SOI()[order]
+
+        bounds = np.searchsorted(codes[order], np.arange(len(host_codes) + 1))
+        self.__ranges = {c: (int(bounds[i]), int(bounds[i + 1])) for c, i in host_codes.items()}
+        self.__hosts = hosts[order]
+        self.__positions = dict(zip(self.__names.tolist(), range(len(self.__names))))
+        self.__evaluated = 0
+
+    def __len__(self):
+        return len(self.__names)
+
+    def get_evaluated(self):
+        # Destinations evaluated by the last query
+        return self.__evaluated
+
+    def __ejection_bound(self, p, r2):
+        # Ejection Δv of the transfer from body p to a circular orbit at r2, without the absolute value of
+        # hyperbolic_deltav so that it keeps growing with the hyperbolic excess speed; never above the real Δv
+        r1, host_mu = self.__SMA[p], self.__host_mu[p]
+        v_soi = abs(math.sqrt(host_mu / r1) - math.sqrt(host_mu * (2 / r1 - 2 / (r1 + r2))))
+        mu, r_orbit = self.__mu[p], self.__radius[p] + self.__altitude[p]
+        return max(math.sqrt(max(v_soi ** 2 + 2 * mu * (1 / r_orbit - 1 / self.__r_SOI[p]), 0)) - math.sqrt(mu / r_orbit), 0)
+
+    def __evaluate(self, p, start, end):
+        # transfer_matrix for the origin against the sorted bodies start .. end - 1
+        index = np.concatenate(([p], np.arange(start, end)))
+        matrix = transfer_matrix(self.__mass[index], self.__radius[index], self.__SMA[index], self.__altitude[index],
+                                 self.__host_mu[index], origins=[0], destinations=np.arange(1, len(index)))
+        return index[1:], [c[0] for c in matrix]
+
+    def cheapest(self, origin, k=10, max_time=None, max_deltav=None):
+        # [(destination, total Δv, ejection Δv, capture Δv, transfer time, phase angle)], cheapest first
+        p = self.__positions.get(origin)
+
+        # Hosts can be in the index (column catalogs include every row) but orbit nothing
+        if p is None or np.isnan(self.__host_mu[p]):
+            raise ValueError("unknown body " + repr(origin))
+        start, end = self.__ranges[self.__hosts[p]]
+        self.__evaluated = 0
+
+        if max_time is not None:
+            r_max = 2 * (self.__host_mu[p] * (max_time / math.pi) ** 2) ** (1 / 3) - self.__SMA[p]
+            end = start + int(np.searchsorted(self.__SMA[start:end], r_max, side="right"))
+
+        # heap holds the best k as (-total, position, row), so heap[0] is the k-th best
+        heap = []
+        left, right = min(p, end), p + 1
+
+        while True:
+            limit = -heap[0][0] if len(heap) == k else math.inf
+            limit = limit if max_deltav is None else min(limit, max_deltav)
+
+            bound_left = self.__ejection_bound(p, self.__SMA[left - 1]) if left > start else math.inf
+            bound_right = self.__ejection_bound(p, self.__SMA[right]) if right < end else math.inf
+
+            if min(bound_left, bound_right) >= limit:
+                break
+
+            if bound_left <= bound_right:
+                block = (max(start, left - QUERY_BLOCK), left)
+                left = block[0]
+
+            else:
+                block = (right, min(end, right + QUERY_BLOCK))
+                right = block[1]
+
+            index, (phase_angle, _, ejection_dv, capture_dv, transfer_time) = self.__evaluate(p, *block)
+            total = ejection_dv + capture_dv
+            self.__evaluated += len(index)
+
+            for i in np.nonzero(total < limit)[0]:
+                entry = (-float(total[i]), int(index[i]), (self.__names[index[i]], float(total[i]), float(ejection_dv[i]),
+                                                           float(capture_dv[i]), float(transfer_time[i]), float(phase_angle[i])))
+
+                if len(heap) < k:
+                    heapq.heappush(heap, entry)
+
+                elif entry[0] > heap[0][0]:
+                    heapq.heapreplace(heap, entry)
+
+        return [c[2] for c in sorted(heap, key=lambda c: (-c[0], c[1]))]
+
+
+def get_destination_index():
+    # Rebuilt when the catalog is replaced or changes, like the transfer store and route planner
+    global destinations
+
+    with _lock:
+        catalog = get_catalog()
+
+        if destinations is None or destinations[0] is not catalog or destinations[1] != catalog.get_version():
+            destinations = (catalog, catalog.get_version(), DestinationIndex(catalog.get_arrays()))
+
+        return destinations[2]
+
+
+def cheapest_destinations(origin, k=10, max_time=None, max_deltav=None):
+    return get_destination_index().cheapest(origin, k, max_time, max_deltav)
+
+
+_lock = threading.Lock()
+destinations = None
+
+
+if __name__ == "__main__":
+    for destination, total, ejection_dv, capture_dv, transfer_time, _ in cheapest_destinations(sys.argv[1], int(sys.argv[2]) if len(sys.argv) > 2 else 10):
+        print(destination + ": " + str(int(round(total))) + " m/s (" + str(int(round(ejection_dv))) + " + " + str(int(round(capture_dv))) +
+              "), " + str(round(transfer_time / 86400, 1)) + " days")
@@ -0,0 +1,218 @@
+import heapq, itertools, math, sys, threading
+import numpy as np
+from EjectionCalc import *
+
+# Routes between any two bodies in the same star system, chained from patched-conic legs. Every body is
+# a node (a low orbit around it, at its default altitude) with two kinds of edge:
+#   siblings      bodies with the same host, costed like Transfer (ejection + capture Δv)
+#   host <-> moon a Hohmann ellipse inside the host's SOI between the moon's orbit and the host's low orbit
+# so Earth -> Io is Earth -> Jupiter (interplanetary), then Jupiter -> Io. Edge costs are cached per host
+# and keyed by catalog fingerprints, so they are only recomputed after the bodies involved change.
+
+
+class Route:
+    def __init__(self, legs):
+        # legs: [(from, to, ejection Δv, capture Δv, time)]
+        self.__legs = legs
+
+    def get_legs(self):
+        return self.__legs
+
+    def get_bodies(self):
+        return [self.__legs[0][0]] + [c[1] for c in self.__legs] if self.__legs else []
+
+    def get_total_deltav(self):
+        return sum(c[2] + c[3] for c in self.__legs)
+
+    def get_time(self):
+        return sum(c[4] for c in self.__legs)
+
+    def __str__(self):
+        msg = ""
+
+        for origin, destination, ejection_dv, capture_dv, time in self.__legs:
+            msg += origin + " -> " + destination + ": " + str(int(round(ejection_dv))) + " + " + str(int(round(capture_dv))) + " m/s, "
+            msg += str(round(time / 86400, 1)) + " days\n"
+
+        msg += "Total Δv: " + str(int(round(self.get_total_deltav()))) + " m/s\n"
+        msg += "Total Time: " + str(round(self.get_time() / 86400, 1)) + " days"
+
+        return msg
+
+
+def moon_leg(moon, host):
+    # Ejection Δv from the moon's low orbit, capture Δv into the host's low orbit and the time taken. The
+    # reverse leg costs the same burns in the other order.
+    host_mu = host.get_mu()
+    r_low = host.get_radius() + host.get_altitude()
+    a_transfer = (moon.get_SMA() + r_low) / 2
+
+    v_moon = math.sqrt(host_mu / moon.get_SMA())
+    v_apoapsis = math.sqrt(host_mu * (2 / moon.get_SMA() - 1 / a_transfer))
+    v_periapsis = math.sqrt(host_mu * (2 / r_low - 1 / a_transfer))
+
+    r_moon = moon.get_radius() + moon.get_altitude()
+    ejection_dv = float(hyperbolic_deltav(abs(v_moon - v_apoapsis), moon.get_mu(), moon.get_r_SOI(), r_moon, r_moon))
+    capture_dv = abs(v_periapsis - math.sqrt(host_mu / r_low))
+
+    return ejection_dv, capture_dv, math.pi * math.sqrt(a_transfer ** 3 / host_mu)
+
+
+class RoutePlanner:
+    def __init__(self, catalog):
+        self.__catalog = catalog
+        self.__version = None
+        self.__fingerprints = None
+        self.__siblings = {}
+        self.__children = {}
+        self.__groups = {}
+        self.__moon_legs = {}
+        self.__lock = threading.Lock()
+
+    def __refresh(self):
+        # Rebuilds the body tree when the catalog changes; cached costs are dropped only for groups that changed
+        catalog = self.__catalog
+        version = catalog.get_version()
+
+        if version == self.__version:
+            return
+
+        self.__version = version
+        names = [c for c in catalog.get_names() if catalog.get(c) is not None]
+        fingerprints = {c: catalog.get_fingerprint(c) for c in names}
+
+        if fingerprints == self.__fingerprints:
+            return
+
+        self.__fingerprints = fingerprints
+        self.__siblings = {}
+        self.__children = {}
+
+        for name in names:
+            self.__siblings.setdefault(catalog.get(name).get_host().get_name(), []).append(name)
+
+        for host, members in self.__siblings.items():
+            if host in fingerprints:
+                self.__children[host] = members
+
+        self.__groups = {c: v for c, v in self.__groups.items() if v[0] == self.__group_key(c)}
+        self.__moon_legs = {c: v for c, v in self.__moon_legs.items() if v[0] == (fingerprints.get(c[0]), fingerprints.get(c[1]))}
+
+    def __group_key(self, host):
+        return tuple(self.__fingerprints[c] for c in self.__siblings.get(host, ()))
+
+    def __group(self, host):
+        # (index of each member, ejection + capture Δv matrix, ejection Δv, capture Δv, time) for a host's satellites
+        group = self.__groups.get(host)
+
+        if group is None:
+            members = self.__siblings[host]
+            matrix = transfer_matrix(*body_arrays([self.__catalog.get(c) for c in members]))
+            group = self.__groups[host] = (self.__group_key(host), {c: i for i, c in enumerate(members)},
+                                           matrix[2] + matrix[3], matrix[2], matrix[3], matrix[4])
+
+        return group[1:]
+
+    def __moon_leg(self, moon, host):
+        leg = self.__moon_legs.get((moon, host))
+
+        if leg is None:
+            leg = self.__moon_legs[(moon, host)] = ((self.__fingerprints[moon], self.__fingerprints[host]),
+                                                    moon_leg(self.__catalog.get(moon), self.__catalog.get(host)))
+
+        return leg[1]
+
+    def __edges(self, name):
+        # (neighbour, ejection Δv, capture Δv, time) for every edge leaving name
+        host = self.__catalog.get(name).get_host().get_name()
+        index, total, ejection_dv, capture_dv, time = self.__group(host)
+        i = index[name]
+        members = self.__siblings[host]
+
+        for j in np.nonzero(~np.isnan(total[i]))[0]:
+            yield members[j], float(ejection_dv[i, j]), float(capture_dv[i, j]), float(time[i, j])
+
+        if host in self.__fingerprints:
+            ejection, capture, duration = self.__moon_leg(name, host)
+            yield host, ejection, capture, duration
+
+        for moon in self.__children.get(name, ()):
+            ejection, capture, duration = self.__moon_leg(moon, name)
+            yield moon, capture, ejection, duration
+
+    def __lower_bound(self, destination):
+        # Cheapest edge into the destination. Every route to it ends with one of these edges, so this never
+        # overestimates the remaining Δv from anywhere else: an admissible and consistent A* heuristic.
+        host = self.__catalog.get(destination).get_host().get_name()
+        index, total = self.__group(host)[:2]
+        costs = [float(np.nanmin(total[:, index[destination]])) if len(index) > 1 else math.inf]
+        costs += [c[1] + c[2] for c in self.__edges(destination) if c[0] not in index]
+        return min(costs)
+
+    def plan(self, origin, destination):
+        # Cheapest route by total Δv, or None if the bodies are in different systems
+        with self.__lock:
+            self.__refresh()
+
+            if origin not in self.__fingerprints or destination not in self.__fingerprints:
+                raise ValueError("unknown body " + repr(origin if origin not in self.__fingerprints else destination))
+
+            if origin == destination:
+                return Route([])
+
+            h = self.__lower_bound(destination)
+            counter = itertools.count()
+            best = {origin: 0.0}
+            previous = {}
+            queue = [(h, next(counter), 0.0, origin)]
+
+            while queue:
+                _, _, cost, name = heapq.heappop(queue)
+
+                if name == destination:
+                    legs = []
+
+                    while name != origin:
+                        legs.append(previous[name])
+                        name = previous[name][0]
+
+                    return Route(legs[::-1])
+
+                if cost > best[name]:
+                    continue
+
+                for neighbour, ejection_dv, capture_dv, time in self.__edges(name):
+                    new_cost = cost + ejection_dv + capture_dv
+
+                    if new_cost < best.get(neighbour, math.inf):
+                        best[neighbour] = new_cost
+                        previous[neighbour] = (name, neighbour, ejection_dv, capture_dv, time)
+                        heapq.heappush(queue, (new_cost + (0 if neighbour == destination else h), next(counter), new_cost, neighbour))
+
+            return None
+
+
+def get_route_planner():
+    # One planner per catalog, like the transfer store
+    global planner
+
+    with _lock:
+        catalog = get_catalog()
+
+        if planner is None or planner[0] is not catalog:
+            planner = (catalog, RoutePlanner(catalog))
+
+        return planner[1]
+
+
+def plan_route(origin, destination):
+    return get_route_planner().plan(origin, destination)
+
+
+_lock = threading.Lock()
+planner = None
+
+
+if __name__ == "__main__":
+    route = plan_route(sys.argv[1], sys.argv[2])
+    print(route if route is not None else "No route between " + sys.argv[1] + " and " + sys.argv[2])
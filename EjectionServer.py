@@ -0,0 +1,214 @@
+import argparse, asyncio, json, multiprocessing, sys, urllib.parse
+from concurrent.futures import ProcessPoolExecutor
+import EjectionCalc
+from EjectionCalc import *
+from EjectionBatch import RESULT_FIELDS, init_worker, solve, solve_chunk
+
+# A small HTTP/JSON service on localhost for tools that want transfers without Tk or a database client.
+#   GET  /bodies                                   names of every body and host
+#   GET  /transfer?origin=&destination=[&parking_altitude=&target_altitude=]
+#   POST /batch    [{"origin": ..., "destination": ..., ...}, ...]
+#   GET  /stats    coalescing and transfer cache counters
+# Identical requests that arrive while one is being solved share its result. Work never runs on the
+# event loop: single transfers and small batches go to a thread, large batches to a process pool.
+
+BATCH_INLINE = 256
+BATCH_CHUNK = 1000
+MAX_BODY = 64 * 1024 * 1024
+
+STATUS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 413: "Payload Too Large",
+          500: "Internal Server Error"}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class TransferServer:
+    def __init__(self, url=None, workers=None):
+        self.__url = url
+        self.__workers = workers
+        self.__pool = None
+        self.__server = None
+        self.__in_flight = {}
+        self.__coalesced = 0
+
+        EjectionCalc.set_storage(open_storage(url))
+
+    async def start(self, host="127.0.0.1", port=8765):
+        # The catalog is loaded up front so the first request does not pay for it
+        await asyncio.get_running_loop().run_in_executor(None, get_catalog)
+        self.__server = await asyncio.start_server(self.__handle, host, port)
+        return self.__server.sockets[0].getsockname()[:2]
+
+    async def serve_forever(self):
+        async with self.__server:
+            await self.__server.serve_forever()
+
+    async def close(self):
+        if self.__server is not None:
+            self.__server.close()
+            await self.__server.wait_closed()
+
+        if self.__pool is not None:
+            self.__pool.shutdown(cancel_futures=True)
+            self.__pool = None
+
+    def get_stats(self):
+        return {"in_flight": len(self.__in_flight), "coalesced": self.__coalesced, "cache": transfer_cache.get_stats()}
+
+    async def transfer(self, query):
+        # Concurrent identical queries wait on the same future rather than each computing the transfer
+        future = self.__in_flight.get(query)
+
+        if future is not None:
+            self.__coalesced += 1
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().run_in_executor(None, solve, query)
+        self.__in_flight[query] = future
+
+        try:
+            return await asyncio.shield(future)
+
+        finally:
+            self.__in_flight.pop(query, None)
+
+    async def batch(self, queries):
+        loop = asyncio.get_running_loop()
+
+        if len(queries) <= BATCH_INLINE:
+            return await loop.run_in_executor(None, solve_chunk, queries)
+
+        if self.__pool is None:
+            # Workers forked from here would inherit every open client socket and hold those connections
+            # open after the server closes them, so they are started from a clean fork server where possible
+            method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else None
+            self.__pool = ProcessPoolExecutor(self.__workers, multiprocessing.get_context(method), init_worker, (self.__url,))
+
+        chunks = [queries[c:c + BATCH_CHUNK] for c in range(0, len(queries), BATCH_CHUNK)]
+        results = await asyncio.gather(*(loop.run_in_executor(self.__pool, solve_chunk, c) for c in chunks))
+        return [c for chunk in results for c in chunk]
+
+    async def __route(self, method, target, body):
+        url = urllib.parse.urlsplit(target)
+        params = dict(urllib.parse.parse_qsl(url.query))
+
+        if url.path == "/bodies":
+            return {"names": get_names(), "hosts": get_host_names()}
+
+        if url.path == "/stats":
+            return self.get_stats()
+
+        if url.path == "/transfer":
+            if "origin" not in params or "destination" not in params:
+                raise HTTPError(400, "origin and destination are required")
+
+            result = await self.transfer(query_of(params))
+            return dict(zip(RESULT_FIELDS, result))
+
+        if url.path == "/batch":
+            if method != "POST":
+                raise HTTPError(405, "POST a JSON list of queries")
+
+            try:
+                records = json.loads(body)
+                queries = [query_of(c) for c in records]
+
+            except (ValueError, TypeError, AttributeError, KeyError):
+                raise HTTPError(400, "expected a JSON list of {origin, destination, parking_altitude, target_altitude}")
+
+            return [dict(zip(RESULT_FIELDS, c)) for c in await self.batch(queries)]
+
+        raise HTTPError(404, "no such endpoint " + url.path)
+
+    async def __handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+
+                if not request_line.strip():
+                    break
+
+                method, target, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+
+                while True:
+                    line = await reader.readline()
+
+                    if not line.strip():
+                        break
+
+                    key, _, value = line.decode("latin-1").partition(":")
+                    headers[key.strip().lower()] = value.strip()
+
+                length = int(headers.get("content-length", 0))
+
+                try:
+                    if length > MAX_BODY:
+                        raise HTTPError(413, "request body too large")
+
+                    body = await reader.readexactly(length) if length else b""
+                    status, payload = 200, await self.__route(method, target, body)
+
+                except HTTPError as e:
+                    status, payload = e.status, {"error": str(e)}
+
+                except Exception as e:
+                    status, payload = 500, {"error": type(e).__name__ + " " + str(e)}
+
+                keep_alive = headers.get("connection", "").lower() != "close"
+                data = json.dumps(payload).encode()
+                writer.write(("HTTP/1.1 " + str(status) + " " + STATUS[status] + "\r\nContent-Type: application/json\r\n"
+                              "Content-Length: " + str(len(data)) + "\r\nConnection: " + ("keep-alive" if keep_alive else "close") +
+                              "\r\n\r\n").encode() + data)
+                await writer.drain()
+
+                if not keep_alive or status == 413:
+                    break
+
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+
+        finally:
+            writer.close()
+
+
+def query_of(record):
+    # Blank or missing altitudes fall back to the body's default; 0 is a valid altitude
+    return (record["origin"], record["destination"]) + tuple(None if record.get(c) in (None, "") else record[c]
+                                                             for c in ("parking_altitude", "target_altitude"))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve transfer calculations as JSON over HTTP")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--storage", help="storage URL, by default $EJECTION_STORAGE")
+    parser.add_argument("--workers", type=int, help="processes for large batches")
+    args = parser.parse_args(argv)
+
+    async def serve():
+        server = TransferServer(args.storage, args.workers)
+        host, port = await server.start(args.host, args.port)
+        print("Serving on http://" + host + ":" + str(port), file=sys.stderr)
+
+        try:
+            await server.serve_forever()
+
+        finally:
+            await server.close()
+
+    try:
+        asyncio.run(serve())
+
+    except KeyboardInterrupt:
+        pass
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
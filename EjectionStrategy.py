@@ -0,0 +1,147 @@
+import math, sys
+import numpy as np
+from EjectionCalc import *
+
+# Transfer strategies besides the Hohmann transfer of Transfer, for whole pair matrices at once. A
+# bi-elliptic transfer goes out to an intermediate apoapsis rb on one ellipse and comes back on another;
+# rb is searched over a grid of multiples of the outer SMA, every pair and every rb in one broadcast.
+# The low-thrust estimate uses Edelbaum's Δv between circular orbits, spiralling out of the origin's SOI,
+# across to the destination's orbit and down into its SOI under a constant acceleration. The cheapest
+# strategy for a pair is the one with the least Δv. Given an Isp per strategy it is the one needing the
+# least propellant instead, which for the rocket equation means the least Δv / Isp, so that an electric
+# low-thrust transfer can win despite needing more Δv.
+
+STRATEGIES = ("Hohmann", "Bi-elliptic", "Low-thrust")
+LOW_THRUST_ACCELERATION = 1e-4
+BI_ELLIPTIC_RATIOS = np.geomspace(1, 100, 48)
+BI_ELLIPTIC_CHUNK = 1 << 20
+
+
+def bi_elliptic_arrays(origin_SMA, destination_SMA, host_mu, origin_mu, origin_r_SOI, origin_r_orbit, destination_mu, destination_r_SOI,
+                       destination_r_orbit, ratios=BI_ELLIPTIC_RATIOS):
+    # (Δv, time, intermediate apoapsis) of the cheapest bi-elliptic transfer with rb = max(r1, r2) * ratios,
+    # broadcast like hohmann_arrays. The search is done a chunk of pairs at a time, so the temporaries
+    # stay around BI_ELLIPTIC_CHUNK elements.
+    arrays = np.broadcast_arrays(*(np.asarray(c, dtype=float) for c in (origin_SMA, destination_SMA, host_mu, origin_mu, origin_r_SOI,
+                                                                          origin_r_orbit, destination_mu, destination_r_SOI, destination_r_orbit)))
+    shape = arrays[0].shape
+    arrays = [c.ravel() for c in arrays]
+    deltav, time, apoapsis = (np.full(len(arrays[0]), np.nan) for _ in range(3))
+    ratios = np.asarray(ratios, dtype=float)
+    step = max(1, BI_ELLIPTIC_CHUNK // len(ratios))
+
+    for start in range(0, len(deltav), step):
+        r1, r2, host, mu1, r_SOI1, r_orbit1, mu2, r_SOI2, r_orbit2 = (c[start:start + step, None] for c in arrays)
+        rb = np.maximum(r1, r2) * ratios
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            a1, a2 = (r1 + rb) / 2, (r2 + rb) / 2
+            v_soi_origin = np.abs(np.sqrt(host * (2 / r1 - 1 / a1)) - np.sqrt(host / r1))
+            v_soi_destination = np.abs(np.sqrt(host * (2 / r2 - 1 / a2)) - np.sqrt(host / r2))
+            deltav_apoapsis = np.abs(np.sqrt(host * (2 / rb - 1 / a2)) - np.sqrt(host * (2 / rb - 1 / a1)))
+
+        total = (hyperbolic_deltav(v_soi_origin, mu1, r_SOI1, r_orbit1, r_orbit1) + deltav_apoapsis +
+                 hyperbolic_deltav(v_soi_destination, mu2, r_SOI2, r_orbit2, r_orbit2))
+
+        rows = np.arange(len(total))
+        best = np.argmin(np.where(np.isnan(total), np.inf, total), axis=1)
+        rb = rb[rows, best]
+        chunk = slice(start, start + len(rows))
+
+        deltav[chunk] = total[rows, best]
+        apoapsis[chunk] = rb
+
+        with np.errstate(invalid="ignore"):
+            time[chunk] = math.pi * (np.sqrt(((r1[:, 0] + rb) / 2) ** 3 / host[:, 0]) + np.sqrt(((r2[:, 0] + rb) / 2) ** 3 / host[:, 0]))
+
+    return deltav.reshape(shape), time.reshape(shape), apoapsis.reshape(shape)
+
+
+def edelbaum_deltav(v1, v2, inclination=0):
+    # Low-thrust Δv between circular orbits with speeds v1 and v2; |v1 - v2| when they are coplanar
+    return np.sqrt(np.maximum(v1 ** 2 - 2 * v1 * v2 * np.cos(math.pi / 2 * inclination) + v2 ** 2, 0))
+
+
+def low_thrust_arrays(origin_SMA, destination_SMA, host_mu, origin_mu, origin_r_SOI, origin_r_orbit, destination_mu, destination_r_SOI,
+                      destination_r_orbit, acceleration=LOW_THRUST_ACCELERATION):
+    # (Δv, time) of the low-thrust transfer, broadcast like hohmann_arrays
+    with np.errstate(divide="ignore", invalid="ignore"):
+        deltav = (edelbaum_deltav(np.sqrt(origin_mu / origin_r_orbit), np.sqrt(origin_mu / origin_r_SOI)) +
+                  edelbaum_deltav(np.sqrt(host_mu / origin_SMA), np.sqrt(host_mu / destination_SMA)) +
+                  edelbaum_deltav(np.sqrt(destination_mu / destination_r_SOI), np.sqrt(destination_mu / destination_r_orbit)))
+
+    return deltav, deltav / acceleration
+
+
+def strategy_arrays(origin_SMA, destination_SMA, host_mu, origin_mu, origin_r_SOI, origin_r_orbit, destination_mu, destination_r_SOI,
+                    destination_r_orbit, acceleration=LOW_THRUST_ACCELERATION, isp=None, ratios=BI_ELLIPTIC_RATIOS):
+    # (cheapest strategy as an index into STRATEGIES, Δv and time of every strategy stacked along the first
+    # axis in STRATEGIES order, bi-elliptic apoapsis), broadcast like hohmann_arrays. isp is None or an Isp
+    # per strategy, such as (350, 350, 3000)
+    args = (origin_SMA, destination_SMA, host_mu, origin_mu, origin_r_SOI, origin_r_orbit, destination_mu, destination_r_SOI, destination_r_orbit)
+
+    _, _, ejection_dv, capture_dv, hohmann_time = hohmann_arrays(*args)
+    bi_elliptic_dv, bi_elliptic_time, apoapsis = bi_elliptic_arrays(*args, ratios=ratios)
+    low_thrust_dv, low_thrust_time = low_thrust_arrays(*args, acceleration=acceleration)
+
+    deltav = np.stack(np.broadcast_arrays(ejection_dv + capture_dv, bi_elliptic_dv, low_thrust_dv))
+    time = np.stack(np.broadcast_arrays(hohmann_time, bi_elliptic_time, low_thrust_time))
+
+    # Ties go to the earlier strategy, so Hohmann wins over an equal bi-elliptic transfer
+    cost = deltav if isp is None else deltav / np.reshape(np.asarray(isp, dtype=float), (-1,) + (1,) * (deltav.ndim - 1))
+    choice = np.argmin(np.where(np.isnan(cost), np.inf, cost), axis=0)
+
+    return choice, deltav, time, np.broadcast_to(apoapsis, choice.shape)
+
+
+def strategy_matrix(mass, radius, SMA, altitude, host_mu, origins=None, destinations=None, acceleration=LOW_THRUST_ACCELERATION, isp=None):
+    # strategy_arrays over every (origin, destination) pair, with the arguments and masking of
+    # transfer_matrix; invalid pairs have strategy -1 and NaN everywhere else
+    o = slice(None) if origins is None else np.asarray(origins)
+    d = slice(None) if destinations is None else np.asarray(destinations)
+    mass, radius, SMA, altitude, host_mu = (np.asarray(c, dtype=float) for c in (mass, radius, SMA, altitude, host_mu))
+
+    mu = G * mass
+    r_SOI = SMA * (mu / host_mu) ** (2 / 5)
+    r_orbit = radius + altitude
+
+    choice, deltav, time, apoapsis = strategy_arrays(SMA[o, None], SMA[None, d], host_mu[o, None], mu[o, None], r_SOI[o, None], r_orbit[o, None],
+                                                     mu[None, d], r_SOI[None, d], r_orbit[None, d], acceleration, isp)
+
+    index = np.arange(len(SMA))
+    invalid = (host_mu[o, None] != host_mu[None, d]) | (index[o, None] == index[None, d])
+
+    choice = np.where(invalid, -1, choice)
+    deltav = np.where(invalid, np.nan, deltav)
+    time = np.where(invalid, np.nan, time)
+    apoapsis = np.where(invalid, np.nan, apoapsis)
+
+    return choice, deltav, time, apoapsis
+
+
+def pair_strategies(origins, destinations, bodies=None, acceleration=LOW_THRUST_ACCELERATION, isp=None):
+    # strategy_arrays for lists of origin and destination names, such as the transfer store's pairs.
+    # bodies is a BodyArray with names, by default the whole catalog.
+    bodies = get_catalog().get_arrays() if bodies is None else bodies
+    positions = dict(zip(np.asarray(bodies.get_names()).tolist(), range(len(bodies))))
+    o = np.fromiter((positions[c] for c in origins), dtype=int, count=len(origins))
+    d = np.fromiter((positions[c] for c in destinations), dtype=int, count=len(destinations))
+
+    mu, r_SOI, SMA, host_mu = bodies.get_mu(), bodies.get_r_SOI(), bodies.get_SMA(), bodies.get_host_mu()
+    r_orbit = bodies.get_radius() + bodies.get_altitude()
+
+    return strategy_arrays(SMA[o], SMA[d], host_mu[o], mu[o], r_SOI[o], r_orbit[o], mu[d], r_SOI[d], r_orbit[d], acceleration, isp)
+
+
+def compare_strategies(origin, destination):
+    # [(strategy, Δv, time)] for one pair, the chosen strategy first
+    origin, destination = read_body(origin), read_body(destination)
+    choice, deltav, time, _ = pair_strategies([origin.get_name()], [destination.get_name()], BodyArray.from_bodies([origin, destination]))
+    order = [int(choice[0])] + [c for c in range(len(STRATEGIES)) if c != choice[0]]
+
+    return [(STRATEGIES[c], float(deltav[c, 0]), float(time[c, 0])) for c in order]
+
+
+if __name__ == "__main__":
+    for strategy, deltav, time in compare_strategies(sys.argv[1], sys.argv[2]):
+        print(strategy + ": " + str(int(round(deltav))) + " m/s, " + str(round(time / 86400, 1)) + " days")
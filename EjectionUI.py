@@ -1,6 +1,26 @@
+import collections, queue, threading
 import tkinter as tk
-from tkinter import ttk
+from tkinter import filedialog, ttk
+from concurrent.futures import ThreadPoolExecutor
 from EjectionCalc import *
+from EjectionAnimation import FRAME_BLOCK, HIDDEN, OrbitAnimation, system_bodies, system_names
+from EjectionKepler import next_windows
+from EjectionMatrix import get_transfer_store
+from EjectionPorkchop import porkchop, contour_segments, hohmann_time
+import EjectionProfile
+from EjectionProfile import measure, timed
+from EjectionStrategy import STRATEGIES, pair_strategies
+
+
+VIRTUAL_TABLE_ROWS = 5000
+SORT_CHUNK_PAIRS = 20000
+SORT_CHUNK_ORIGINS = 64
+SORT_POLL_MS = 50
+PORKCHOP_GRID = 200
+SWEEP_POINTS = 200
+FRAME_MS = 33
+ORBIT_LABELS = 30
+ORBIT_OUTLINE_POINTS = 64
 
 
 class Circle:
@@ -114,6 +134,8 @@ class Arc:
 
 
 class IntInputBox:
+    kind, kind_name = int, "an integer"
+
     def __init__(self, row, column, root, min=-float("inf"), max=float("inf"), label_text="", label_right=True, required=False):
         self.__box = tk.Entry(root)
         self.__box.grid(row=row, column=column)
@@ -126,41 +148,171 @@ class IntInputBox:
 
     def get(self):
         try:
-            return int(self.__box.get()) / (self.__min <= int(self.__box.get()) <= self.__max)
+            return self.kind(self.__box.get()) / (self.__min <= self.kind(self.__box.get()) <= self.__max)
 
         except ZeroDivisionError:
             print("Invalid value, assuming default values")
 
         except ValueError:
             if self.__box.get():
-                print("Value must be an integer, assuming default values")
+                print("Value must be " + self.kind_name + ", assuming default values")
 
             elif self.__required:
                 print("No value provided")
 
+    def set(self, value):
+        self.__box.delete(0, tk.END)
+        self.__box.insert(0, str(value))
+
+
+class FloatInputBox(IntInputBox):
+    # Masses and radii: 5.972e24 does not fit in an integer box
+    kind, kind_name = float, "a number"
+
 class TextBox:
-    def __init__(self, row, column, root, default="", label_text="", label_right=True, width=15, height=1, rowspan=1, columnspan=1, bg="light grey"):
+    def __init__(self, row, column, root, default="", label_text="", label_right=True, width=15, height=1, rowspan=1, columnspan=1, bg="light grey", editable=False):
         self.__box = tk.Text(root, width=width, height=height, bg=bg)
         self.__box.grid(row=row, column=column, rowspan=rowspan, columnspan=columnspan)
         self.__box.insert(tk.END, default)
-        self.__box.config(state=tk.DISABLED)
+        self.__state = tk.NORMAL if editable else tk.DISABLED
+        self.__box.config(state=self.__state)
 
         self.__label = tk.Label(root, text=label_text)
         self.__label.grid(row=row, column=column + (2 * label_right - 1))
 
     def get(self):
-        self.__box.get("1.0", tk.END)
+        return self.__box.get("1.0", tk.END).strip()
 
     def set(self, text):
         self.__box.config(state=tk.NORMAL)
         self.clear()
         self.__box.insert(tk.END, text)
-        self.__box.config(state=tk.DISABLED)
+        self.__box.config(state=self.__state)
 
     def clear(self):
         self.__box.delete("1.0", tk.END)
 
 
+class SortOrder:
+    # Row order for a table. Each column is parsed into sort keys once, the first time it is sorted on,
+    # and columns added with shift-click act as tie-breakers for the ones before them.
+    def __init__(self, values):
+        self.__values = values
+        self.__keys = {}
+        self.__columns = []
+        self.order = list(range(len(values)))
+
+    def click(self, index, add=False):
+        clicked = [c for c in self.__columns if c[0] == index]
+
+        if add and clicked:
+            clicked[0][1] = not clicked[0][1]
+
+        elif add:
+            self.__columns.append([index, True])
+
+        elif clicked and self.__columns[0][0] == index:
+            self.__columns = [[index, not clicked[0][1]]]
+
+        else:
+            self.__columns = [[index, True]]
+
+        self.sort()
+
+    def sort(self):
+        order = list(range(len(self.__values)))
+
+        for index, ascending in reversed(self.__columns):
+            order.sort(key=self.__key(index).__getitem__, reverse=not ascending)
+
+        self.order = order
+
+    def __key(self, index):
+        if index not in self.__keys:
+            column = [c[index] for c in self.__values]
+
+            try:
+                self.__keys[index] = [float(c) for c in column]
+
+            except ValueError:
+                self.__keys[index] = column
+
+        return self.__keys[index]
+
+    def get_columns(self):
+        return [tuple(c) for c in self.__columns]
+
+    def update(self, values):
+        # Rows were added: parse the columns again and keep the current sort
+        self.__values = values
+        self.__keys = {}
+        self.sort()
+
+
+class ArraySortOrder(SortOrder):
+    # SortOrder over whole columns (NumPy arrays or lists) rather than row tuples, with an optional
+    # substring filter on the text columns. order is an index array into the columns. text_columns are
+    # always text (names such as "1998" must still be filtered); any other column is numeric if it parses.
+    def __init__(self, columns, text_columns=(0, 1)):
+        self.__data = columns
+        self.__text_columns = set(text_columns)
+        self.__keys = {}
+        self.__unique = {}
+        self.__mask = None
+        self.__filter = ""
+        super().__init__(range(len(columns[0])))
+        self.order = np.arange(len(columns[0]))
+
+    def sort(self):
+        keys = [key if ascending else -key for key, ascending in ((self.__key(c[0]), c[1]) for c in self.get_columns())]
+        order = np.lexsort(keys[::-1]) if keys else np.arange(len(self.__data[0]))
+
+        if self.__mask is not None:
+            order = order[self.__mask[order]]
+
+        self.order = order
+
+    def set_filter(self, text):
+        self.__filter = text
+        text = text.strip().lower()
+        self.__mask = None
+
+        if text:
+            self.__mask = np.zeros(len(self.__data[0]), dtype=bool)
+
+            for index in range(len(self.__data)):
+                if self.__key(index).dtype.kind != "f":
+                    unique, inverse = self.__unique[index]
+                    self.__mask |= (np.char.find(np.char.lower(unique), text) >= 0)[inverse]
+
+        self.sort()
+
+    def update(self, columns):
+        self.__data = columns
+        self.__keys = {}
+        self.__unique = {}
+        self.set_filter(self.__filter)
+
+    def __key(self, index):
+        # Text columns are keyed by their rank among the column's distinct values
+        if index not in self.__keys:
+            column = np.asarray(self.__data[index])
+
+            if index not in self.__text_columns:
+                try:
+                    self.__keys[index] = column.astype(float)
+
+                except ValueError:
+                    pass
+
+            if index not in self.__keys:
+                unique, inverse = np.unique(column.astype(str), return_inverse=True)
+                self.__keys[index] = inverse.reshape(-1)
+                self.__unique[index] = unique, self.__keys[index]
+
+        return self.__keys[index]
+
+
 class Table:
     def __init__(self, row, column, values, root, head=tuple(""), width=120, final_width=150):
         self.__head = head
@@ -168,8 +320,7 @@ class Table:
         self.__table = ttk.Treeview(root, columns=head, height=35)
         self.__table.grid(row=row, column=column, rowspan=50)
         self.__table["show"] = "headings"
-        self.__previous_clicked = None
-        self.__descending = True
+        self.__sort_order = SortOrder(values)
         self.__width = width
         self.__final_width = final_width
         self.__scrollbar_x = width * len(head) + abs((final_width - width) / 2)
@@ -182,8 +333,8 @@ class Table:
         for name in self.__head:
             self.__table.heading(name, text=name)
 
-        for counter, value in enumerate(values):
-            self.__table.insert(parent="", index=counter, values=value)
+        with measure("Table.insert"):
+            self.__items = [self.__table.insert(parent="", index=counter, values=value) for counter, value in enumerate(values)]
 
         self.__table.bind("<Button-1>", self.__on_click)
         self.__table.bind("<Double-Button-1>", self.__on_double_click)
@@ -192,58 +343,162 @@ class Table:
         self.__scrollbar.place(x=self.__scrollbar_x, y=0, height=725)
         self.__table.config(yscrollcommand=self.__scrollbar.set)
 
+    def end(self):
+        self.__table.destroy()
+        self.__scrollbar.destroy()
+
+    def append(self, values):
+        self.__values.extend(values)
+
+        with measure("Table.insert"):
+            self.__items += [self.__table.insert(parent="", index=tk.END, values=value) for value in values]
+
+        self.__sort_order.update(self.__values)
+
+        if self.__sort_order.get_columns():
+            for counter, index in enumerate(self.__sort_order.order):
+                self.__table.move(self.__items[index], "", counter)
+
     def __on_click(self, event):
         region = self.__table.identify("region", event.x, event.y)
 
         if region == "heading":
             column = self.__table.identify_column(event.x)
             column = int(column[1:]) - 1
-            self.__sort(column)
+            # Shift-clicking a heading adds it as a secondary sort column
+            self.__sort_order.click(column, add=bool(event.state & 0x0001))
+            self.__update_headings()
+
+            for counter, index in enumerate(self.__sort_order.order):
+                self.__table.move(self.__items[index], "", counter)
 
-            if self.__previous_clicked == column:
-                self.__descending = not self.__descending
+    def __update_headings(self):
+        sorted_columns = dict(self.__sort_order.get_columns())
+
+        for counter, name in enumerate(self.__head):
+            if counter in sorted_columns:
+                self.__table.heading(counter, text=name + " ▼" * sorted_columns[counter] + " ▲" * (not sorted_columns[counter]))
 
             else:
-                self.__descending = True
+                self.__table.heading(counter, text=name)
+
+    def __on_double_click(self, event):
+        region = self.__table.identify("region", event.x, event.y)
 
-            self.__table.delete(*self.__table.get_children())
+        if region == "cell":
+            current_item = self.__table.focus()
+            item = list(self.__table.item(current_item).values())[2][:2]
+            current_ui.mode_switch_box.box.current(0)
+            current_ui.callback(None, default_origin=item[0], default_destination=item[1])
 
-            for name in self.__head:
-                self.__table.column(name, width=120, stretch=tk.NO)
+        elif region == "heading":
+            self.__on_click(event)
 
-            self.__table.column(self.__head[-1], width=145, stretch=tk.NO)
 
-            for counter, name in enumerate(self.__head):
-                self.__table.heading(name, text=name)
+class VirtualTable:
+    # A Table for very large datasets. Only one screenful of Treeview rows exists; scrolling refills
+    # those rows from the underlying columns, and sorting and filtering run over every row.
+    def __init__(self, row, column, columns, root, head=tuple(""), formats=None, width=120, final_width=150, height=35):
+        self.__head = head
+        self.__data = columns
+        self.__formats = formats or [str] * len(columns)
+        self.__height = height
+        self.__top = 0
+        self.__sort_order = ArraySortOrder(columns)
+        self.__table = ttk.Treeview(root, columns=head, height=height)
+        self.__table.grid(row=row, column=column, rowspan=50)
+        self.__table["show"] = "headings"
+        self.__scrollbar_x = width * len(head) + abs((final_width - width) / 2)
+
+        for name in self.__head:
+            self.__table.column(name, width=width, stretch=tk.NO)
+
+        self.__table.column(self.__head[-1], width=final_width, stretch=tk.NO)
+
+        for name in self.__head:
+            self.__table.heading(name, text=name)
+
+        self.__items = [self.__table.insert(parent="", index=counter, values=()) for counter in range(height)]
+        self.__detached = set()
+
+        self.__table.bind("<Button-1>", self.__on_click)
+        self.__table.bind("<Double-Button-1>", self.__on_double_click)
+        self.__table.bind("<MouseWheel>", lambda event: self.__scroll_to(self.__top - 3 * (event.delta > 0) + 3 * (event.delta < 0)))
+        self.__table.bind("<Button-4>", lambda event: self.__scroll_to(self.__top - 3))
+        self.__table.bind("<Button-5>", lambda event: self.__scroll_to(self.__top + 3))
+
+        self.__scrollbar = ttk.Scrollbar(root, orient="vertical", command=self.__on_scroll)
+        self.__scrollbar.place(x=self.__scrollbar_x, y=0, height=725)
 
-            self.__table.heading(column, text=self.__head[column] + " ▼" * self.__descending + " ▲" * (not self.__descending))
+        self.__refresh()
 
-            for counter, value in enumerate(self.__values):
-                self.__table.insert(parent="", index=counter, values=value)
+    @timed("VirtualTable.refresh")
+    def __refresh(self):
+        order = self.__sort_order.order
+        total = len(order)
+        visible = order[self.__top:self.__top + self.__height]
 
-    def __sort(self, index):
-        i = 1
+        for counter, item in enumerate(self.__items):
+            if counter < len(visible):
+                self.__table.item(item, values=[f(c[visible[counter]]) for f, c in zip(self.__formats, self.__data)])
 
-        if self.__previous_clicked == index:
-            self.__values = list(reversed(self.__values))
+                if item in self.__detached:
+                    self.__table.move(item, "", counter)
+                    self.__detached.discard(item)
+
+            elif item not in self.__detached:
+                self.__table.detach(item)
+                self.__detached.add(item)
+
+        if total:
+            self.__scrollbar.set(self.__top / total, (self.__top + len(visible)) / total)
 
         else:
-            while i < len(self.__values):
-                j = i
+            self.__scrollbar.set(0, 1)
 
-                try:
-                    while j > 0 and float(self.__values[j - 1][index]) > float(self.__values[j][index]):
-                            self.__values[j], self.__values[j - 1] = self.__values[j - 1], self.__values[j]
-                            j -= 1
+    def __scroll_to(self, top):
+        top = max(0, min(int(top), len(self.__sort_order.order) - self.__height))
 
-                except ValueError:
-                    while j > 0 and self.__values[j - 1][index] > self.__values[j][index]:
-                            self.__values[j], self.__values[j - 1] = self.__values[j - 1], self.__values[j]
-                            j -= 1
+        if top != self.__top:
+            self.__top = top
+            self.__refresh()
+
+    def __on_scroll(self, action, amount, unit=None):
+        if action == "moveto":
+            self.__scroll_to(float(amount) * len(self.__sort_order.order))
+
+        else:
+            self.__scroll_to(self.__top + int(amount) * (self.__height if unit == "pages" else 1))
+
+    def set_filter(self, text):
+        self.__sort_order.set_filter(text)
+        self.__top = 0
+        self.__refresh()
+
+    def append(self, columns):
+        self.__data = [np.concatenate((a, b)) for a, b in zip(self.__data, columns)]
+        self.__sort_order.update(self.__data)
+        self.__refresh()
+
+    def __on_click(self, event):
+        region = self.__table.identify("region", event.x, event.y)
+
+        if region == "heading":
+            column = self.__table.identify_column(event.x)
+            column = int(column[1:]) - 1
+            self.__sort_order.click(column, add=bool(event.state & 0x0001))
+            self.__update_headings()
+            self.__refresh()
 
-                i += 1
+    def __update_headings(self):
+        sorted_columns = dict(self.__sort_order.get_columns())
 
-        self.__previous_clicked = index
+        for counter, name in enumerate(self.__head):
+            if counter in sorted_columns:
+                self.__table.heading(counter, text=name + " ▼" * sorted_columns[counter] + " ▲" * (not sorted_columns[counter]))
+
+            else:
+                self.__table.heading(counter, text=name)
 
     def __on_double_click(self, event):
         region = self.__table.identify("region", event.x, event.y)
@@ -315,6 +570,7 @@ class TransferCalcUI:
         self.__deltav_ejection_box = TextBox(7, 0, self.__frame, label_text="Ejection Δv", bg="white")
         self.__deltav_capture_box = TextBox(8, 0, self.__frame, label_text="Capture Δv", bg="white")
         self.__transfer_time_box = TextBox(9, 0, self.__frame, label_text="Travel Time", bg="white")
+        self.__window_box = TextBox(10, 0, self.__frame, label_text="Next Window", bg="white")
 
         ejection_explanation = "The ejection angle is the angle between the origin planet's prograde (direction of travel), and the point " \
                                "on your parking orbit you should burn."
@@ -349,23 +605,21 @@ class TransferCalcUI:
                 self.__body1_circle_2.set_x(self.__x2 * 1.2, self.__canvas)
                 self.__body2_circle.set_x(self.__x2 * 1.1, self.__canvas)
 
-            self.__calculate_transfer()
-
-    def __calculate_transfer(self):
-        body1 = read_body(self.__name1.get())
-        body2 = read_body(self.__name2.get())
+            self.__calculate_transfer(body1, body2)
 
+    @timed("TransferCalcUI.canvas")
+    def __calculate_transfer(self, body1, body2):
         if body1 and body2:
-            if self.__init_alt_box.get():
-                body1.set_altitude(int(self.__init_alt_box.get()))
-
-            if self.__final_alt_box.get():
-                body2.set_altitude(int(self.__final_alt_box.get()))
+            # Bodies are shared catalog objects, so the entered altitudes must not be written back to them
+            init_alt = self.__init_alt_box.get()
+            final_alt = self.__final_alt_box.get()
+            init_alt = int(init_alt) if init_alt else body1.get_altitude()
+            final_alt = int(final_alt) if final_alt else body2.get_altitude()
 
-            parking_orbit = Orbit(body1.get_radius() + body1.get_altitude(), body1.get_radius() + body1.get_altitude(), body1)
-            target_orbit = Orbit(body2.get_radius() + body2.get_altitude(), body2.get_radius() + body2.get_altitude(), body2)
+            parking_orbit = Orbit(body1.get_radius() + init_alt, body1.get_radius() + init_alt, body1)
+            target_orbit = Orbit(body2.get_radius() + final_alt, body2.get_radius() + final_alt, body2)
 
-            transfer = Transfer(body1, body2, parking_orbit, target_orbit)
+            transfer = transfer_cache.get_transfer(body1, body2, parking_orbit, target_orbit)
 
             ejection_angle = transfer.get_ejection_angle()
             phase_angle = transfer.get_phase_angle()
@@ -408,6 +662,9 @@ class TransferCalcUI:
             self.__deltav_capture_box.set(str(round(transfer.get_capture_deltav(), 2)) + " m/s")
             self.__transfer_time_box.set(str(round(transfer.get_transfer_time() / 31536000, 3)) + " yr")
 
+            window = next_windows(body1, body2, transfer.get_phase_angle(), 1)[0]
+            self.__window_box.set("None" if math.isnan(window) else str(round(window / 86400, 1)) + " days")
+
             # print(transfer)
 
     def __swap_boxes(self):
@@ -421,36 +678,125 @@ class TransferCalcUI:
 
 
 class SortingUI:
+    # The transfer matrix comes from the materialized store (EjectionMatrix). A worker thread reads the
+    # catalog, then brings the store up to date SORT_CHUNK_ORIGINS origins at a time and queues the pairs as
+    # they become available. __poll runs on the Tk loop: it builds the table once the number of pairs is
+    # known and adds the queued pairs a chunk at a time, so rows appear while the rest is still computing.
     def __init__(self):
         self.__frame = tk.Frame(root)
         self.__frame.grid(row=0, column=0, rowspan=200)
         self.name = "Sort"
-        self.__bodies = get_names()
 
+        self.__columns = ("Origin", "Destination", "Ejection Δv (m/s)", "Capture Δv (m/s)", "Transfer Time (yr)", "Strategy")
+        self.__formats = [str, str, lambda x: str(round(float(x), 2)), lambda x: str(round(float(x), 2)), lambda x: str(round(float(x), 3)), str]
+        self.table = None
+
+        self.__progress = ttk.Progressbar(self.__frame, maximum=1, length=300, mode="indeterminate")
+        self.__progress.grid(row=52, column=0)
+        self.__progress.start()
+
+        self.__queue = queue.Queue()
+        self.__pending = []
+        self.__added = 0
+        self.__done = False
+        self.__closed = False
+        self.__cancel = threading.Event()
+
+        self.__executor = ThreadPoolExecutor(1)
+        self.__future = self.__executor.submit(self.__load)
+        self.__poll_id = self.__frame.after(0, self.__poll)
+
+    def __load(self):
+        # Runs on the worker: every catalog read and every computation happens here, not on the Tk loop
+        bodies = get_catalog().get_arrays()
+        strategies = np.array(STRATEGIES, dtype=object)
+
+        # Hosts (in column catalogs) have no host μ and are in no pair
+        hosts = np.asarray(bodies.get_hosts(), dtype=object)[~np.isnan(bodies.get_host_mu())]
+        host_counts = np.array(list(collections.Counter(hosts.tolist()).values()), dtype=np.int64)
+        self.__queue.put(("count", int(np.sum(host_counts * (host_counts - 1)))))
+
+        def add(pairs):
+            if not self.__closed:
+                self.__queue.put(("pairs", list(pairs) + [strategies[pair_strategies(pairs[0], pairs[1], bodies)[0]]]))
+
+        get_transfer_store().update(SORT_CHUNK_ORIGINS, add, self.__cancel)
+        self.__queue.put(("done", None))
+
+    def __create_table(self, count):
+        if count > VIRTUAL_TABLE_ROWS:
+            empty = [np.empty(0, dtype=object), np.empty(0, dtype=object), np.empty(0), np.empty(0), np.empty(0), np.empty(0, dtype=object)]
+            self.table = VirtualTable(0, 0, empty, self.__frame, head=self.__columns, formats=self.__formats)
 
-        # for i in self.__bodies[1:]:
-        #     if i:
-        #         print(read_body(i).get_name())
+            self.__filter = tk.Entry(self.__frame)
+            self.__filter.grid(row=51, column=0)
+            self.__filter.bind("<KeyRelease>", lambda event: self.table.set_filter(self.__filter.get()))
 
-        self.__bodies = [read_body(c) for c in self.__bodies[1:] if c]
-        self.__transfers = []
+        else:
+            self.table = Table(0, 0, [], self.__frame, head=self.__columns)
+
+        self.__virtual = count > VIRTUAL_TABLE_ROWS
+        self.__progress.stop()
+        self.__progress.config(mode="determinate", maximum=max(1, count), value=0)
 
-        for i in self.__bodies:
-            for j in self.__bodies:
-                if i.get_name() != j.get_name():
-                    self.__transfers.append(Transfer(i, j, Orbit(i.get_altitude() + i.get_radius(), i.get_altitude() + i.get_radius(), i),
-                                     Orbit(j.get_altitude() + j.get_radius(), j.get_altitude() + j.get_radius(), j)))
+    def __poll(self):
+        while not self.__queue.empty():
+            kind, value = self.__queue.get_nowait()
 
-        columns = ("Origin", "Destination", "Ejection Δv (m/s)", "Capture Δv (m/s)", "Transfer Time (yr)")
-        values = [(c.get_origin().get_name(), c.get_destination().get_name(), str(round(c.get_ejection_deltav(), 2)),
-                   str(round(c.get_capture_deltav(), 2)), str(round(c.get_transfer_time() / 31536000, 3))) for c in self.__transfers]
+            if kind == "count":
+                self.__create_table(value)
 
-        self.table = Table(0, 0, values, self.__frame, head=columns)
+            elif kind == "pairs":
+                self.__pending.append(value)
+
+            else:
+                self.__done = True
+
+        if self.__pending:
+            # One chunk of rows per tick, so the window keeps responding while a large matrix is added
+            pairs = self.__pending[0]
+            end = min(self.__added + SORT_CHUNK_PAIRS, len(pairs[0]))
+            self.__add_rows(pairs, slice(self.__added, end))
+            self.__progress["value"] += end - self.__added
+            self.__added = end
+
+            if end == len(pairs[0]):
+                self.__pending.pop(0)
+                self.__added = 0
+
+        elif self.__done:
+            self.__poll_id = None
+            self.__progress.grid_remove()
+            self.__executor.shutdown(wait=False)
+            return
+
+        elif self.__future.done():
+            # The worker stopped without finishing; raise its error here
+            self.__poll_id = None
+            self.__progress.stop()
+            self.__future.result()
+            return
+
+        self.__poll_id = self.__frame.after(SORT_POLL_MS, self.__poll)
+
+    def __add_rows(self, pairs, rows):
+        origins, destinations, _, _, ejection_dv, capture_dv, transfer_time, strategies = pairs
+        data = [origins[rows], destinations[rows], ejection_dv[rows], capture_dv[rows], transfer_time[rows] / 31536000, strategies[rows]]
+
+        if self.__virtual:
+            self.table.append(data)
 
-        # for i in self.__transfers:
-        #     print(i.get_origin().get_name() + " -> " + i.get_destination().get_name())
+        else:
+            self.table.append([tuple(f(c[i]) for f, c in zip(self.__formats, data)) for i in range(len(data[0]))])
 
     def end(self):
+        self.__closed = True
+        self.__cancel.set()
+
+        if self.__poll_id is not None:
+            self.__frame.after_cancel(self.__poll_id)
+
+        self.__executor.shutdown(wait=False, cancel_futures=True)
         self.__frame.destroy()
 
 
@@ -460,22 +806,437 @@ class UpdateUI:
         self.__frame.grid(row=0, column=0, rowspan=200, columnspan=30)
         self.name = "Update"
 
-        self.name_box = TextBox(0, 0, self.__frame, label_text="Body Name", bg="white")
-        self.mass_box = IntInputBox(1, 0, self.__frame, label_text="Body Mass (kg)")
-        self.radius_box = IntInputBox(2, 0, self.__frame, label_text="Radius (m)")
-        self.apoapsis_box = IntInputBox(3, 0, self.__frame, label_text="Apoapsis (m)")
-        self.periapsis_box = IntInputBox(4, 0, self.__frame, label_text="Periapsis (m)")
+        self.name_box = TextBox(0, 0, self.__frame, label_text="Body Name", bg="white", editable=True)
+        self.mass_box = FloatInputBox(1, 0, self.__frame, min=1, label_text="Body Mass (kg)", required=True)
+        self.radius_box = FloatInputBox(2, 0, self.__frame, min=1, label_text="Radius (m)", required=True)
+        self.apoapsis_box = IntInputBox(3, 0, self.__frame, min=0, label_text="Apoapsis (m)")
+        self.periapsis_box = IntInputBox(4, 0, self.__frame, min=0, label_text="Periapsis (m)")
+        host_names = get_host_names()
         self.host_box = DropDown(self.__frame, host_names[0], host_names + ["This body is a host"], row=5, column=0, label_text="Host Body")
-        self.colour_box = TextBox(6, 0, self.__frame, label_text="Body Colour", bg="white")
+        self.colour_box = TextBox(6, 0, self.__frame, label_text="Body Colour", bg="white", editable=True)
+        self.alt_box = IntInputBox(7, 0, self.__frame, min=0, label_text="Parking Altitude (m)")
+
+        self.__add_button = tk.Button(self.__frame, command=self.__add_body, text="Add / Update Body", width=18)
+        self.__add_button.grid(row=8, column=0)
+        self.__import_button = tk.Button(self.__frame, command=self.__update_bodies, text="Import CSV / JSON", width=18)
+        self.__import_button.grid(row=9, column=0)
+        self.__status_box = TextBox(10, 0, self.__frame, label_text="Status", bg="white", width=40, height=2)
+
+        self.body_box = DropDown(self.__frame, "Select a body", get_names(), row=0, column=3, label_text="Edit Body", command=self.__load_body)
 
     def end(self):
         self.__frame.destroy()
-        
+
+    def __load_body(self, event=None):
+        # Fills the form with the selected body, so saving it updates that body in place
+        body = read_body(self.body_box.get())
+
+        if body is None:
+            return
+
+        self.name_box.set(body.get_name())
+        self.mass_box.set(body.get_mass())
+        self.radius_box.set(body.get_radius())
+        self.apoapsis_box.set(int(body.get_apoapsis()))
+        self.periapsis_box.set(int(body.get_periapsis()))
+        self.host_box.box.set(body.get_host().get_name())
+        self.colour_box.set(body.get_colour())
+        self.alt_box.set(int(body.get_altitude()))
+
     def __add_body(self):
-        return
+        host = self.host_box.get()
+        host = "" if host == "This body is a host" else host
+        row = (self.name_box.get(), self.mass_box.get(), self.radius_box.get(), self.apoapsis_box.get() or 0,
+               self.periapsis_box.get() or 0, host, self.colour_box.get() or "white", self.alt_box.get() or 0)
+
+        if row[1] is None or row[2] is None:
+            self.__status_box.set("Mass and radius are required")
+            return
+
+        try:
+            write_bodies([row])
+
+        except ValueError as e:
+            self.__status_box.set(str(e))
+            return
+
+        except NotImplementedError as e:
+            self.__status_box.set(str(e) or "This storage is read-only")
+            return
+
+        self.__status_box.set("Saved " + row[0])
+        self.__update_hosts()
 
     def __update_bodies(self):
-        return
+        # Bulk import: every row is validated, then all of them are written in a single transaction
+        path = filedialog.askopenfilename(filetypes=[("Bodies", "*.csv *.json")])
+
+        if not path:
+            return
+
+        try:
+            count, seconds = import_bodies(path)
+
+        except (OSError, ValueError) as e:
+            self.__status_box.set("Import failed: " + str(e))
+            return
+
+        except NotImplementedError as e:
+            self.__status_box.set("Import failed: " + (str(e) or "this storage is read-only"))
+            return
+
+        self.__status_box.set("Imported " + str(count) + " bodies in " + str(round(seconds, 2)) + " s (" +
+                              str(int(count / max(seconds, 1e-9))) + " rows/s)")
+        self.__update_hosts()
+
+    def __update_hosts(self):
+        self.host_box.box.config(values=get_host_names() + ["This body is a host"])
+        self.body_box.box.config(values=get_names())
+
+
+class PorkchopUI:
+    def __init__(self):
+        self.__frame = tk.Frame(root)
+        self.__frame.grid(row=0, column=0, rowspan=200, columnspan=30)
+        self.name = "Porkchop"
+        self.__canvas = tk.Canvas(self.__frame, height=800, width=800)
+        self.__canvas.grid(row=0, column=0, rowspan=200, columnspan=30)
+
+        names = get_names()
+
+        self.__name1 = DropDown(self.__frame, "Select a body", names, label_text="Origin")
+        self.__name2 = DropDown(self.__frame, "Select a body", names, row=1, label_text="Destination")
+
+        self.__start_box = IntInputBox(2, 0, self.__frame, min=0, label_text="Earliest departure (days)")
+        self.__window_box = IntInputBox(3, 0, self.__frame, min=1, label_text="Departure window (days)")
+        self.__flight_box = IntInputBox(4, 0, self.__frame, min=1, label_text="Longest flight (days)")
+
+        self.__plot = tk.Button(self.__frame, command=self.__draw, text="Plot", width=10)
+        self.__plot.grid(row=5, column=0)
+
+        self.__best_box = TextBox(6, 0, self.__frame, label_text="Lowest C3", bg="white", width=30)
+
+        self.__left, self.__right, self.__top, self.__bottom = 80, 760, 250, 740
+
+    @timed("PorkchopUI.canvas")
+    def __draw(self):
+        body1 = read_body(self.__name1.get())
+        body2 = read_body(self.__name2.get())
+
+        if not (body1 and body2) or body1 is body2 or body1.get_host() is not body2.get_host():
+            return
+
+        hohmann = hohmann_time(body1, body2)
+        start = (self.__start_box.get() or 0) * 86400
+        window = (self.__window_box.get() or 2 * hohmann / 86400) * 86400
+        flight = (self.__flight_box.get() or 2 * hohmann / 86400) * 86400
+
+        departures = np.linspace(start, start + window, PORKCHOP_GRID)
+        arrivals = np.linspace(start + hohmann / 4, start + window + flight, PORKCHOP_GRID)
+        c3, v_inf = porkchop(body1, body2, departures, arrivals)
+        c3 = c3 / 1e6
+        v_inf = v_inf / 1e3
+
+        self.__canvas.delete("porkchop")
+        self.__draw_axes(departures, arrivals)
+
+        if np.all(np.isnan(c3)):
+            self.__best_box.set("No transfers in this window")
+            return
+
+        for level in np.nanmin(c3) * np.array([1.1, 1.25, 1.5, 2, 3, 5, 8]):
+            self.__draw_contour(c3, level, "blue", str(round(level, 1)) + " km²/s²")
+
+        for level in np.nanmin(v_inf) * np.array([1.25, 1.5, 2, 3]):
+            self.__draw_contour(v_inf, level, "red", str(round(level, 2)) + " km/s")
+
+        i, j = np.unravel_index(np.nanargmin(c3), c3.shape)
+        x, y = self.__to_canvas(i, j, c3.shape)
+        self.__canvas.create_oval(x - 4, y - 4, x + 4, y + 4, fill="black", tags="porkchop")
+        self.__best_box.set(str(round(c3[i, j], 2)) + " km²/s², day " + str(int(departures[i] / 86400)) + " → " + str(int(arrivals[j] / 86400)))
+
+    def __to_canvas(self, i, j, shape):
+        return (self.__left + i / (shape[0] - 1) * (self.__right - self.__left),
+                self.__bottom - j / (shape[1] - 1) * (self.__bottom - self.__top))
+
+    def __draw_contour(self, grid, level, colour, label_text):
+        segments = contour_segments(grid, level)
+        x0, y0 = self.__to_canvas(segments[:, 0], segments[:, 1], grid.shape)
+        x1, y1 = self.__to_canvas(segments[:, 2], segments[:, 3], grid.shape)
+
+        for segment in zip(x0, y0, x1, y1):
+            self.__canvas.create_line(*segment, fill=colour, tags="porkchop")
+
+        if len(segments):
+            self.__canvas.create_text(x0[0], y0[0], text=label_text, fill=colour, anchor="sw", tags="porkchop")
+
+    def __draw_axes(self, departures, arrivals):
+        self.__canvas.create_rectangle(self.__left, self.__top, self.__right, self.__bottom, tags="porkchop")
+        self.__canvas.create_text((self.__left + self.__right) / 2, self.__bottom + 40, text="Departure (days)", tags="porkchop")
+        self.__canvas.create_text(self.__left - 55, (self.__top + self.__bottom) / 2, text="Arrival (days)", angle=90, tags="porkchop")
+
+        for k in range(5):
+            x = self.__left + k / 4 * (self.__right - self.__left)
+            y = self.__bottom - k / 4 * (self.__bottom - self.__top)
+            day1 = departures[0] + k / 4 * (departures[-1] - departures[0])
+            day2 = arrivals[0] + k / 4 * (arrivals[-1] - arrivals[0])
+            self.__canvas.create_text(x, self.__bottom + 15, text=str(int(day1 / 86400)), tags="porkchop")
+            self.__canvas.create_text(self.__left - 25, y, text=str(int(day2 / 86400)), tags="porkchop")
+
+    def end(self):
+        self.__frame.destroy()
+
+
+class SweepUI:
+    def __init__(self):
+        self.__frame = tk.Frame(root)
+        self.__frame.grid(row=0, column=0, rowspan=200, columnspan=30)
+        self.name = "Sweep"
+        self.__canvas = tk.Canvas(self.__frame, height=800, width=800)
+        self.__canvas.grid(row=0, column=0, rowspan=200, columnspan=30)
+
+        names = get_names()
+
+        self.__name1 = DropDown(self.__frame, "Select a body", names, label_text="Origin")
+        self.__name2 = DropDown(self.__frame, "Select a body", names, row=1, label_text="Destination")
+
+        self.__parking_min_box = IntInputBox(2, 0, self.__frame, min=0, label_text="Lowest parking altitude")
+        self.__parking_max_box = IntInputBox(3, 0, self.__frame, min=0, label_text="Highest parking altitude")
+        self.__parking_apoapsis_box = IntInputBox(4, 0, self.__frame, min=0, label_text="Parking apoapsis altitude (optional)")
+        self.__target_min_box = IntInputBox(5, 0, self.__frame, min=0, label_text="Lowest final altitude")
+        self.__target_max_box = IntInputBox(6, 0, self.__frame, min=0, label_text="Highest final altitude")
+
+        self.__sweep = tk.Button(self.__frame, command=self.__draw, text="Sweep", width=10)
+        self.__sweep.grid(row=7, column=0)
+
+        self.__best_box = TextBox(8, 0, self.__frame, label_text="Cheapest", bg="white", width=40)
+
+    @timed("SweepUI.canvas")
+    def __draw(self):
+        body1 = read_body(self.__name1.get())
+        body2 = read_body(self.__name2.get())
+
+        if not (body1 and body2) or body1 is body2 or body1.get_host() is not body2.get_host():
+            return
+
+        parking = np.linspace(self.__parking_min_box.get() or 0, self.__parking_max_box.get() or body1.get_radius(), SWEEP_POINTS)
+        target = np.linspace(self.__target_min_box.get() or 0, self.__target_max_box.get() or body2.get_radius(), SWEEP_POINTS)
+        parking_apoapsis = self.__parking_apoapsis_box.get()
+        parking_apoapsis = None if parking_apoapsis is None else np.maximum(parking, parking_apoapsis)
+
+        sweep = AltitudeSweep(body1, body2, parking, target, parking_apoapsis=parking_apoapsis)
+        best = sweep.get_best()
+        self.__canvas.delete("sweep")
+
+        if best is None:
+            self.__best_box.set("No valid orbits in this range")
+            return
+
+        (i,), (j,), total = best
+        self.__plot_curve(parking, sweep.get_ejection_deltav(), (80, 260, 760, 480), "blue", body1.get_name() + " ejection Δv (m/s) vs parking altitude (m)", i)
+        self.__plot_curve(target, sweep.get_capture_deltav(), (80, 540, 760, 760), "red", body2.get_name() + " capture Δv (m/s) vs final altitude (m)", j)
+
+        self.__best_box.set(str(int(parking[i])) + " m → " + str(int(target[j])) + " m: " + str(round(total, 2)) + " m/s")
+
+    def __plot_curve(self, xs, ys, box, colour, title, best):
+        left, top, right, bottom = box
+        y_min, y_max = float(np.nanmin(ys)), float(np.nanmax(ys))
+        y_span = (y_max - y_min) or 1
+        x_span = (xs[-1] - xs[0]) or 1
+
+        x = left + (xs - xs[0]) / x_span * (right - left)
+        y = bottom - (ys - y_min) / y_span * (bottom - top)
+
+        self.__canvas.create_rectangle(left, top, right, bottom, tags="sweep")
+        self.__canvas.create_text(left, top - 12, text=title, anchor="w", tags="sweep")
+        self.__canvas.create_line(*np.column_stack((x, y)).ravel(), fill=colour, tags="sweep")
+        self.__canvas.create_oval(x[best] - 4, y[best] - 4, x[best] + 4, y[best] + 4, fill=colour, tags="sweep")
+
+        self.__canvas.create_text(left - 5, bottom, text=str(int(y_min)), anchor="e", tags="sweep")
+        self.__canvas.create_text(left - 5, top, text=str(int(y_max)), anchor="e", tags="sweep")
+        self.__canvas.create_text(left, bottom + 12, text=str(int(xs[0])), tags="sweep")
+        self.__canvas.create_text(right, bottom + 12, text=str(int(xs[-1])), tags="sweep")
+
+    def end(self):
+        self.__frame.destroy()
+
+
+class OrbitUI:
+    # Frames are computed a block ahead on a worker thread (EjectionAnimation); each tick only looks up the
+    # current frame and moves the items whose pixel position changed. The frame shown is taken from the
+    # wall clock, so a slow tick skips frames instead of slowing the animation down.
+    def __init__(self):
+        self.__frame = tk.Frame(root)
+        self.__frame.grid(row=0, column=0, rowspan=200, columnspan=30)
+        self.name = "Orbits"
+        self.__canvas = tk.Canvas(self.__frame, height=800, width=800)
+        self.__canvas.grid(row=0, column=0, rowspan=200, columnspan=30)
+
+        names = get_names()
+
+        self.__system = DropDown(self.__frame, "Select a system", system_names(), label_text="System")
+        self.__name1 = DropDown(self.__frame, "None", names, row=1, label_text="Origin")
+        self.__name2 = DropDown(self.__frame, "None", names, row=2, label_text="Destination")
+        self.__speed_box = IntInputBox(3, 0, self.__frame, min=1, label_text="Days per second")
+
+        self.__play = tk.Button(self.__frame, command=self.__start, text="Play", width=10)
+        self.__play.grid(row=4, column=0)
+
+        self.__time_box = TextBox(5, 0, self.__frame, label_text="Day", bg="white")
+        self.__flight_box = TextBox(6, 0, self.__frame, label_text="Transfer", bg="white", width=30)
+
+        self.__centre, self.__radius = (500, 480), 300
+        self.__executor = ThreadPoolExecutor(1)
+        self.__animation = None
+        self.__after_id = None
+
+    def __start(self):
+        bodies = system_bodies(self.__system.get())
+
+        if not bodies:
+            return
+
+        self.__stop()
+        body1 = read_body(self.__name1.get())
+        body2 = read_body(self.__name2.get())
+        body1, body2 = (body1, body2) if body1 in bodies and body2 in bodies else (None, None)
+
+        # By default the innermost body goes round once every four seconds
+        days_per_second = self.__speed_box.get() or max(min(c.get_period() for c in bodies) / 86400 / 4, 1e-3)
+        self.__animation = OrbitAnimation(bodies, self.__centre, self.__radius, days_per_second * 86400 * FRAME_MS / 1000, body1, body2)
+        self.__flight_box.set("Waiting for a window" if self.__animation.has_transfer() else "None")
+        self.__draw_system(bodies)
+
+        self.__block = 0
+        self.__frames = self.__animation.frames(0)
+        self.__next = (1, self.__executor.submit(self.__animation.frames, FRAME_BLOCK))
+        self.__departure = None
+        self.__clock = time.perf_counter()
+        self.__tick()
+
+    def __draw_system(self, bodies):
+        # Orbits and the host are drawn once; only the body and spacecraft items move
+        self.__canvas.delete("orbit")
+        x, y = self.__centre
+        self.__canvas.create_oval(x - 6, y - 6, x + 6, y + 6, fill="orange", tags="orbit")
+
+        for outline in self.__animation.outlines(ORBIT_OUTLINE_POINTS if len(bodies) <= 500 else ORBIT_OUTLINE_POINTS // 4):
+            self.__canvas.create_line(*outline, fill="light grey", tags="orbit")
+
+        r = 4 if len(bodies) <= ORBIT_LABELS else 2
+        self.__sizes = [r] * len(bodies) + [3]
+        hidden = (HIDDEN, HIDDEN, HIDDEN, HIDDEN)
+        self.__items = [self.__canvas.create_oval(*hidden, fill=c.get_colour() or "black", outline="", tags="orbit") for c in bodies]
+        self.__items.append(self.__canvas.create_oval(*hidden, fill="black", tags="orbit"))
+        self.__labels = []
+
+        if len(bodies) <= ORBIT_LABELS:
+            self.__labels = [self.__canvas.create_text(HIDDEN, HIDDEN, text=c.get_name(), anchor="w", tags="orbit") for c in bodies]
+
+        self.__x = np.full(len(self.__items), -1, dtype=np.int32)
+        self.__y = np.full(len(self.__items), -1, dtype=np.int32)
+
+    @timed("OrbitUI.frame")
+    def __tick(self):
+        frame = int((time.perf_counter() - self.__clock) * 1000 / FRAME_MS)
+        block, index = divmod(frame, FRAME_BLOCK)
+
+        if block != self.__block:
+            # The next block is normally ready; after a long stall it is computed here instead
+            self.__frames = self.__next[1].result() if self.__next[0] == block else self.__animation.frames(block * FRAME_BLOCK)
+            self.__block = block
+            self.__next = (block + 1, self.__executor.submit(self.__animation.frames, (block + 1) * FRAME_BLOCK))
+
+        times, x, y, departures = self.__frames
+        x, y, departure = x[index], y[index], departures[index]
+        moved = np.nonzero((x != self.__x) | (y != self.__y))[0]
+
+        for i, x1, y1 in zip(moved.tolist(), x[moved].tolist(), y[moved].tolist()):
+            r = self.__sizes[i]
+            self.__canvas.coords(self.__items[i], x1 - r, y1 - r, x1 + r, y1 + r)
+
+            if i < len(self.__labels):
+                self.__canvas.coords(self.__labels[i], x1 + r + 2, y1)
+
+        self.__x, self.__y = x, y
+        self.__time_box.set(str(round(times[index] / 86400, 1)))
+
+        if departure != self.__departure and not (math.isnan(departure) and self.__departure is None):
+            self.__draw_flight(departure)
+
+        self.__after_id = self.__frame.after(max(1, int((self.__clock + (frame + 1) * FRAME_MS / 1000 - time.perf_counter()) * 1000)), self.__tick)
+
+    def __draw_flight(self, departure):
+        self.__canvas.delete("flight")
+        self.__departure = None if math.isnan(departure) else departure
+
+        if self.__departure is not None:
+            self.__canvas.create_line(*self.__animation.transfer_outline(departure), fill="black", dash=(4, 4), tags="flight")
+            self.__flight_box.set("Departed day " + str(round(departure / 86400, 1)))
+
+        elif self.__animation.has_transfer():
+            self.__flight_box.set("Waiting for a window")
+
+    def __stop(self):
+        if self.__after_id is not None:
+            self.__frame.after_cancel(self.__after_id)
+            self.__after_id = None
+
+        self.__canvas.delete("flight")
+
+    def end(self):
+        self.__stop()
+        self.__executor.shutdown(wait=False, cancel_futures=True)
+        self.__frame.destroy()
+
+
+class ProfileUI:
+    def __init__(self):
+        self.__frame = tk.Frame(root)
+        self.__frame.grid(row=0, column=0, rowspan=200)
+        self.name = "Profile"
+        self.__table = None
+
+        self.__toggle = tk.Button(self.__frame, command=self.__toggle_profiling, width=18)
+        self.__toggle.grid(row=51, column=0)
+        self.__refresh_button = tk.Button(self.__frame, command=self.__refresh, text="Refresh", width=18)
+        self.__refresh_button.grid(row=52, column=0)
+        self.__reset_button = tk.Button(self.__frame, command=self.__reset, text="Reset", width=18)
+        self.__reset_button.grid(row=53, column=0)
+        self.__dump_button = tk.Button(self.__frame, command=self.__dump, text="Save to profile.json", width=18)
+        self.__dump_button.grid(row=54, column=0)
+
+        self.__refresh()
+
+    def __refresh(self):
+        self.__toggle.config(text="Disable profiling" if EjectionProfile.enabled else "Enable profiling")
+        stats = sorted(EjectionProfile.get_stats().items(), key=lambda c: -c[1]["total"])
+        columns = ("Hook", "Count", "Total (ms)", "Mean (ms)", "p50 (ms)", "p90 (ms)", "p99 (ms)")
+        values = [(name, c["count"]) + tuple(round(c[key] * 1000, 3) for key in ("total", "mean", "p50", "p90", "p99")) for name, c in stats]
+
+        if self.__table is not None:
+            self.__table.end()
+
+        self.__table = Table(0, 0, values, self.__frame, head=columns, width=100, final_width=100)
+
+    def __toggle_profiling(self):
+        if EjectionProfile.enabled:
+            EjectionProfile.disable()
+
+        else:
+            EjectionProfile.enable()
+
+        self.__refresh()
+
+    def __reset(self):
+        EjectionProfile.reset()
+        self.__refresh()
+
+    def __dump(self):
+        EjectionProfile.dump("profile.json")
+
+    def end(self):
+        self.__frame.destroy()
 
 
 class UI:
@@ -498,6 +1259,24 @@ class UI:
         elif mode == "Sort":
             self.switch_ui(SortingUI())
 
+        elif mode == "Sweep":
+            self.switch_ui(SweepUI())
+            del self.mode_switch_box
+            self.mode_switch_box = DropDown(root, "Sweep", mode_names, row=0, column=20, command=self.callback)
+
+        elif mode == "Profile":
+            self.switch_ui(ProfileUI())
+
+        elif mode == "Orbits":
+            self.switch_ui(OrbitUI())
+            del self.mode_switch_box
+            self.mode_switch_box = DropDown(root, "Orbits", mode_names, row=0, column=20, command=self.callback)
+
+        elif mode == "Porkchop":
+            self.switch_ui(PorkchopUI())
+            del self.mode_switch_box
+            self.mode_switch_box = DropDown(root, "Porkchop", mode_names, row=0, column=20, command=self.callback)
+
         else:
             self.switch_ui(UpdateUI())
             del self.mode_switch_box
@@ -506,7 +1285,7 @@ class UI:
 
 
 if __name__ == "__main__":
-    mode_names = ["Calculate", "Sort", "Update"]
+    mode_names = ["Calculate", "Sort", "Update", "Porkchop", "Sweep", "Orbits", "Profile"]
 
     root = tk.Tk()
     root.geometry("800x800")
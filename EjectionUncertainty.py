@@ -0,0 +1,144 @@
+import argparse, itertools, math, sys
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from EjectionCalc import *
+
+# Monte Carlo margins for a transfer. The point values of the bodies table are perturbed per sample:
+# body masses (and optionally the host's) log-normally, both SMAs normally, and the parking and target
+# altitudes normally, never below the surface. Every sample is solved with hohmann_arrays, the equations
+# of Transfer, a whole chunk at a time. A launch timing error δt makes the burn ω δt away from the planned
+# point of the parking orbit (ω being its angular rate), which turns the escape asymptote by that angle;
+# the ejection burn is taken to include the correction that turns v∞ back, 2 v∞ sin(ω δt / 2).
+# Samples are drawn in fixed-size chunks, each from its own stream spawned from one SeedSequence, so a
+# seed gives the same samples however many processes the chunks are shared between.
+
+MC_CHUNK = 1 << 18
+PERCENTILES = (1, 5, 50, 95, 99)
+QUANTITIES = ("ejection_dv", "capture_dv", "ejection_angle")
+
+# Relative for masses and SMAs, metres for altitudes, seconds for timing
+DEFAULT_SIGMAS = {"mass": 0.01, "host_mass": 0.0, "SMA": 0.001, "parking_altitude": 1000.0, "target_altitude": 1000.0, "timing": 60.0}
+
+
+class UncertaintyResult:
+    def __init__(self, samples, nominal):
+        # samples and nominal are keyed by QUANTITIES
+        self.__samples = samples
+        self.__nominal = nominal
+
+    def get_samples(self, name):
+        return self.__samples[name]
+
+    def get_nominal(self, name):
+        return self.__nominal[name]
+
+    def get_percentiles(self, name, percentiles=PERCENTILES):
+        return dict(zip(percentiles, np.percentile(self.__samples[name], percentiles).tolist()))
+
+    def __len__(self):
+        return len(self.__samples[QUANTITIES[0]])
+
+    def __str__(self):
+        msg = str(len(self)) + " samples\n"
+
+        for name, label, scale, unit in (("ejection_dv", "Ejection Δv", 1, " m/s"), ("capture_dv", "Capture Δv", 1, " m/s"),
+                                         ("ejection_angle", "Ejection Angle", 180 / math.pi, "°")):
+            percentiles = self.get_percentiles(name)
+            msg += label + ": nominal " + str(round(self.__nominal[name] * scale, 2)) + unit + ", "
+            msg += ", ".join("p" + str(c) + " " + str(round(v * scale, 2)) for c, v in percentiles.items()) + "\n"
+
+        return msg.rstrip("\n")
+
+
+def nominal_values(origin, destination, parking_altitude, target_altitude):
+    # Plain floats, so they can be sent to worker processes
+    return (origin.get_mass(), origin.get_radius(), origin.get_SMA(), parking_altitude, destination.get_mass(), destination.get_radius(),
+            destination.get_SMA(), target_altitude, origin.get_host().get_mass())
+
+
+def sample_chunk(nominal, sigmas, seed, count):
+    # (ejection Δv, capture Δv, ejection angle) for count samples drawn from seed
+    rng = np.random.default_rng(seed)
+    mass1, radius1, SMA1, altitude1, mass2, radius2, SMA2, altitude2, host_mass = nominal
+
+    mu1 = G * mass1 * np.exp(sigmas["mass"] * rng.standard_normal(count))
+    mu2 = G * mass2 * np.exp(sigmas["mass"] * rng.standard_normal(count))
+    host_mu = G * host_mass * np.exp(sigmas["host_mass"] * rng.standard_normal(count))
+    SMA1 = SMA1 * (1 + sigmas["SMA"] * rng.standard_normal(count))
+    SMA2 = SMA2 * (1 + sigmas["SMA"] * rng.standard_normal(count))
+    r1 = radius1 + np.maximum(altitude1 + sigmas["parking_altitude"] * rng.standard_normal(count), 0)
+    r2 = radius2 + np.maximum(altitude2 + sigmas["target_altitude"] * rng.standard_normal(count), 0)
+    timing = sigmas["timing"] * rng.standard_normal(count)
+
+    _, ejection_angle, ejection_dv, capture_dv, _ = hohmann_arrays(SMA1, SMA2, host_mu, mu1, SMA1 * (mu1 / host_mu) ** (2 / 5), r1,
+                                                                   mu2, SMA2 * (mu2 / host_mu) ** (2 / 5), r2)
+
+    v_soi = np.abs(np.sqrt(host_mu / SMA1) - np.sqrt(host_mu * (2 / SMA1 - 2 / (SMA1 + SMA2))))
+    turn = np.sqrt(mu1 / r1 ** 3) * timing
+
+    return ejection_dv + 2 * v_soi * np.abs(np.sin(turn / 2)), capture_dv, ejection_angle + turn
+
+
+def monte_carlo(origin, destination, samples=1000000, sigmas=None, parking_altitude=None, target_altitude=None, seed=None, workers=0,
+                chunk_size=MC_CHUNK):
+    # origin and destination are bodies or names. sigmas overrides any of DEFAULT_SIGMAS; workers=0 runs
+    # every chunk in this process.
+    origin = read_body(origin) if isinstance(origin, str) else origin
+    destination = read_body(destination) if isinstance(destination, str) else destination
+
+    if origin is None or destination is None:
+        raise ValueError("unknown body")
+
+    if origin is destination or origin.get_host() is not destination.get_host():
+        raise ValueError("origin and destination must be different bodies with the same host")
+
+    sigmas = dict(DEFAULT_SIGMAS, **(sigmas or {}))
+    parking_altitude = origin.get_altitude() if parking_altitude is None else parking_altitude
+    target_altitude = destination.get_altitude() if target_altitude is None else target_altitude
+
+    sizes = [min(chunk_size, samples - c) for c in range(0, samples, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    nominal = nominal_values(origin, destination, parking_altitude, target_altitude)
+
+    if workers == 0:
+        chunks = [sample_chunk(nominal, sigmas, c, n) for c, n in zip(seeds, sizes)]
+
+    else:
+        with ProcessPoolExecutor(workers) as executor:
+            chunks = list(executor.map(sample_chunk, itertools.repeat(nominal), itertools.repeat(sigmas), seeds, sizes))
+
+    columns = [np.concatenate(c) if c else np.empty(0) for c in zip(*chunks)] if chunks else [np.empty(0)] * len(QUANTITIES)
+
+    parking_radius = origin.get_radius() + parking_altitude
+    target_radius = destination.get_radius() + target_altitude
+    transfer = transfer_cache.get_transfer(origin, destination, Orbit(parking_radius, parking_radius, origin),
+                                           Orbit(target_radius, target_radius, destination))
+    nominal = (transfer.get_ejection_deltav(), transfer.get_capture_deltav(), transfer.get_ejection_angle())
+
+    return UncertaintyResult(dict(zip(QUANTITIES, columns)), dict(zip(QUANTITIES, nominal)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Percentiles of ejection and capture Δv under uncertain bodies, orbits and timing")
+    parser.add_argument("origin")
+    parser.add_argument("destination")
+    parser.add_argument("--samples", type=int, default=1000000)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--workers", type=int, default=0, help="processes to share the chunks between, 0 to run in this process")
+    parser.add_argument("--storage", help="storage URL, by default $EJECTION_STORAGE")
+
+    for name, value in DEFAULT_SIGMAS.items():
+        parser.add_argument("--" + name.replace("_", "-") + "-sigma", type=float, default=value, dest=name)
+
+    args = parser.parse_args(argv)
+
+    if args.storage:
+        set_storage(open_storage(args.storage))
+
+    sigmas = {c: getattr(args, c) for c in DEFAULT_SIGMAS}
+    print(monte_carlo(args.origin, args.destination, args.samples, sigmas, seed=args.seed, workers=args.workers))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,56 @@
+import json, os, sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import EjectionCalc
+from EjectionStorage import open_storage
+
+# The solar system plus a second star, so that every test has moons and bodies with different hosts
+BODIES = [
+    {"name": "Sun", "mass": 1.989e30, "radius": 696340000, "apoapsis": 0, "periapsis": 0, "host": "", "colour": "yellow", "alt": 0},
+    {"name": "Mercury", "mass": 3.301e23, "radius": 2439700, "apoapsis": 69816900000, "periapsis": 46001200000, "host": "Sun", "colour": "grey", "alt": 100000},
+    {"name": "Venus", "mass": 4.867e24, "radius": 6051800, "apoapsis": 108939000000, "periapsis": 107477000000, "host": "Sun", "colour": "orange", "alt": 250000},
+    {"name": "Earth", "mass": 5.972e24, "radius": 6371000, "apoapsis": 152100000000, "periapsis": 147095000000, "host": "Sun", "colour": "blue", "alt": 300000},
+    {"name": "Mars", "mass": 6.417e23, "radius": 3389500, "apoapsis": 249200000000, "periapsis": 206700000000, "host": "Sun", "colour": "red", "alt": 200000},
+    {"name": "Jupiter", "mass": 1.898e27, "radius": 69911000, "apoapsis": 816600000000, "periapsis": 740500000000, "host": "Sun", "colour": "brown", "alt": 1000000},
+    {"name": "Saturn", "mass": 5.683e26, "radius": 58232000, "apoapsis": 1514500000000, "periapsis": 1352550000000, "host": "Sun", "colour": "gold", "alt": 800000},
+    {"name": "Uranus", "mass": 8.681e25, "radius": 25362000, "apoapsis": 3003620000000, "periapsis": 2741300000000, "host": "Sun", "colour": "cyan", "alt": 500000},
+    {"name": "Neptune", "mass": 1.024e26, "radius": 24622000, "apoapsis": 4545670000000, "periapsis": 4444450000000, "host": "Sun", "colour": "navy", "alt": 500000},
+    {"name": "Kerbol", "mass": 1.7565459e28, "radius": 261600000, "apoapsis": 0, "periapsis": 0, "host": "", "colour": "yellow", "alt": 0},
+    {"name": "Kerbin", "mass": 5.2915158e22, "radius": 600000, "apoapsis": 13599840256, "periapsis": 13599840256, "host": "Kerbol", "colour": "blue", "alt": 80000},
+    {"name": "Jool", "mass": 4.2332e22, "radius": 6000000, "apoapsis": 68773560320, "periapsis": 68773560320, "host": "Kerbol", "colour": "green", "alt": 500000},
+    {"name": "Laythe", "mass": 2.94e22, "radius": 500000, "apoapsis": 27184000, "periapsis": 27184000, "host": "Jool", "colour": "blue", "alt": 50000},
+    {"name": "Moon", "mass": 7.342e22, "radius": 1737400, "apoapsis": 405400000, "periapsis": 362600000, "host": "Earth", "colour": "grey", "alt": 50000},
+    {"name": "Io", "mass": 8.93e22, "radius": 1821600, "apoapsis": 423400000, "periapsis": 420000000, "host": "Jupiter", "colour": "yellow", "alt": 100000},
+    {"name": "Europa", "mass": 4.8e22, "radius": 1560800, "apoapsis": 676938000, "periapsis": 664862000, "host": "Jupiter", "colour": "white", "alt": 100000},
+]
+
+
+@pytest.fixture
+def bodies_path(tmp_path):
+    path = tmp_path / "bodies.json"
+    path.write_text(json.dumps(BODIES), encoding="utf-8")
+    return str(path)
+
+
+@pytest.fixture
+def solar_system(bodies_path, tmp_path, monkeypatch):
+    # BODIES as the active storage; snapshots go to the test's own directory
+    monkeypatch.setenv("EJECTION_SNAPSHOT", str(tmp_path / "transfers.npz"))
+    EjectionCalc.set_storage(open_storage(bodies_path))
+    EjectionCalc.transfer_cache.clear()
+    yield EjectionCalc.get_catalog()
+    EjectionCalc.set_storage(None)
+    EjectionCalc.transfer_cache.clear()
+
+
+@pytest.fixture
+def hohmann():
+    # The scalar reference: a Transfer between the default parking orbits of two bodies
+    def transfer(origin, destination):
+        origin, destination = EjectionCalc.read_body(origin), EjectionCalc.read_body(destination)
+        r1, r2 = origin.get_radius() + origin.get_altitude(), destination.get_radius() + destination.get_altitude()
+        return EjectionCalc.Transfer(origin, destination, EjectionCalc.Orbit(r1, r1, origin), EjectionCalc.Orbit(r2, r2, destination))
+
+    return transfer
@@ -0,0 +1,50 @@
+import math
+import numpy as np
+import pytest
+from EjectionCalc import *
+
+
+def test_circular_orbits_match_transfer(solar_system):
+    earth, mars = read_body("Earth"), read_body("Mars")
+    parking, target = np.array([1e5, 3e5, 2e6]), np.array([5e4, 1e6])
+    sweep = AltitudeSweep(earth, mars, parking, target)
+
+    for i, p in enumerate(parking):
+        for j, t in enumerate(target):
+            r1, r2 = earth.get_radius() + p, mars.get_radius() + t
+            transfer = Transfer(earth, mars, Orbit(r1, r1, earth), Orbit(r2, r2, mars))
+
+            assert sweep.get_ejection_deltav()[i] == pytest.approx(transfer.get_ejection_deltav(), rel=1e-12)
+            assert sweep.get_capture_deltav()[j] == pytest.approx(transfer.get_capture_deltav(), rel=1e-12)
+            assert sweep.get_ejection_angle()[i] == pytest.approx(transfer.get_ejection_angle(), rel=1e-12)
+            assert sweep.get_total_deltav()[i, j] == pytest.approx(transfer.get_ejection_deltav() + transfer.get_capture_deltav(), rel=1e-12)
+
+
+def test_elliptic_orbits_burn_at_periapsis(solar_system):
+    earth, mars = read_body("Earth"), read_body("Mars")
+    sweep = AltitudeSweep(earth, mars, [2e5], [1e5], parking_apoapsis=[4e7], target_apoapsis=[1e5])
+
+    v_soi = sweep.get_transfer().get_v_soi_origin()
+    rp, ra = earth.get_radius() + 2e5, earth.get_radius() + 4e7
+    v_pe = math.sqrt(v_soi ** 2 + 2 * earth.get_mu() * (1 / rp - 1 / earth.get_r_SOI()))
+    v_orbit = math.sqrt(earth.get_mu() * (2 / rp - 2 / (rp + ra)))
+
+    assert sweep.get_ejection_deltav()[0] == pytest.approx(v_pe - v_orbit, rel=1e-12)
+
+
+def test_best_is_the_lowest_total(solar_system):
+    sweep = AltitudeSweep(read_body("Earth"), read_body("Mars"), np.linspace(1e5, 1e7, 30), np.linspace(5e4, 5e6, 20))
+    parking, target, total = sweep.get_best()
+
+    assert total == np.min(sweep.get_total_deltav())
+    assert sweep.get_total_deltav()[parking + target] == total
+
+
+def test_no_best_without_valid_orbits(solar_system):
+    # A periapsis below the centre of the body has no real burn
+    earth, mars = read_body("Earth"), read_body("Mars")
+    sweep = AltitudeSweep(earth, mars, [-2 * earth.get_radius()], [1e5, 1e6])
+
+    assert np.all(np.isnan(sweep.get_total_deltav()))
+    assert sweep.get_best() is None
+    assert AltitudeSweep(earth, mars, [], [1e5]).get_best() is None
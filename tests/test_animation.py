@@ -0,0 +1,59 @@
+import math
+import numpy as np
+import pytest
+from EjectionCalc import *
+from EjectionAnimation import HIDDEN, OrbitAnimation, system_bodies, system_names
+from EjectionKepler import body_state, state
+
+
+@pytest.fixture
+def circular(solar_system):
+    write_bodies([("Inner", 1e24, 5e6, 1e11, 1e11, "Sun", "red", 100000), ("Outer", 1e24, 5e6, 2.5e11, 2.5e11, "Sun", "blue", 100000)])
+    return read_body("Inner"), read_body("Outer")
+
+
+def test_bodies_follow_their_orbits(solar_system):
+    bodies = system_bodies("Sun")
+    animation = OrbitAnimation(bodies, (500, 480), 300, 86400)
+    times, x, y, departures = animation.frames(10, 50)
+
+    assert times == pytest.approx((10 + np.arange(50)) * 86400)
+    assert x.shape == y.shape == (50, len(bodies) + 1)
+
+    for k, body in enumerate(bodies):
+        expected = animation.to_canvas(*body_state(body, times)[:2])
+        assert np.array_equal(x[:, k], expected[0]) and np.array_equal(y[:, k], expected[1])
+
+    # Without a transfer the spacecraft stays hidden
+    assert not animation.has_transfer()
+    assert np.all(x[:, -1] == HIDDEN) and np.all(y[:, -1] == HIDDEN) and np.all(np.isnan(departures))
+
+
+def test_transfer_joins_origin_and_destination(circular):
+    inner, outer = circular
+
+    for origin, destination in ((inner, outer), (outer, inner)):
+        transfer = Transfer(origin, destination, Orbit(5.1e6, 5.1e6, origin), Orbit(5.1e6, 5.1e6, destination))
+        animation = OrbitAnimation([inner, outer], (0, 0), 1e6, 86400, origin, destination)
+        times, x, y, departures = animation.frames(0, 2000)
+        departure = departures[~np.isnan(departures)][0]
+        elements = animation.transfer_elements(departure)
+        arrival = departure + transfer.get_transfer_time()
+
+        assert animation.has_transfer()
+        assert np.hypot(*(np.subtract(state(*elements[:3], departure, *elements[3:])[:2], body_state(origin, departure)[:2]))) < 1e-3 * origin.get_SMA()
+        assert np.hypot(*(np.subtract(state(*elements[:3], arrival, *elements[3:])[:2], body_state(destination, arrival)[:2]))) < 1e-3 * destination.get_SMA()
+
+        # The spacecraft is shown exactly while a flight is under way
+        flying = ~np.isnan(departures)
+        assert np.all((times[flying] >= departures[flying]) & (times[flying] <= departures[flying] + transfer.get_transfer_time()))
+        assert np.all(x[~flying, -1] == HIDDEN) and np.all(x[flying, -1] != HIDDEN)
+
+
+def test_outlines_and_systems(solar_system):
+    bodies = system_bodies("Jupiter")
+    outlines = OrbitAnimation(bodies, (500, 480), 300, 3600).outlines(points=16)
+
+    assert [c.get_name() for c in bodies] == ["Io", "Europa"]
+    assert len(outlines) == 2 and all(len(c) == 32 for c in outlines)
+    assert system_names()[:2] == ["Sun", "Kerbol"] and {"Earth", "Jupiter", "Jool"} <= set(system_names())
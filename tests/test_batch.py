@@ -0,0 +1,54 @@
+import csv, io, math
+import pytest
+import EjectionBatch
+
+QUERIES = [("Earth", "Mars", None, None), ("Io", "Europa", "200000", "50000"), ("Earth", "Moon", None, None),
+           ("Earth", "Pluto", None, None), ("Mars", "Mars", None, None), ("Earth", "Venus", "-1e9", None)]
+
+
+def test_results_match_transfer(solar_system, bodies_path, hohmann):
+    results = list(EjectionBatch.run(QUERIES[:1], bodies_path, workers=0))
+    transfer = hohmann("Earth", "Mars")
+
+    assert results == [("Earth", "Mars", 300000, 200000, pytest.approx(math.degrees(transfer.get_phase_angle()), rel=1e-12),
+                        pytest.approx(math.degrees(transfer.get_ejection_angle()), rel=1e-12),
+                        pytest.approx(transfer.get_ejection_deltav(), rel=1e-12), pytest.approx(transfer.get_capture_deltav(), rel=1e-12),
+                        pytest.approx(transfer.get_transfer_time(), rel=1e-12), None)]
+
+
+def test_bad_queries_report_errors(solar_system, bodies_path):
+    errors = [c[-1] for c in EjectionBatch.run(QUERIES, bodies_path, workers=0)]
+
+    assert errors[:2] == [None, None]
+    assert errors[2] == "bodies orbit different hosts"
+    assert errors[3] == "unknown body 'Pluto'"
+    assert errors[4] == "origin and destination are the same body"
+    assert errors[5] is not None
+
+
+def test_workers_keep_input_order(solar_system, bodies_path):
+    queries = QUERIES * 7
+    expected = list(EjectionBatch.run(queries, bodies_path, workers=0))
+
+    assert list(EjectionBatch.run(queries, bodies_path, workers=2, chunk_size=3, window=2)) == expected
+
+
+def test_csv_round_trip(solar_system, bodies_path, tmp_path):
+    source, target = tmp_path / "queries.csv", tmp_path / "results.jsonl"
+    source.write_text("origin,destination,parking_altitude,target_altitude\nEarth,Mars,,\nIo,Europa,200000,50000\n")
+
+    assert EjectionBatch.main([str(source), "-o", str(target), "--storage", bodies_path, "--workers", "0"]) == 0
+
+    stream = io.StringIO()
+    EjectionBatch.write_results(EjectionBatch.run(QUERIES[:2], bodies_path, workers=0), stream, "jsonl")
+    assert target.read_text() == stream.getvalue()
+
+    rows = list(csv.reader(io.StringIO(source.read_text())))
+    assert list(EjectionBatch.read_queries(io.StringIO(source.read_text()), "csv")) == [QUERIES[0], tuple(rows[2])]
+
+
+def test_malformed_jsonl_reports_the_line():
+    for text, message in (('{"origin": "Earth"}\n\n["Earth", "Mars"]\n', "line 3: expected an object, got list"),
+                          ('{"origin": "Earth"}\n{"origin": \n', "line 2: ")):
+        with pytest.raises(ValueError, match=message):
+            list(EjectionBatch.read_queries(io.StringIO(text), "jsonl"))
@@ -0,0 +1,34 @@
+import json
+import EjectionBench
+import EjectionCalc
+from EjectionStorage import create_sqlite
+
+
+def test_synthetic_rows_are_valid_and_repeatable(tmp_path):
+    rows = EjectionBench.synthetic_rows(50)
+    catalog = EjectionCalc.BodyCatalog(create_sqlite(str(tmp_path / "bodies.db"), rows))
+
+    assert len(catalog.get_names()) == 50 and all(catalog.get(c).get_host().get_name() == "Sun" for c in catalog.get_names())
+    assert EjectionBench.synthetic_rows(50) == rows
+    assert EjectionBench.synthetic_rows(50, seed=1) != rows
+
+
+def test_compare_flags_slowdowns_beyond_the_tolerance():
+    baseline = {"a": {"median": 1.0}, "b": {"median": 1.0}}
+    results = {"a": {"median": 1.4}, "b": {"median": 1.6}, "c": {"median": 9.0}}
+
+    assert EjectionBench.compare(results, baseline, 1.5) == ["b"]
+
+
+def test_smoke_run(tmp_path):
+    output = tmp_path / "bench.json"
+
+    try:
+        assert EjectionBench.main(["--sizes", "5", "--table-sizes", "10", "--repeat", "1", "--no-ui", "--output", str(output)]) == 0
+
+    finally:
+        EjectionCalc.set_storage(None)
+
+    results = json.loads(output.read_text())
+    assert {"transfer_matrix/5", "catalog_load/5", "transfer_x1000"} <= set(results)
+    assert all(c["runs"] == 1 and c["median"] >= 0 for c in results.values())
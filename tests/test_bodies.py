@@ -0,0 +1,54 @@
+import math
+import numpy as np
+import pytest
+from EjectionCalc import *
+
+
+def test_bodies_have_no_instance_dict(solar_system):
+    earth = read_body("Earth")
+
+    assert not hasattr(earth, "__dict__")
+
+    with pytest.raises(AttributeError):
+        earth.extra = 1
+
+
+def test_derived_values_match_their_formulas(solar_system):
+    earth, sun = read_body("Earth"), read_body("Earth").get_host()
+    _, mass, _, apoapsis, periapsis = solar_system.get_row("Earth")[:5]
+    a = (apoapsis + periapsis) / 2
+
+    assert earth.get_SMA() == a
+    assert earth.get_eccentricity() == pytest.approx((apoapsis - periapsis) / (apoapsis + periapsis))
+    assert earth.get_mu() == G * mass
+    assert earth.get_period() == pytest.approx(2 * math.pi * math.sqrt(a ** 3 / sun.get_mu()))
+    assert earth.get_r_SOI() == pytest.approx(a * (mass / sun.get_mass()) ** 0.4)
+    assert sun.get_period() == 0 and sun.get_r_SOI() == float("inf")
+
+
+def test_setters_refresh_cached_values(solar_system):
+    earth, sun = read_body("Earth"), read_body("Earth").get_host()
+    mass, sun_mass, periapsis = earth.get_mass(), sun.get_mass(), earth.get_periapsis()
+    earth.get_period(), earth.get_r_SOI(), earth.get_mu()
+
+    earth.set_apoapsis(2e11)
+    assert earth.get_SMA() == (2e11 + periapsis) / 2
+
+    earth.set_mass(2 * mass)
+    assert earth.get_mu() == G * 2 * mass
+    assert earth.get_r_SOI() == pytest.approx(earth.get_SMA() * (2 * mass / sun_mass) ** 0.4)
+
+    # A change to the host reaches the satellite's period and SOI without touching the satellite
+    sun.set_mass(4 * sun_mass)
+    assert earth.get_period() == pytest.approx(2 * math.pi * math.sqrt(earth.get_SMA() ** 3 / (G * 4 * sun_mass)))
+    assert earth.get_r_SOI() == pytest.approx(earth.get_SMA() * (2 * mass / (4 * sun_mass)) ** 0.4)
+
+
+def test_body_array_matches_bodies(solar_system):
+    bodies = [read_body(c) for c in get_names()]
+    arrays = BodyArray.from_bodies(bodies)
+
+    np.testing.assert_allclose(arrays.get_SMA(), [c.get_SMA() for c in bodies], rtol=1e-15)
+    np.testing.assert_allclose(arrays.get_period(), [c.get_period() for c in bodies], rtol=1e-12)
+    np.testing.assert_allclose(arrays.get_r_SOI(), [c.get_r_SOI() for c in bodies], rtol=1e-12)
+    np.testing.assert_allclose(arrays.get_eccentricity(), [c.get_eccentricity() for c in bodies], rtol=1e-12, atol=1e-15)
@@ -0,0 +1,58 @@
+import json
+import pytest
+from EjectionCalc import *
+
+
+def test_satellites_share_their_host(solar_system):
+    io, europa = read_body("Io"), read_body("Europa")
+
+    assert io.get_host() is europa.get_host() is solar_system.get("Jupiter")
+    assert read_body("Io") is io
+    assert read_body("Sun") is None
+
+
+def test_host_change_rebuilds_its_satellites(solar_system):
+    io, earth = read_body("Io"), read_body("Earth")
+    fingerprints = {c: solar_system.get_fingerprint(c) for c in ("Io", "Europa", "Earth", "Jupiter")}
+    version = solar_system.get_version()
+    row = list(solar_system.get_row("Jupiter"))
+    row[1] = row[1] * 2
+
+    write_bodies([tuple(row)])
+
+    assert solar_system.get_version() > version
+    assert read_body("Io") is not io
+    assert read_body("Io").get_host().get_mass() == row[1]
+    assert read_body("Io").get_host() is read_body("Jupiter")
+    assert read_body("Earth") is earth
+
+    for name in ("Io", "Europa", "Jupiter"):
+        assert solar_system.get_fingerprint(name) != fingerprints[name]
+
+    assert solar_system.get_fingerprint("Earth") == fingerprints["Earth"]
+
+
+def test_writes_are_read_back(solar_system):
+    write_bodies([("Vulcan", 1e23, 2e6, 2e10, 2e10, "Sun", "red", 1000)])
+
+    assert "Vulcan" in get_names()
+    assert read_body("Vulcan").get_SMA() == 2e10
+    assert [c[0] for c in get_storage().fetch_bodies(["Vulcan"])] == ["Vulcan"]
+
+
+def test_invalid_writes_are_rejected(solar_system):
+    for row in (("Vulcan", 1e23, 2e6, 2e10, 2e10, "Nemesis", "red", 0), ("Vulcan", -1, 2e6, 2e10, 2e10, "Sun", "red", 0),
+                ("Vulcan", 1e23, 2e6, 1e10, 2e10, "Sun", "red", 0)):
+        with pytest.raises(ValueError):
+            write_bodies([row])
+
+    assert "Vulcan" not in get_names()
+
+
+def test_imports_are_read_back(solar_system, tmp_path):
+    path = tmp_path / "new.json"
+    path.write_text(json.dumps([{"name": "Vulcan", "mass": 1e23, "radius": 2e6, "apoapsis": 2e10, "periapsis": 2e10, "host": "Sun",
+                                 "colour": "red", "alt": 1000}]), encoding="utf-8")
+
+    assert import_bodies(str(path))[0] == 1
+    assert read_body("Vulcan").get_SMA() == 2e10
@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+import EjectionCalc
+from EjectionCalc import *
+from EjectionMatrix import TransferStore
+from EjectionStorage import export_columns
+
+
+@pytest.fixture
+def columns(solar_system, tmp_path):
+    # The same bodies twice: solar_system as a BodyCatalog, and exported to a ColumnCatalog
+    path = str(tmp_path / "bodies.cols")
+    export_columns(get_storage(), path, batch_size=4)
+    return ColumnCatalog(ColumnStorage(path))
+
+
+def test_rows_match(solar_system, columns):
+    assert sorted(columns.get_names()) == sorted(solar_system.get_names())
+    assert sorted(c.get_name() for c in columns.get_hosts()) == ["Kerbol", "Sun"]
+
+    for name in solar_system.get_names() + ["Sun", "Kerbol"]:
+        assert tuple(columns.get_row(name)) == tuple(solar_system.get_row(name))
+
+    assert columns.get("Pluto") is None and "Pluto" not in columns and "Io" in columns
+    assert columns.get("Io").get_host() is columns.get("Europa").get_host() is columns.get("Jupiter")
+
+
+def test_arrays_give_the_same_transfers(solar_system, columns, hohmann):
+    names = solar_system.get_names()
+    expected = transfer_matrix(*body_arrays([solar_system.get(c) for c in names]))
+
+    arrays = columns.get_arrays()
+    position = {c: i for i, c in enumerate(np.asarray(arrays.get_names()).tolist())}
+    rows = [position[c] for c in names]
+    matrix = transfer_matrix(arrays.get_mass(), arrays.get_radius(), arrays.get_SMA(), arrays.get_altitude(), arrays.get_host_mu(), rows, rows)
+
+    for a, b in zip(expected, matrix):
+        np.testing.assert_allclose(b, a, rtol=1e-12)
+
+    # Hosts are in the arrays but never part of a transfer
+    assert np.all(np.isnan(arrays.get_host_mu()[[position["Sun"], position["Kerbol"]]]))
+
+    body = columns.get("Earth")
+    transfer = Transfer(body, columns.get("Mars"), Orbit(body.get_radius() + body.get_altitude(), body.get_radius() + body.get_altitude(), body),
+                        Orbit(columns.get("Mars").get_radius() + 200000, columns.get("Mars").get_radius() + 200000, columns.get("Mars")))
+    assert transfer.get_ejection_deltav() + transfer.get_capture_deltav() == \
+           pytest.approx(hohmann("Earth", "Mars").get_ejection_deltav() + hohmann("Earth", "Mars").get_capture_deltav(), rel=1e-12)
+
+
+def test_column_storage_as_the_catalog(solar_system, columns, tmp_path, monkeypatch):
+    expected = TransferStore(get_storage(), solar_system).get_pairs()
+    monkeypatch.delenv("EJECTION_SNAPSHOT")
+    EjectionCalc.set_storage(open_storage(str(tmp_path / "bodies.cols")))
+
+    assert isinstance(get_catalog(), ColumnCatalog)
+
+    pairs = TransferStore(get_storage(), get_catalog()).get_pairs()
+    expected = {(o, d): v for o, d, *v in zip(*(c.tolist() for c in expected))}
+    pairs = {(o, d): v for o, d, *v in zip(*(c.tolist() for c in pairs))}
+
+    assert pairs.keys() == expected.keys()
+    assert all(pairs[c] == pytest.approx(expected[c], rel=1e-12) for c in expected)
@@ -0,0 +1,36 @@
+import pytest
+import EjectionFlyby
+from EjectionCalc import *
+
+
+def test_destination_is_never_a_flyby(solar_system):
+    plan = EjectionFlyby.search("Earth", "Neptune", max_flybys=3, workers=0)
+    sequence = plan.get_sequence()
+
+    assert sequence[0] == "Earth" and sequence[-1] == "Neptune"
+    assert "Neptune" not in sequence[1:-1]
+    assert len(plan.get_flyby_deltav()) == len(sequence) - 2
+
+
+def test_no_better_than_direct_is_direct(solar_system, hohmann):
+    # The direct Hohmann transfer is the first incumbent, so the plan can never cost more than it
+    direct = hohmann("Earth", "Mars")
+    plan = EjectionFlyby.search("Earth", "Mars", max_flybys=2, workers=0)
+
+    assert plan.get_total_deltav() <= direct.get_ejection_deltav() + direct.get_capture_deltav() + 1e-6
+
+
+def test_workers_find_the_same_plan(solar_system):
+    serial = EjectionFlyby.search("Earth", "Saturn", max_flybys=2, workers=0)
+    parallel = EjectionFlyby.search("Earth", "Saturn", max_flybys=2, workers=2)
+
+    assert parallel.get_sequence() == serial.get_sequence()
+    assert abs(parallel.get_total_deltav() - serial.get_total_deltav()) < 1e-6
+
+
+def test_bad_searches_are_rejected(solar_system):
+    for origin, destination, max_flybys, grid, message in (("Earth", "Pluto", 3, 8, "unknown body 'Pluto'"), ("Sun", "Mars", 3, 8, "unknown body 'Sun'"),
+                                                           ("Earth", "Earth", 3, 8, "both"), ("Earth", "Io", 3, 8, "different hosts"),
+                                                           ("Earth", "Mars", -1, 8, "max_flybys"), ("Earth", "Mars", 1, 0, "grid")):
+        with pytest.raises(ValueError, match=message):
+            EjectionFlyby.search(origin, destination, max_flybys, grid=grid, workers=0)
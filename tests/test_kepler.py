@@ -0,0 +1,76 @@
+import math
+import numpy as np
+import pytest
+from EjectionCalc import *
+from EjectionKepler import body_elements, eccentric_anomaly, launch_windows, next_windows, state, true_longitude, wrap, window_timeline
+
+
+def newton(M, e):
+    # The scalar reference: Newton's method on Kepler's equation from E = M (or π for high eccentricity)
+    M = M % (2 * math.pi)
+    E = M if e < 0.8 else math.pi
+
+    for _ in range(100):
+        dE = (E - e * math.sin(E) - M) / (1 - e * math.cos(E))
+        E -= dE
+
+        if abs(dE) < 1e-15:
+            break
+
+    return E
+
+
+def test_eccentric_anomaly_matches_newton():
+    rng = np.random.default_rng(0)
+    M, e = rng.uniform(-20, 20, 5000), rng.uniform(0, 0.99, 5000)
+    E = eccentric_anomaly(M, e)
+
+    assert np.max(np.abs(E - e * np.sin(E) - np.remainder(M, 2 * math.pi))) < 1e-12
+    assert E == pytest.approx([newton(a, b) for a, b in zip(M, e)], abs=1e-10)
+
+
+def test_circular_orbits_and_shapes():
+    M = np.linspace(0, 4 * math.pi, 12).reshape(3, 4)
+
+    assert eccentric_anomaly(M, 0).shape == (3, 4)
+    assert eccentric_anomaly(M, 0) == pytest.approx(np.remainder(M, 2 * math.pi), abs=1e-15)
+    assert eccentric_anomaly(1.0, [0.1, 0.5]).shape == (2,)
+
+
+def test_state_conserves_energy_and_angular_momentum():
+    apoapsis, periapsis, mu = 3e11, 1e11, 1.327e20
+    t = np.linspace(0, 3e8, 200)
+    x, y, vx, vy = state(apoapsis, periapsis, mu, t)
+    r = np.hypot(x, y)
+    a = (apoapsis + periapsis) / 2
+
+    assert (x[0], y[0]) == pytest.approx((periapsis, 0))
+    assert (vx ** 2 + vy ** 2) / 2 - mu / r == pytest.approx(np.full(len(t), -mu / (2 * a)), rel=1e-9)
+    assert x * vy - y * vx == pytest.approx(np.full(len(t), math.sqrt(mu * a * (1 - ((apoapsis - periapsis) / (2 * a)) ** 2))), rel=1e-9)
+
+
+def test_windows_reach_the_phase_angle(solar_system, hohmann):
+    earth, mars = read_body("Earth"), read_body("Mars")
+    phase_angle = hohmann("Earth", "Mars").get_phase_angle()
+    windows = next_windows(earth, mars, phase_angle, count=4)
+
+    assert np.all(np.diff(windows) > 0) and windows[0] >= 0
+
+    for t in windows:
+        lead = true_longitude(*body_elements(mars)[:3], t) - true_longitude(*body_elements(earth)[:3], t)
+        assert abs(float(wrap(lead - phase_angle))) < 1e-6
+
+
+def test_equal_periods_have_no_window():
+    elements = (np.array([1e11]), np.array([1e11]), np.array([1.327e20]), np.array([0.0]), np.array([0.0]))
+    shifted = elements[:3] + (np.array([1.0]), np.array([0.0]))
+
+    assert np.all(np.isnan(launch_windows(elements, shifted, [0.5], count=3)))
+
+
+def test_timeline_covers_every_pair(solar_system):
+    bodies = [read_body(c) for c in ("Earth", "Mars", "Venus", "Io")]
+    i, j, windows = window_timeline(bodies, count=2)
+
+    assert sorted(zip(i.tolist(), j.tolist())) == [(a, b) for a in range(3) for b in range(3) if a != b]
+    assert windows.shape == (6, 2) and not np.any(np.isnan(windows))
@@ -0,0 +1,87 @@
+import math
+import numpy as np
+import pytest
+from EjectionCalc import read_body
+from EjectionPorkchop import contour_segments, hohmann_time, lambert, porkchop
+
+MU = 1.32712440018e20
+
+
+def propagate(x, y, vx, vy, t, mu):
+    # Scalar two-body propagation of an elliptic orbit with Newton's method on Kepler's equation
+    r0 = math.hypot(x, y)
+    a = 1 / (2 / r0 - (vx ** 2 + vy ** 2) / mu)
+    n = math.sqrt(mu / a ** 3)
+    e_cos, e_sin = 1 - r0 / a, (x * vx + y * vy) / math.sqrt(mu * a)
+    E0 = math.atan2(e_sin, e_cos)
+    e = math.hypot(e_cos, e_sin)
+    M = E0 - e * math.sin(E0) + n * t
+    E = M
+
+    for _ in range(50):
+        E -= (E - e * math.sin(E) - M) / (1 - e * math.cos(E))
+
+    dE = E - E0
+    f = 1 - a / r0 * (1 - math.cos(dE))
+    g = t - (dE - math.sin(dE)) / n
+    return f * x + g * vx, f * y + g * vy
+
+
+def test_recovers_the_velocity_of_propagated_orbits():
+    rng = np.random.default_rng(1)
+    starts, ends, velocities, times = [], [], [], []
+
+    for _ in range(200):
+        r = rng.uniform(0.5, 5) * 1.496e11
+        angle = rng.uniform(0, 2 * math.pi)
+        speed = math.sqrt(MU / r) * rng.uniform(0.8, 1.25)
+        flight = rng.uniform(0.05, 0.9)
+        x, y = r * math.cos(angle), r * math.sin(angle)
+        # Prograde, with some radial velocity
+        vx, vy = -speed * math.sin(angle + 0.2), speed * math.cos(angle + 0.2)
+        a = 1 / (2 / r - speed ** 2 / MU)
+        t = flight * 2 * math.pi * math.sqrt(a ** 3 / MU)
+
+        starts.append((x, y))
+        ends.append(propagate(x, y, vx, vy, t, MU))
+        velocities.append((vx, vy))
+        times.append(t)
+
+    starts, ends, velocities = np.array(starts), np.array(ends), np.array(velocities)
+    v1, _ = lambert(starts[:, 0], starts[:, 1], ends[:, 0], ends[:, 1], np.array(times), MU)
+    error = np.hypot(v1[0] - velocities[:, 0], v1[1] - velocities[:, 1]) / np.hypot(*velocities.T)
+
+    assert np.all(error < 1e-6)
+
+
+def test_impossible_flights_are_nan():
+    v1, v2 = lambert([1.5e11, 1.5e11], [0, 0], [0, 0], [2e11, 2e11], [0, -5], MU)
+
+    assert np.all(np.isnan(v1[0])) and np.all(np.isnan(v2[1]))
+
+
+def test_porkchop_minimum_is_the_hohmann_transfer(solar_system, hohmann):
+    # Kerbin and Jool have circular orbits; Jool starts at the Hohmann phase angle ahead of Kerbin
+    kerbin, jool = read_body("Kerbin"), read_body("Jool")
+    transfer = hohmann("Kerbin", "Jool")
+    mu = kerbin.get_host().get_mu()
+
+    time = hohmann_time(kerbin, jool)
+    departures = np.linspace(-20, 20, 41) * 86400
+    arrivals = time + np.linspace(-20, 20, 41) * 86400
+    c3, v_inf = porkchop(kerbin, jool, departures, arrivals, destination_phase=(transfer.get_phase_angle(), 0))
+
+    transfer_a = (kerbin.get_SMA() + jool.get_SMA()) / 2
+    v_soi = math.sqrt(mu * (2 / kerbin.get_SMA() - 1 / transfer_a)) - math.sqrt(mu / kerbin.get_SMA())
+
+    assert time == pytest.approx(transfer.get_transfer_time(), rel=1e-12)
+    assert np.nanmin(c3) == pytest.approx(v_soi ** 2, rel=0.01)
+
+
+def test_contour_of_a_cone_is_a_closed_ring():
+    i, j = np.mgrid[0:21, 0:21]
+    segments = contour_segments(np.hypot(i - 10, j - 10), 5)
+    radii = np.hypot(segments[:, [0, 2]] - 10, segments[:, [1, 3]] - 10)
+
+    assert len(segments) > 20
+    assert np.all(np.abs(radii - 5) < 0.1)
@@ -0,0 +1,69 @@
+import json
+import pytest
+import EjectionProfile
+
+
+@pytest.fixture
+def profile():
+    EjectionProfile.reset()
+    yield EjectionProfile
+    EjectionProfile.disable()
+    EjectionProfile.reset()
+
+
+def test_nothing_is_recorded_while_disabled(profile):
+    square = profile.timed("square")(lambda x: x * x)
+
+    with profile.measure("block"):
+        assert square(3) == 9
+
+    assert profile.get_stats() == {}
+
+
+def test_enabled_stats(profile):
+    profile.enable()
+    square = profile.timed("square")(lambda x: x * x)
+
+    for i in range(5):
+        square(i)
+
+    with profile.measure("block"):
+        pass
+
+    for seconds in (1.0, 2.0, 3.0, 4.0):
+        profile.record("fixed", seconds)
+
+    stats = profile.get_stats()
+
+    assert stats["square"]["count"] == 5 and stats["block"]["count"] == 1
+    assert stats["fixed"] == {"count": 4, "total": 10.0, "mean": 2.5, "p50": 3.0, "p90": 4.0, "p99": 4.0, "max": 4.0}
+
+
+def test_exceptions_are_timed(profile):
+    profile.enable()
+
+    @profile.timed("fail")
+    def fail():
+        raise ValueError
+
+    with pytest.raises(ValueError):
+        fail()
+
+    assert profile.get_stats()["fail"]["count"] == 1
+
+
+def test_reservoir_keeps_exact_totals(profile, monkeypatch):
+    monkeypatch.setattr(profile, "SAMPLES", 10)
+
+    for i in range(100):
+        profile.record("many", 1.0)
+
+    stats = profile.get_stats()["many"]
+    assert stats["count"] == 100 and stats["total"] == 100.0 and stats["p99"] == 1.0
+
+
+def test_dump(profile, tmp_path):
+    profile.record("one", 0.5)
+    profile.dump(str(tmp_path / "profile.json"))
+
+    assert json.loads((tmp_path / "profile.json").read_text())["one"]["count"] == 1
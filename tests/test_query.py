@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+import EjectionQuery
+from EjectionBench import synthetic_rows
+from EjectionCalc import *
+from EjectionQuery import DestinationIndex, cheapest_destinations
+
+
+@pytest.fixture
+def bodies():
+    rows = synthetic_rows(3000)[1:]
+    columns = list(zip(*rows))
+    return BodyArray(np.array(columns[1]), np.array(columns[2]), np.array(columns[3]), np.array(columns[4]), np.full(len(rows), G * 1.989e30),
+                     np.array(columns[7], dtype=float), names=list(columns[0]), hosts=list(columns[5]))
+
+
+def brute_force(bodies, origin, max_time=None, max_deltav=None):
+    # Every destination from the full transfer matrix row, cheapest first
+    p = list(bodies.get_names()).index(origin)
+    phase_angle, _, ejection_dv, capture_dv, transfer_time = (c[0] for c in transfer_matrix(bodies.get_mass(), bodies.get_radius(), bodies.get_SMA(),
+                                                                                               bodies.get_altitude(), bodies.get_host_mu(), origins=[p]))
+    total = ejection_dv + capture_dv
+    keep = ~np.isnan(total)
+
+    if max_time is not None:
+        keep &= transfer_time <= max_time
+
+    if max_deltav is not None:
+        keep &= total < max_deltav
+
+    order = [c for c in np.argsort(total, kind="stable") if keep[c]]
+    return [(bodies.get_names()[c], float(total[c])) for c in order]
+
+
+@pytest.mark.parametrize("origin", ["Body 0", "Body 17", "Body 2999"])
+def test_matches_brute_force(bodies, origin, monkeypatch):
+    monkeypatch.setattr(EjectionQuery, "QUERY_BLOCK", 32)
+    index = DestinationIndex(bodies)
+    expected = brute_force(bodies, origin)
+
+    result = index.cheapest(origin, 10)
+    assert [c[0] for c in result] == [c[0] for c in expected[:10]]
+    assert [c[1] for c in result] == pytest.approx([c[1] for c in expected[:10]], rel=1e-12)
+    assert index.get_evaluated() < len(bodies) // 2
+
+
+def test_limits_match_brute_force(bodies):
+    index = DestinationIndex(bodies)
+    max_time = 3 * 31536000
+    expected = brute_force(bodies, "Body 5", max_time=max_time)
+    assert [c[0] for c in index.cheapest("Body 5", 20, max_time=max_time)] == [c[0] for c in expected[:20]]
+
+    max_deltav = brute_force(bodies, "Body 5")[4][1]
+    assert [c[0] for c in index.cheapest("Body 5", 20, max_deltav=max_deltav)] == [c[0] for c in brute_force(bodies, "Body 5")[:4]]
+
+
+def test_catalog_query(solar_system, hohmann):
+    result = cheapest_destinations("Earth", 3)
+    transfers = {c: hohmann("Earth", c) for c in ("Mercury", "Venus", "Mars", "Jupiter", "Saturn", "Uranus", "Neptune")}
+    totals = sorted((c.get_ejection_deltav() + c.get_capture_deltav(), name) for name, c in transfers.items())
+
+    assert [c[0] for c in result] == [c[1] for c in totals[:3]]
+    assert [c[1] for c in result] == pytest.approx([c[0] for c in totals[:3]], rel=1e-12)
+    assert result[0][4] == pytest.approx(transfers[result[0][0]].get_transfer_time(), rel=1e-12)
+
+    with pytest.raises(ValueError):
+        cheapest_destinations("Sun")
+
+    with pytest.raises(ValueError):
+        cheapest_destinations("Pluto")
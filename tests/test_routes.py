@@ -0,0 +1,77 @@
+import itertools, math
+import pytest
+from EjectionCalc import *
+from EjectionRoutes import moon_leg, plan_route
+
+SUN_SYSTEM = ["Mercury", "Venus", "Earth", "Mars", "Jupiter", "Saturn", "Uranus", "Neptune", "Moon", "Io", "Europa"]
+
+
+def brute_force(hohmann, names):
+    # Floyd-Warshall over edges built one at a time from Transfer and moon_leg
+    cost = {(a, b): 0.0 if a == b else math.inf for a in names for b in names}
+
+    for a, b in itertools.permutations(names, 2):
+        host_a, host_b = read_body(a).get_host().get_name(), read_body(b).get_host().get_name()
+
+        if host_a == host_b:
+            transfer = hohmann(a, b)
+            cost[a, b] = transfer.get_ejection_deltav() + transfer.get_capture_deltav()
+
+        elif host_a == b or host_b == a:
+            cost[a, b] = sum(moon_leg(read_body(a if host_a == b else b), read_body(b if host_a == b else a))[:2])
+
+    for k, a, b in itertools.product(names, repeat=3):
+        cost[a, b] = min(cost[a, b], cost[a, k] + cost[k, b])
+
+    return cost
+
+
+def test_moon_to_planet_goes_through_hosts(solar_system, hohmann):
+    route = plan_route("Earth", "Io")
+    transfer = hohmann("Earth", "Jupiter")
+    ejection_dv, capture_dv, time = moon_leg(read_body("Io"), read_body("Jupiter"))
+
+    assert route.get_bodies() == ["Earth", "Jupiter", "Io"]
+    assert route.get_legs()[0][2:] == pytest.approx((transfer.get_ejection_deltav(), transfer.get_capture_deltav(), transfer.get_transfer_time()), rel=1e-12)
+    assert route.get_legs()[1][2:] == pytest.approx((capture_dv, ejection_dv, time), rel=1e-12)
+    assert route.get_total_deltav() == pytest.approx(sum(c[2] + c[3] for c in route.get_legs()), rel=1e-12)
+    assert route.get_time() == pytest.approx(sum(c[4] for c in route.get_legs()), rel=1e-12)
+
+
+def test_routes_are_optimal(solar_system, hohmann):
+    cost = brute_force(hohmann, SUN_SYSTEM)
+
+    for origin, destination in itertools.permutations(SUN_SYSTEM, 2):
+        assert plan_route(origin, destination).get_total_deltav() == pytest.approx(cost[origin, destination], rel=1e-9)
+
+
+def test_other_systems_and_unknown_bodies(solar_system):
+    assert plan_route("Earth", "Laythe") is None
+    assert plan_route("Earth", "Earth").get_legs() == []
+
+    with pytest.raises(ValueError):
+        plan_route("Earth", "Pluto")
+
+
+def test_routes_follow_catalog_writes(solar_system, hohmann):
+    before = plan_route("Earth", "Mars").get_total_deltav()
+    row = list(solar_system.get_row("Mars"))
+    row[3], row[4] = row[3] * 2, row[4] * 2
+    write_bodies([tuple(row)])
+
+    assert plan_route("Earth", "Mars").get_total_deltav() != before
+    assert plan_route("Earth", "Mars").get_total_deltav() == pytest.approx(brute_force(hohmann, SUN_SYSTEM)["Earth", "Mars"], rel=1e-9)
+
+
+def test_unchanged_catalog_is_not_fingerprinted_again(solar_system, monkeypatch):
+    plan_route("Earth", "Mars")
+    calls = []
+    fingerprint = solar_system.get_fingerprint
+    monkeypatch.setattr(solar_system, "get_fingerprint", lambda name: calls.append(name) or fingerprint(name))
+
+    plan_route("Earth", "Io")
+    assert calls == []
+
+    write_bodies([solar_system.get_row("Mars")])
+    plan_route("Earth", "Mars")
+    assert len(calls) >= len(SUN_SYSTEM)
@@ -0,0 +1,97 @@
+import asyncio, json, threading
+import pytest
+import EjectionServer
+from EjectionBatch import RESULT_FIELDS, solve
+
+
+async def request(port, method, target, body=b""):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write((method + " " + target + " HTTP/1.1\r\nContent-Length: " + str(len(body)) + "\r\nConnection: close\r\n\r\n").encode() + body)
+    await writer.drain()
+
+    status = int((await reader.readline()).split()[1])
+    response = await reader.read()
+    writer.close()
+
+    return status, json.loads(response.partition(b"\r\n\r\n")[2])
+
+
+def serve(bodies_path, test, workers=None):
+    async def run():
+        server = EjectionServer.TransferServer(bodies_path, workers)
+        _, port = await server.start(port=0)
+
+        try:
+            return await test(server, port)
+
+        finally:
+            await server.close()
+
+    return asyncio.run(run())
+
+
+def test_endpoints(solar_system, bodies_path, hohmann):
+    async def test(server, port):
+        return [await request(port, "GET", "/transfer?origin=Earth&destination=Mars"), await request(port, "GET", "/bodies"),
+                await request(port, "GET", "/transfer?origin=Earth"), await request(port, "GET", "/nowhere"),
+                await request(port, "GET", "/batch"), await request(port, "POST", "/batch", b"{not json")]
+
+    transfer, bodies, missing, nowhere, get_batch, bad_batch = serve(bodies_path, test)
+    expected = hohmann("Earth", "Mars")
+
+    assert transfer[0] == 200
+    assert transfer[1]["ejection_dv"] == pytest.approx(expected.get_ejection_deltav(), rel=1e-12)
+    assert transfer[1]["capture_dv"] == pytest.approx(expected.get_capture_deltav(), rel=1e-12)
+    assert transfer[1]["transfer_time"] == pytest.approx(expected.get_transfer_time(), rel=1e-12)
+    assert bodies[0] == 200 and "Earth" in bodies[1]["names"] and "Sun" in bodies[1]["hosts"]
+    assert [c[0] for c in (missing, nowhere, get_batch, bad_batch)] == [400, 404, 405, 400]
+
+
+def test_batch_matches_solve(solar_system, bodies_path, monkeypatch):
+    records = [{"origin": "Earth", "destination": "Mars"}, {"origin": "Io", "destination": "Europa", "parking_altitude": 0},
+               {"origin": "Earth", "destination": "Pluto"}]
+    expected = [dict(zip(RESULT_FIELDS, solve(EjectionServer.query_of(c)))) for c in records]
+
+    async def test(server, port):
+        inline = await request(port, "POST", "/batch", json.dumps(records).encode())
+        # Past BATCH_INLINE the same queries go through the process pool, in chunks
+        monkeypatch.setattr(EjectionServer, "BATCH_INLINE", 1)
+        monkeypatch.setattr(EjectionServer, "BATCH_CHUNK", 2)
+        pooled = await request(port, "POST", "/batch", json.dumps(records).encode())
+        return inline, pooled
+
+    inline, pooled = serve(bodies_path, test, workers=1)
+
+    assert inline == (200, expected)
+    assert pooled == (200, expected)
+
+
+def test_identical_requests_are_coalesced(solar_system, bodies_path, monkeypatch):
+    calls = []
+    release = threading.Event()
+
+    def slow_solve(query):
+        calls.append(query)
+        release.wait(5)
+        return solve(query)
+
+    monkeypatch.setattr(EjectionServer, "solve", slow_solve)
+
+    async def test(server, port):
+        query = ("Earth", "Mars", None, None)
+        tasks = [asyncio.ensure_future(server.transfer(query)) for _ in range(5)]
+        tasks.append(asyncio.ensure_future(server.transfer(("Earth", "Venus", None, None))))
+
+        await asyncio.sleep(0.1)
+        in_flight = server.get_stats()["in_flight"]
+        release.set()
+        results = await asyncio.gather(*tasks)
+
+        return in_flight, results, server.get_stats()
+
+    in_flight, results, stats = serve(bodies_path, test)
+
+    assert in_flight == 2
+    assert len(calls) == 2
+    assert all(c == results[0] for c in results[:5]) and results[5][1] == "Venus"
+    assert stats["coalesced"] == 4 and stats["in_flight"] == 0
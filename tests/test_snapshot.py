@@ -0,0 +1,116 @@
+import os
+import numpy as np
+import pytest
+from EjectionCalc import *
+from EjectionMatrix import SNAPSHOT_FORMAT, TransferStore, catalog_version, main, read_snapshot, snapshot_path, write_snapshot
+
+
+def assert_same_pairs(a, b):
+    for x, y in zip(a, b):
+        assert x.tolist() == y.tolist()
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_round_trip(solar_system, tmp_path, compress):
+    pairs = TransferStore(get_storage(), solar_system).get_pairs()
+    fingerprints = {c: solar_system.get_fingerprint(c) for c in solar_system.get_names()}
+    path = str(tmp_path / "pairs.npz")
+
+    write_snapshot(path, fingerprints, pairs, compress)
+    read_fingerprints, read_pairs, version, (names, codes) = read_snapshot(path)
+
+    assert read_fingerprints == fingerprints
+    assert version == catalog_version(fingerprints)
+    assert_same_pairs(read_pairs, pairs)
+    assert_same_pairs([np.array(names, dtype=object)[c] for c in codes], pairs[:2])
+    assert [c.dtype for c in read_pairs[2:]] == [np.dtype(float)] * 5
+
+
+def test_reopening_reads_the_snapshot(solar_system):
+    path = snapshot_path(get_storage())
+    store = TransferStore(get_storage(), solar_system, path)
+    count = store.update()
+
+    assert count > 0 and os.path.exists(path)
+
+    reopened = TransferStore(get_storage(), solar_system, path)
+    assert reopened.update() == 0
+    assert_same_pairs(reopened.get_pairs(), store.get_pairs())
+
+
+def test_snapshot_tagged_with_the_catalog_is_trusted(solar_system):
+    path = snapshot_path(get_storage())
+    store = TransferStore(get_storage(), solar_system, path)
+    store.update()
+    fingerprints = {c: solar_system.get_fingerprint(c) for c in solar_system.get_names() if read_body(c) is not None}
+
+    # The tag matches the catalog, so the per-body fingerprints are never compared
+    write_snapshot(path, dict(fingerprints, Mars="stale"), store.get_pairs())
+    np.savez(path, **dict(np.load(path), version=np.array(catalog_version(fingerprints))))
+    assert TransferStore(get_storage(), solar_system, path).update() == 0
+
+    write_snapshot(path, dict(fingerprints, Mars="stale"), store.get_pairs())
+    assert TransferStore(get_storage(), solar_system, path).update() == 2 * 7
+
+
+def test_unchanged_catalog_is_not_fingerprinted_again(solar_system, monkeypatch):
+    store = TransferStore(get_storage(), solar_system)
+    store.update()
+    calls = []
+    fingerprint = solar_system.get_fingerprint
+    monkeypatch.setattr(solar_system, "get_fingerprint", lambda name: calls.append(name) or fingerprint(name))
+
+    assert store.update() == 0 and calls == []
+
+    write_bodies([solar_system.get_row("Mars")])
+    store.update()
+    assert calls
+
+
+def test_stale_snapshot_recomputes_changed_pairs(solar_system):
+    path = snapshot_path(get_storage())
+    TransferStore(get_storage(), solar_system, path).update()
+
+    row = list(solar_system.get_row("Jool"))
+    row[1] *= 2
+    write_bodies([tuple(row)])
+    fresh = TransferStore(get_storage(), get_catalog())
+    store = TransferStore(get_storage(), get_catalog(), path)
+
+    # Only Jool <-> Kerbin is recomputed; Laythe goes stale but is alone around Jool
+    assert store.update() == 2
+    assert read_snapshot(path)[0]["Jool"] == get_catalog().get_fingerprint("Jool")
+
+    row = list(get_catalog().get_row("Mars"))
+    row[3] *= 1.1
+    write_bodies([tuple(row)])
+
+    assert store.update() == 2 * 7
+    assert sorted(zip(*(c.tolist() for c in store.get_pairs()))) == sorted(zip(*(c.tolist() for c in fresh.get_pairs())))
+
+
+def test_corrupt_snapshot_falls_back(solar_system):
+    path = snapshot_path(get_storage())
+    expected = TransferStore(get_storage(), solar_system).get_pairs()
+
+    with open(path, "wb") as f:
+        f.write(b"not a snapshot")
+
+    store = TransferStore(get_storage(), solar_system, path)
+    assert store.update() == len(expected[0])
+    assert_same_pairs(read_snapshot(path)[1], store.get_pairs())
+
+
+def test_unknown_format_is_rejected(solar_system, tmp_path):
+    path = str(tmp_path / "pairs.npz")
+    np.savez(path, format=np.array(SNAPSHOT_FORMAT + 1))
+
+    with pytest.raises(ValueError):
+        read_snapshot(path)
+
+
+def test_command_line(solar_system, bodies_path, tmp_path):
+    path = str(tmp_path / "cli.npz")
+
+    assert main(["--storage", bodies_path, "--snapshot", path]) == 0
+    assert len(read_snapshot(path)[1][0]) == len(TransferStore(get_storage(), get_catalog()).get_pairs()[0])
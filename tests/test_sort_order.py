@@ -0,0 +1,70 @@
+import numpy as np
+from EjectionUI import ArraySortOrder, SortOrder
+
+
+def test_numeric_names_are_filtered_as_text():
+    names = np.array(["1998", "2004", "2010"], dtype=object)
+    order = ArraySortOrder([names, names[::-1], np.array([3.0, 1.0, 2.0])])
+    order.set_filter("200")
+
+    assert order.order.tolist() == [1]
+
+    order.set_filter("2010")
+    assert sorted(order.order.tolist()) == [0, 2]
+
+
+def test_value_columns_sort_numerically():
+    order = ArraySortOrder([np.array(["a", "b", "c"], dtype=object), np.array(["x", "y", "z"], dtype=object),
+                            np.array(["10", "9", "100"], dtype=object)])
+    order.click(2)
+    assert order.order.tolist() == [1, 0, 2]
+
+    order.click(2)
+    assert order.order.tolist() == [2, 0, 1]
+
+
+def test_filter_and_secondary_sort():
+    origins = np.array(["Earth", "Earth", "Mars", "Venus"], dtype=object)
+    destinations = np.array(["Mars", "Venus", "Earth", "Earth"], dtype=object)
+    order = ArraySortOrder([origins, destinations, np.array([5.0, 2.0, 5.0, 1.0])])
+    order.click(2)
+    order.click(0, add=True)
+
+    assert order.order.tolist() == [3, 1, 0, 2]
+
+    order.set_filter("mars")
+    assert order.order.tolist() == [0, 2]
+
+
+def test_rows_sort_by_parsed_keys():
+    rows = [("Mars", "10.5"), ("Earth", "9"), ("Venus", "100")]
+    order = SortOrder(rows)
+    order.click(1)
+    assert order.order == [1, 0, 2]
+
+    order.click(1)
+    assert order.order == [2, 0, 1]
+
+    order.click(0)
+    assert order.order == [1, 0, 2]
+
+
+def test_shift_click_breaks_ties():
+    rows = [("Earth", "2"), ("Mars", "1"), ("Earth", "1"), ("Mars", "2")]
+    order = SortOrder(rows)
+    order.click(0)
+    order.click(1, add=True)
+
+    assert order.order == [2, 0, 1, 3]
+    assert order.get_columns() == [(0, True), (1, True)]
+
+    order.click(1, add=True)
+    assert order.order == [0, 2, 3, 1]
+
+
+def test_update_keeps_the_sort():
+    order = SortOrder([("b", "2"), ("a", "1")])
+    order.click(1)
+    order.update([("b", "2"), ("a", "1"), ("c", "0")])
+
+    assert order.order == [2, 1, 0]
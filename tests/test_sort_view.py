@@ -0,0 +1,47 @@
+import queue, threading
+import numpy as np
+import EjectionUI
+from EjectionMatrix import get_transfer_store
+
+
+def load(monkeypatch, chunk):
+    # Runs the Sort view's worker without Tk and returns what it queued
+    monkeypatch.setattr(EjectionUI, "SORT_CHUNK_ORIGINS", chunk)
+    view = object.__new__(EjectionUI.SortingUI)
+    view._SortingUI__queue = queue.Queue()
+    view._SortingUI__closed = False
+    view._SortingUI__cancel = threading.Event()
+    view._SortingUI__load()
+
+    messages = []
+
+    while not view._SortingUI__queue.empty():
+        messages.append(view._SortingUI__queue.get_nowait())
+
+    return messages
+
+
+def test_pairs_stream_in_chunks(solar_system, monkeypatch):
+    messages = load(monkeypatch, 2)
+    kinds = [c[0] for c in messages]
+
+    assert kinds[0] == "count" and kinds[-1] == "done"
+    assert kinds.count("pairs") > 2
+
+    chunks = [c[1] for c in messages if c[0] == "pairs"]
+    origins = np.concatenate([c[0] for c in chunks])
+    destinations = np.concatenate([c[1] for c in chunks])
+
+    assert len(origins) == messages[0][1]
+    assert all(len(c) == 8 and set(c[7]) <= set(EjectionUI.STRATEGIES) for c in chunks)
+
+    store = get_transfer_store().get_pairs()
+    assert sorted(zip(origins, destinations)) == sorted(zip(store[0], store[1]))
+
+
+def test_current_store_is_sent_at_once(solar_system, monkeypatch):
+    get_transfer_store().update()
+    messages = load(monkeypatch, 2)
+
+    assert [c[0] for c in messages] == ["count", "pairs", "done"]
+    assert len(messages[1][1][0]) == messages[0][1]
@@ -0,0 +1,89 @@
+import math
+import numpy as np
+import pytest
+from EjectionCalc import *
+from EjectionStrategy import (BI_ELLIPTIC_RATIOS, STRATEGIES, bi_elliptic_arrays, compare_strategies, edelbaum_deltav, pair_strategies,
+                              strategy_matrix)
+
+AU = 1.496e11
+MU_SUN = 1.327e20
+
+
+def bi_elliptic(r1, r2, rb, mu=MU_SUN):
+    # The scalar reference between circular orbits, for bodies too light to need an escape burn
+    a1, a2 = (r1 + rb) / 2, (r2 + rb) / 2
+    return (math.sqrt(mu * (2 / r1 - 1 / a1)) - math.sqrt(mu / r1) + math.sqrt(mu * (2 / rb - 1 / a2)) - math.sqrt(mu * (2 / rb - 1 / a1)) +
+            math.sqrt(mu * (2 / r2 - 1 / a2)) - math.sqrt(mu / r2))
+
+
+def hohmann_deltav(r1, r2, mu=MU_SUN):
+    a = (r1 + r2) / 2
+    return abs(math.sqrt(mu * (2 / r1 - 1 / a)) - math.sqrt(mu / r1)) + abs(math.sqrt(mu / r2) - math.sqrt(mu * (2 / r2 - 1 / a)))
+
+
+def tiny_bodies(*SMAs):
+    # 1 kg point masses, still well inside their own SOI
+    count = len(SMAs)
+    return np.full(count, 1.0), np.full(count, 1e-3), np.array(SMAs), np.zeros(count), np.full(count, MU_SUN)
+
+
+def test_hohmann_row_matches_transfer_matrix(solar_system):
+    arrays = body_arrays([read_body(c) for c in solar_system.get_names()])
+    choice, deltav, time, _ = strategy_matrix(*arrays)
+    matrix = transfer_matrix(*arrays)
+
+    np.testing.assert_allclose(deltav[0], matrix[2] + matrix[3], rtol=1e-12)
+    np.testing.assert_allclose(time[0], matrix[4], rtol=1e-12)
+    assert np.array_equal(choice == -1, np.isnan(matrix[2]))
+
+
+@pytest.mark.parametrize("ratio", [2.0, 20.0])
+def test_bi_elliptic_matches_the_scalar_formula(ratio):
+    r1, r2 = AU, 20 * AU
+    deltav, time, apoapsis = bi_elliptic_arrays(r1, r2, MU_SUN, G, np.inf, 1.0, G, np.inf, 1.0, ratios=[ratio])
+
+    assert apoapsis == pytest.approx(ratio * r2)
+    assert deltav == pytest.approx(bi_elliptic(r1, r2, ratio * r2), rel=1e-8)
+    assert time == pytest.approx(math.pi * (math.sqrt(((r1 + ratio * r2) / 2) ** 3 / MU_SUN) + math.sqrt(((r2 + ratio * r2) / 2) ** 3 / MU_SUN)), rel=1e-12)
+
+
+def test_bi_elliptic_wins_for_large_ratios():
+    choice, deltav, _, apoapsis = strategy_matrix(*tiny_bodies(AU, 1.5 * AU, 20 * AU, 60 * AU))
+
+    for j, r2 in ((1, 1.5 * AU), (2, 20 * AU), (3, 60 * AU)):
+        best = min(bi_elliptic(AU, r2, r2 * c) for c in BI_ELLIPTIC_RATIOS)
+
+        assert deltav[0, 0, j] == pytest.approx(hohmann_deltav(AU, r2), rel=1e-6)
+        assert deltav[1, 0, j] == pytest.approx(best, rel=1e-6)
+
+    assert STRATEGIES[choice[0, 1]] == "Hohmann"
+    assert STRATEGIES[choice[0, 2]] == STRATEGIES[choice[0, 3]] == "Bi-elliptic"
+    assert apoapsis[0, 3] > 60 * AU
+
+
+def test_low_thrust_and_isp():
+    v1, v2 = math.sqrt(MU_SUN / AU), math.sqrt(MU_SUN / (1.5 * AU))
+    choice, deltav, time, _ = strategy_matrix(*tiny_bodies(AU, 1.5 * AU), acceleration=1e-3)
+
+    assert edelbaum_deltav(v1, v2) == pytest.approx(v1 - v2)
+    assert deltav[2, 0, 1] == pytest.approx(v1 - v2, rel=1e-6)
+    assert time[2, 0, 1] == pytest.approx(deltav[2, 0, 1] / 1e-3)
+
+    # Low thrust needs more Δv than a Hohmann transfer, but far less propellant at a high Isp
+    assert choice[0, 1] == 0
+    assert strategy_matrix(*tiny_bodies(AU, 1.5 * AU), isp=(350, 350, 3000))[0][0, 1] == 2
+
+
+def test_pairs_match_the_matrix(solar_system):
+    names = solar_system.get_names()
+    matrix = strategy_matrix(*body_arrays([read_body(c) for c in names]))
+    i, j = np.nonzero(matrix[0] >= 0)
+    choice, deltav, time, apoapsis = pair_strategies([names[c] for c in i], [names[c] for c in j])
+
+    assert np.array_equal(choice, matrix[0][i, j])
+    np.testing.assert_allclose(deltav, matrix[1][:, i, j], rtol=1e-12)
+    np.testing.assert_allclose(time, matrix[2][:, i, j], rtol=1e-12)
+
+    result = compare_strategies("Earth", "Mars")
+    assert sorted(c[0] for c in result) == sorted(STRATEGIES)
+    assert result[0][1] == min(c[1] for c in result)
@@ -0,0 +1,53 @@
+from EjectionCalc import *
+
+
+def orbits(origin, destination):
+    r1, r2 = origin.get_radius() + origin.get_altitude(), destination.get_radius() + destination.get_altitude()
+    return Orbit(r1, r1, origin), Orbit(r2, r2, destination)
+
+
+def cached(cache, origin, destination):
+    origin, destination = read_body(origin), read_body(destination)
+    return cache.get_transfer(origin, destination, *orbits(origin, destination))
+
+
+def test_hits_return_the_cached_result(solar_system, hohmann):
+    cache = TransferCache(8)
+    first = cached(cache, "Earth", "Mars")
+    again = cached(cache, "Earth", "Mars")
+
+    assert again is first
+    assert first.get_ejection_deltav() == hohmann("Earth", "Mars").get_ejection_deltav()
+    assert cache.get_stats()["hits"] == 1 and cache.get_stats()["misses"] == 1
+
+
+def test_changed_inputs_are_a_miss(solar_system, hohmann):
+    cache = TransferCache(8)
+    first = cached(cache, "Earth", "Mars")
+    read_body("Mars").set_mass(read_body("Mars").get_mass() * 2)
+    second = cached(cache, "Earth", "Mars")
+
+    assert second is not first
+    assert second.get_capture_deltav() == hohmann("Earth", "Mars").get_capture_deltav()
+
+
+def test_least_recently_used_is_evicted(solar_system):
+    cache = TransferCache(2)
+    cached(cache, "Mercury", "Venus")
+    cached(cache, "Mercury", "Earth")
+    cached(cache, "Mercury", "Venus")
+    cached(cache, "Venus", "Earth")
+
+    assert cache.get_stats()["evictions"] == 1 and cache.get_stats()["entries"] == 2
+    cached(cache, "Mercury", "Venus")
+    assert cache.get_stats()["hits"] == 2
+
+
+def test_refreshed_bodies_invalidate_entries(solar_system):
+    cached(transfer_cache, "Io", "Europa")
+    cached(transfer_cache, "Earth", "Mars")
+    assert transfer_cache.get_stats()["entries"] == 2
+
+    solar_system.refresh(["Jupiter"])
+
+    assert transfer_cache.get_stats()["entries"] == 1
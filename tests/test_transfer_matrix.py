@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+from EjectionCalc import *
+
+
+def test_matches_transfer_for_every_pair(solar_system, hohmann):
+    names = get_names()
+    bodies = [read_body(c) for c in names]
+    phase_angle, ejection_angle, ejection_dv, capture_dv, transfer_time = transfer_matrix(*body_arrays(bodies))
+
+    for i, origin in enumerate(bodies):
+        for j, destination in enumerate(bodies):
+            if i == j or origin.get_host().get_name() != destination.get_host().get_name():
+                assert np.isnan(ejection_dv[i, j]) and np.isnan(phase_angle[i, j])
+                continue
+
+            transfer = hohmann(names[i], names[j])
+            assert phase_angle[i, j] == pytest.approx(transfer.get_phase_angle(), rel=1e-12, abs=1e-12)
+            assert ejection_angle[i, j] == pytest.approx(transfer.get_ejection_angle(), rel=1e-12)
+            assert ejection_dv[i, j] == pytest.approx(transfer.get_ejection_deltav(), rel=1e-12)
+            assert capture_dv[i, j] == pytest.approx(transfer.get_capture_deltav(), rel=1e-12)
+            assert transfer_time[i, j] == pytest.approx(transfer.get_transfer_time(), rel=1e-12)
+
+
+def test_row_chunks_match_the_full_matrix(solar_system):
+    arrays = body_arrays([read_body(c) for c in get_names()])
+    full = transfer_matrix(*arrays)
+    chunks = [transfer_matrix(*arrays, origins=np.arange(start, min(start + 4, len(arrays[0])))) for start in range(0, len(arrays[0]), 4)]
+
+    for k, whole in enumerate(full):
+        np.testing.assert_array_equal(np.concatenate([c[k] for c in chunks]), whole)
+
+
+def test_subsets_match_the_full_matrix(solar_system):
+    arrays = body_arrays([read_body(c) for c in get_names()])
+    full = transfer_matrix(*arrays)
+    origins, destinations = np.array([3, 0, 7]), np.array([1, 2, 5, 4])
+
+    for whole, part in zip(full, transfer_matrix(*arrays, origins=origins, destinations=destinations)):
+        np.testing.assert_array_equal(part, whole[np.ix_(origins, destinations)])
+
+
+def test_wide_phase_angles_are_wrapped(solar_system):
+    # Mercury -> Neptune has a raw phase angle of many turns
+    arrays = body_arrays([read_body(c) for c in get_names()])
+    phase_angle = transfer_matrix(*arrays)[0]
+    valid = phase_angle[~np.isnan(phase_angle)]
+
+    assert np.all((valid >= -math.pi) & (valid <= 2 * math.pi))
+
+
+def test_wide_sma_ratios_wrap_like_transfer(solar_system, hohmann):
+    # Vulcan -> Mercury is a ratio of 10^4, a raw phase angle of about -10^5 turns
+    write_bodies([("Vulcan", 1e23, 2e6, 5.79e14, 5.79e14, "Sun", "red", 1000)])
+    names = get_names()
+    phase_angle = transfer_matrix(*body_arrays([read_body(c) for c in names]))[0]
+    mercury, vulcan = names.index("Mercury"), names.index("Vulcan")
+    raw = math.pi * (1 - 1/math.sqrt(8) * math.sqrt((read_body("Vulcan").get_SMA() / read_body("Mercury").get_SMA() + 1) ** 3))
+
+    assert phase_angle[vulcan, mercury] == pytest.approx(-math.fmod(-raw, 2 * math.pi), rel=1e-12)
+    # Transfer subtracts one turn at a time, so it drifts by rounding over that many steps
+    assert phase_angle[vulcan, mercury] == pytest.approx(hohmann("Vulcan", "Mercury").get_phase_angle(), abs=1e-5)
+    assert phase_angle[mercury, vulcan] == pytest.approx(hohmann("Mercury", "Vulcan").get_phase_angle(), rel=1e-12)
@@ -0,0 +1,100 @@
+import threading
+import numpy as np
+import pytest
+import EjectionCalc
+from EjectionCalc import *
+from EjectionMatrix import TransferStore, get_transfer_store
+from EjectionStorage import create_sqlite
+
+
+def as_dict(pairs):
+    return {(o, d): values for o, d, *values in zip(*(c.tolist() for c in pairs))}
+
+
+def full_matrix():
+    # Every pair computed from scratch, the reference an incremental update has to match
+    names = [c for c in get_names() if read_body(c) is not None]
+    matrix = transfer_matrix(*body_arrays([read_body(c) for c in names]))
+    i, j = np.nonzero(~np.isnan(matrix[2]))
+    return {(names[a], names[b]): [float(c[a, b]) for c in matrix] for a, b in zip(i, j)}
+
+
+def assert_same(pairs, expected):
+    pairs = as_dict(pairs)
+
+    assert pairs.keys() == expected.keys()
+
+    for key, values in expected.items():
+        assert pairs[key] == pytest.approx(values, rel=1e-12)
+
+
+def test_edit_recomputes_only_the_changed_pairs(solar_system):
+    store = get_transfer_store()
+    expected = full_matrix()
+
+    assert store.update() == len(expected)
+    assert store.update() == 0
+
+    row = list(solar_system.get_row("Earth"))
+    row[3] *= 1.01
+    write_bodies([tuple(row)])
+    expected = full_matrix()
+
+    # Earth's pairs, and the Moon's, since it orbits Earth
+    assert store.update() == sum(1 for o, d in expected if {o, d} & {"Earth", "Moon"})
+    assert_same(store.get_pairs(), expected)
+
+
+def test_new_body_adds_its_pairs(solar_system):
+    store = get_transfer_store()
+    store.update()
+
+    write_bodies([("Vulcan", 1e23, 2e6, 2e10, 2e10, "Sun", "red", 1000)])
+    expected = full_matrix()
+
+    assert store.update() == sum(1 for o, d in expected if "Vulcan" in (o, d))
+    assert_same(store.get_pairs(), expected)
+
+
+def test_streamed_chunks_add_up_to_the_pairs(solar_system):
+    chunks = []
+    count = get_transfer_store().update(2, chunks.append)
+
+    assert len(chunks) > 2 and len(chunks[0][0]) == 0
+    assert sum(len(c[0]) for c in chunks) == count
+    assert_same([np.concatenate(c) for c in zip(*chunks)], full_matrix())
+
+
+def test_cancelled_update_stops_after_the_current_chunk(solar_system):
+    store, cancel, chunks = get_transfer_store(), threading.Event(), []
+
+    def add(pairs):
+        chunks.append(pairs)
+
+        if len(chunks) == 2:
+            cancel.set()
+
+    # The pairs still current, then the chunk that was being computed when cancel was set, then nothing
+    assert store.update(2, add, cancel) is None
+    assert len(chunks) == 2 and len(chunks[0][0]) == 0 and len(chunks[1][0]) > 0
+
+    assert store.update() == len(full_matrix())
+    assert_same(store.get_pairs(), full_matrix())
+
+
+def test_sqlite_keeps_the_matrix(bodies_path, tmp_path, monkeypatch):
+    monkeypatch.delenv("EJECTION_SNAPSHOT", raising=False)
+    path = str(tmp_path / "bodies.db")
+    create_sqlite(path, open_storage(bodies_path).fetch_bodies()).close()
+
+    try:
+        EjectionCalc.set_storage(open_storage("sqlite:///" + path))
+        store = TransferStore(get_storage(), get_catalog())
+        assert store.update() > 0 and store.is_persistent()
+
+        reopened = TransferStore(get_storage(), get_catalog())
+        assert reopened.update() == 0
+        assert_same(reopened.get_pairs(), full_matrix())
+
+    finally:
+        EjectionCalc.set_storage(None)
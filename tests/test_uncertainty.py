@@ -0,0 +1,52 @@
+import math
+import numpy as np
+import pytest
+from EjectionCalc import *
+from EjectionUncertainty import DEFAULT_SIGMAS, QUANTITIES, monte_carlo
+
+ZERO = {c: 0.0 for c in DEFAULT_SIGMAS}
+
+
+def test_zero_sigmas_match_transfer(solar_system, hohmann):
+    result = monte_carlo("Earth", "Mars", 1000, ZERO, seed=0)
+    transfer = hohmann("Earth", "Mars")
+
+    assert len(result) == 1000
+    assert result.get_samples("ejection_dv") == pytest.approx(np.full(1000, transfer.get_ejection_deltav()), rel=1e-12)
+    assert result.get_samples("capture_dv") == pytest.approx(np.full(1000, transfer.get_capture_deltav()), rel=1e-12)
+    assert result.get_samples("ejection_angle") == pytest.approx(np.full(1000, transfer.get_ejection_angle()), rel=1e-12)
+    assert result.get_nominal("ejection_dv") == transfer.get_ejection_deltav()
+
+
+def test_timing_error_turns_the_asymptote(solar_system, hohmann):
+    result = monte_carlo("Earth", "Mars", 100, dict(ZERO, timing=120.0), seed=1)
+    transfer = hohmann("Earth", "Mars")
+
+    for angle, ejection_dv in zip(result.get_samples("ejection_angle"), result.get_samples("ejection_dv")):
+        turn = angle - transfer.get_ejection_angle()
+        assert ejection_dv == pytest.approx(transfer.get_ejection_deltav() + 2 * abs(transfer.get_v_soi_origin() * math.sin(turn / 2)), rel=1e-9)
+
+
+def test_seeds_are_independent_of_workers(solar_system):
+    serial = monte_carlo("Earth", "Mars", 5000, seed=7, chunk_size=1024)
+    parallel = monte_carlo("Earth", "Mars", 5000, seed=7, workers=2, chunk_size=1024)
+
+    for name in QUANTITIES:
+        assert np.array_equal(serial.get_samples(name), parallel.get_samples(name))
+
+    assert not np.array_equal(serial.get_samples("ejection_dv"), monte_carlo("Earth", "Mars", 5000, seed=8, chunk_size=1024).get_samples("ejection_dv"))
+
+
+def test_percentiles_bracket_the_nominal(solar_system):
+    result = monte_carlo("Earth", "Mars", 20000, seed=0)
+
+    for name in ("ejection_dv", "capture_dv"):
+        percentiles = result.get_percentiles(name)
+        assert percentiles[1] < result.get_nominal(name) < percentiles[99]
+        assert list(percentiles.values()) == sorted(percentiles.values())
+
+
+def test_invalid_pairs(solar_system):
+    for origin, destination in (("Earth", "Pluto"), ("Earth", "Earth"), ("Earth", "Io")):
+        with pytest.raises(ValueError):
+            monte_carlo(origin, destination, 10)